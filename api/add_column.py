@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_add_column_bp(graph):
     bp = Blueprint("add_column", __name__)
@@ -24,16 +26,12 @@ def create_add_column_bp(graph):
 
         try:
             # ⚡️ Wichtig: Property-Namen können nicht direkt als Parameter in Cypher verwendet werden.
-            # Deshalb setzen wir ihn sicher via f-String (nur wenn wir geprüft haben, dass es ein valider Name ist).
+            # statements setzt sie gequotet ein, trotzdem nur valide Namen als Spalten zulassen.
             if not column_name.isidentifier():
                 return jsonify({"status": "error", "message": f"Ungültiger Spaltenname: {column_name}"}), 400
 
-            query = f"""
-                MATCH (n:`{label}`)
-                SET n.{column_name} = COALESCE(n.{column_name}, "")
-            """
-
-            graph.run(query)
+            statements.ADD_COLUMN.run(graph, label=label, property=column_name)
+            bump_write_generation()
 
             return jsonify({"status": "success", "message": f"Neue Spalte '{column_name}' für alle Nodes vom Typ '{label}' hinzugefügt (Default '')."})
         except Exception as e:
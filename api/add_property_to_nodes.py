@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_add_property_to_nodes_bp(graph):
     bp = Blueprint("add_property_to_nodes", __name__)
@@ -22,15 +24,9 @@ def create_add_property_to_nodes_bp(graph):
         if not property_name or not isinstance(property_name, str) or not property_name.isidentifier():
             return jsonify({"error": f"Invalid property name: {property_name}"}), 400
 
-        query = f"""
-            MATCH (n:`{label}`)
-            WHERE n.{property_name} IS NULL
-            SET n.{property_name} = $value
-            RETURN id(n) AS id
-        """
-
         try:
-            result = graph.run(query, value=value).data()
+            result = statements.ADD_PROPERTY_WHERE_NULL.run(graph, {"value": value}, label=label, property=property_name).data()
+            bump_write_generation()
             updated_ids = [r["id"] for r in result]
             response = {"updated": len(updated_ids)}
             if return_nodes:
@@ -41,7 +37,7 @@ def create_add_property_to_nodes_bp(graph):
             return (
                 jsonify({
                     "error": str(e),
-                    "query": query,
+                    "query": statements.ADD_PROPERTY_WHERE_NULL.cypher(label=label, property=property_name),
                     "params": {"value": value}
                 }),
                 500,
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_add_relationship_bp(graph):
     bp = Blueprint("add_relationship", __name__)
@@ -36,14 +38,8 @@ def create_add_relationship_bp(graph):
         safe_props = {k: v for k, v in props.items() if k.isidentifier()}
 
         try:
-            query = f"""
-                MATCH (a),(b)
-                WHERE ID(a)=$start AND ID(b)=$end
-                CREATE (a)-[r:`{rel_type}`]->(b)
-                SET r += $props
-                RETURN ID(r) AS id
-            """
-            result = graph.run(query, start=start_id, end=end_id, props=safe_props).data()
+            result = statements.CREATE_RELATIONSHIP.run(graph, {"start": start_id, "end": end_id, "props": safe_props}, rel_type=rel_type).data()
+            bump_write_generation()
             if not result:
                 return jsonify({"status": "error", "message": "Relationship konnte nicht erstellt werden"}), 500
 
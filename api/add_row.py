@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_add_row_bp(graph):
     bp = Blueprint("add_row", __name__)
@@ -25,8 +27,8 @@ def create_add_row_bp(graph):
             safe_properties = {k: v for k, v in properties.items() if k.isidentifier()}
 
             # Node erstellen
-            query = f"CREATE (n:`{label}`) SET n += $props RETURN ID(n) AS id"
-            result = graph.run(query, props=safe_properties).data()
+            result = statements.CREATE_NODE_WITH_PROPERTIES.run(graph, {"props": safe_properties}, label=label).data()
+            bump_write_generation()
             if not result:
                 return jsonify({"status": "error", "message": "Node konnte nicht erstellt werden"}), 500
 
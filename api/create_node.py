@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_create_node_bp(graph):
     bp = Blueprint("create_node", __name__)
@@ -29,14 +31,11 @@ def create_create_node_bp(graph):
         return False, "Unbekannter Request-Typ. Weder 'props' noch 'property' und 'value' gefunden."
 
     def fn_create_node(node_label, prop_name, value):
-        # 1. Backticks für den Node-Label hinzufügen
-        # Dies ist erforderlich, um Leerzeichen oder Sonderzeichen im Label zu behandeln.
-        safe_node_label = f"`{node_label}`"
-
-        # 2. Die Cypher-Abfrage anpassen, um den sicheren Label zu verwenden
-        query = f"CREATE (n:{safe_node_label}) SET n.{prop_name}=$value RETURN ID(n) AS id"
-
-        result = graph.run(query, value=value).data()
+        # Label und Property werden von statements gequotet (Leerzeichen, Sonderzeichen).
+        # Fehlen sie im Request, gilt wie bisher der Name "None".
+        result = statements.CREATE_NODE_WITH_PROPERTY.run(
+            graph, {"value": value}, label=str(node_label), property=str(prop_name)
+        ).data()
 
         if result and result[0]['id'] is not None:
             return result[0]['id']
@@ -52,23 +51,9 @@ def create_create_node_bp(graph):
                 existing_node_id = item["id"]
 
                 # Die gesamte Logik, um den Beziehungstyp zu bestimmen,
-                # wird direkt in die Cypher-Abfrage verschoben.
+                # steckt in der Cypher-Abfrage (statements.CONNECT_NEW_NODE).
                 # Das Backend muss keine Annahmen mehr treffen.
-                query_rel = """
-                    MATCH (from_node) WHERE ID(from_node) = $from_id
-                    MATCH (to_node) WHERE ID(to_node) = $to_id
-
-                    MERGE (from_node)-[rel:TYPE]->(to_node)
-
-                    ON CREATE SET rel.type = CASE
-                        WHEN 'Person' IN labels(from_node) AND 'Buch' IN labels(to_node) THEN 'HAT_GESCHRIEBEN'
-                        WHEN 'Person' IN labels(from_node) AND 'Ort' IN labels(to_node) THEN 'WOHNT_IN'
-                        ELSE 'CONNECTED_TO'
-                    END
-                    RETURN rel
-                """
-
-                graph.run(query_rel, from_id=existing_node_id, to_id=new_node_id)
+                statements.CONNECT_NEW_NODE.run(graph, {"from_id": existing_node_id, "to_id": new_node_id})
 
     @bp.route('/create_node', methods=['POST'])
     @conditional_login_required
@@ -102,5 +87,7 @@ def create_create_node_bp(graph):
         except Exception as e:
             print(f"Exception in api_create_node: {e}")
             return jsonify({"status": "error", "message": str(e)}), 500
+        finally:
+            bump_write_generation()
 
     return bp
@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_delete_all_bp(graph):
     bp = Blueprint("delete_all", __name__)
@@ -13,7 +15,8 @@ def create_delete_all_bp(graph):
         Kann ohne Body oder Parameter aufgerufen werden.
         """
         try:
-            graph.run("MATCH (n) DETACH DELETE n")
+            statements.DELETE_ALL.run(graph)
+            bump_write_generation()
             return jsonify({"status": "success", "message": "Alle Knoten und Beziehungen wurden gelöscht"})
         except Exception as e:
             print("EXCEPTION:", str(e))
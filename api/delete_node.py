@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_delete_node_bp(graph):
     bp = Blueprint("delete_node", __name__)
@@ -11,12 +13,9 @@ def create_delete_node_bp(graph):
         if not graph:
             return jsonify({"status": "error", "message": "Datenbank nicht verbunden."}), 500
 
-        query = f"""
-            MATCH (n) WHERE ID(n) = {node_id}
-            DETACH DELETE n
-        """
         try:
-            graph.run(query)
+            statements.DELETE_NODE.run(graph, {"node_id": node_id})
+            bump_write_generation()
             return jsonify({"status": "success", "message": f"Node mit ID {node_id} und alle Beziehungen wurden gelöscht."})
         except Exception as e:
             print(f"Fehler beim Löschen des Nodes: {e}")
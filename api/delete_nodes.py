@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_delete_nodes_bp(graph):
     bp = Blueprint("delete_nodes", __name__)
@@ -36,13 +38,9 @@ def create_delete_nodes_bp(graph):
         if not node_ids:
             return jsonify({"status": "success", "message": "Keine Nodes zum Löschen angegeben."})
 
-        query = """
-            UNWIND $ids AS id
-            MATCH (n) WHERE ID(n) = id
-            DETACH DELETE n
-        """
         try:
-            graph.run(query, ids=node_ids)
+            statements.DELETE_NODES.run(graph, {"ids": node_ids})
+            bump_write_generation()
             return jsonify({"status": "success", "message": f"{len(node_ids)} Nodes und alle Beziehungen wurden gelöscht."})
         except Exception as e:
             print(f"Fehler beim Löschen der Nodes: {e}")
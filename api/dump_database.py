@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
 from oasis_helper import conditional_login_required
+import statements
 
 def create_dump_database_bp(graph):
     bp = Blueprint("dump_database", __name__)
@@ -8,19 +9,8 @@ def create_dump_database_bp(graph):
     @conditional_login_required
     def api_dump_database():
         try:
-            query_nodes = """
-                MATCH (n)
-                RETURN id(n) AS id, labels(n) AS labels, properties(n) AS props
-            """
-            query_rels = """
-                MATCH (a)-[r]->(b)
-                RETURN id(r) AS id, type(r) AS type,
-                       id(a) AS start_id, id(b) AS end_id,
-                       properties(r) AS props
-            """
-
-            nodes = graph.run(query_nodes).data()
-            rels = graph.run(query_rels).data()
+            nodes = statements.DUMP_NODES.run(graph).data()
+            rels = statements.DUMP_RELATIONSHIPS.run(graph).data()
 
             dump = {
                 "nodes": nodes,
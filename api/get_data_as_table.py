@@ -1,6 +1,77 @@
 import json
-from flask import Blueprint, request, jsonify
+import threading
+from collections import Counter
+from interchange.time import Date, DateTime, Duration, Time
+from py2neo.errors import Neo4jError
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from oasis_helper import conditional_login_required
+from table_cache import table_cache, get_write_generation
+from metrics import statement
+from server_timing import phase, current_timings
+from statements import quote_identifier
+from api.table_assembler import (
+    extract_nodes_from_paths, add_node_to_bucket, extract_table_columns,
+    assemble_table_rows, drain_buckets, iter_table_rows
+)
+
+AGGREGATE_FUNCTIONS = ("count", "sum", "min", "max")
+
+# So viele Statement-Formen zählt GraphAPI, danach beginnt die Zählung von vorn. Labels und
+# Properties im Text kommen aus dem Request, die Zahl der Formen ist also nicht begrenzt.
+MAX_STATEMENT_SHAPES = 1024
+
+def value_sort_key(value):
+    """
+    Sortierschlüssel für Zellwerte unterschiedlicher Typen. NULL kommt wie in Cypher
+    aufsteigend ans Ende und absteigend (reverse) an den Anfang.
+    """
+    if value is None:
+        return (4, 0)
+    if isinstance(value, str):
+        return (0, value)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    return (3, str(value))
+
+# Typ-Markierungen für Cursor-Werte, die JSON nicht abbilden kann ({"$date": "2024-01-31"})
+CURSOR_TYPES = (("datetime", DateTime), ("date", Date), ("time", Time), ("duration", Duration))
+
+def encode_cursor_value(value):
+    """Sortierwert für den nextCursor, Datums- und Zeitwerte mit Typ-Markierung statt als String."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [encode_cursor_value(v) for v in value]
+    for tag, cls in CURSOR_TYPES:
+        if isinstance(value, cls):
+            return {f"${tag}": value.iso_format()}
+    raise ValueError(f"Nach Werten vom Typ {type(value).__name__} kann nicht geblättert werden")
+
+def decode_cursor_value(value):
+    """Gegenstück zu encode_cursor_value: der Wert hat wieder den Typ, mit dem Neo4j vergleicht."""
+    if isinstance(value, list):
+        return [decode_cursor_value(v) for v in value]
+    if isinstance(value, dict):
+        for tag, cls in CURSOR_TYPES:
+            if set(value) == {f"${tag}"}:
+                return cls.from_iso_format(value[f"${tag}"])
+        raise ValueError("Parameter 'after' must be the nextCursor of the previous page")
+    return value
+
+def to_float_or_none(value):
+    """Wie toFloatOrNull in Cypher: Zahlen und Zahl-Strings werden float, alles andere None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
 
 def create_get_data_bp(graph):
     bp = Blueprint("get_data_bp", __name__)
@@ -8,6 +79,36 @@ def create_get_data_bp(graph):
     class GraphAPI:
         def __init__(self, driver):
             self.driver = driver
+            # Hash des Statement-Texts -> Anzahl Ausführungen; wenige Formen bei vielen
+            # Ausführungen bedeuten, dass Neo4j die Pläne aus dem Plan-Cache wiederverwenden kann
+            self.statement_counts = Counter()
+            self.statement_resets = 0
+            self._stats_lock = threading.Lock()
+
+        def _count(self, key):
+            with self._stats_lock:
+                if key not in self.statement_counts and len(self.statement_counts) >= MAX_STATEMENT_SHAPES:
+                    self.statement_counts.clear()
+                    self.statement_resets += 1
+                self.statement_counts[key] += 1
+
+        def run(self, name, cypher, parameters=None):
+            self._count(hash(cypher))
+            with statement(f"get_data.{name}"):
+                return self.driver.run(cypher, parameters or {})
+
+        def statement_stats(self):
+            """Seit dem letzten Zurücksetzen (`resets`, nach MAX_STATEMENT_SHAPES Formen)."""
+            with self._stats_lock:
+                shapes = len(self.statement_counts)
+                executions = sum(self.statement_counts.values())
+                resets = self.statement_resets
+            return {
+                "shapes": shapes,
+                "executions": executions,
+                "planCacheHitRate": (1 - shapes / executions) if executions else None,
+                "resets": resets,
+            }
 
         def _node_to_dict(self, node):
             return {
@@ -23,17 +124,30 @@ def create_get_data_bp(graph):
                 "type": type(rel).__name__,
             }
 
-        def fetch_nodes(self, label, limit=None, where=None):
-            # Label-Injection is possible
+        def fetch_nodes(self, label, limit=None, where=None, after=None, where_params=None, order=None):
             # no logging
-            base_query = f"MATCH (n:`{label}`)"
+            base_query = f"MATCH (n:{quote_identifier(label)})"
+            conditions = []
+            keyset_params = {"after": after}
+            if order:
+                # sortiert nach einer Property: after ist (Wert, id) des letzten Knotens oder None
+                keyset_condition, order_clause, keyset_params = self._ordered_keyset("n", order, after)
+                if keyset_condition:
+                    conditions.append(keyset_condition)
+            elif after is not None:
+                conditions.append("id(n) > $after")
+                order_clause = "id(n)"
             if where:
-                base_query += f" WHERE {where}"
+                conditions.append(f"({where})")
+            if conditions:
+                base_query += " WHERE " + " AND ".join(conditions)
             base_query += " RETURN n"
+            if order or after is not None:
+                base_query += f" ORDER BY {order_clause}"
             if limit:
-                base_query += f" LIMIT {limit}"
+                base_query += " LIMIT $limit"
             try:
-                records = self.driver.run(base_query).data()
+                records = self.run("fetch_nodes", base_query, {**(where_params or {}), **keyset_params, "limit": limit}).data()
             except Exception as e:
                 raise RuntimeError(f"Neo4j-Fehler bei fetch_nodes({label}): {e}") from e
             result = []
@@ -47,28 +161,165 @@ def create_get_data_bp(graph):
                 result.append(node_dict)
             return result
 
-        def fetch_paths(self, labels, max_depth, limit=None, where=None, rel_filter=None):
-            depth_str = f"*..{max_depth}" if max_depth >= 0 else "*"
-            rel_match = f"[r:{'|'.join(rel_filter)}{depth_str}]" if rel_filter else f"[{depth_str}]"
+        def _ordered_keyset(self, var, order, after):
+            """
+            Keyset-Bedingung für eine Sortierung nach `order["property"]` mit der id als Tie-Breaker.
+            Neo4j sortiert NULL aufsteigend ans Ende und absteigend an den Anfang, das muss die
+            Bedingung nachbilden. Gibt (condition oder None, ORDER BY-Ausdruck, params) zurück.
+            """
+            prop = f"{var}.{quote_identifier(order['property'])}"
+            descending = order["direction"] == "desc"
+            order_clause = f"{prop}{' DESC' if descending else ''}, id({var})"
+
+            if after is None:
+                return None, order_clause, {}
+
+            after_value, after_id = after
+            params = {"after_value": after_value, "after_id": after_id}
+            if after_value is None:
+                if descending:
+                    condition = f"({prop} IS NOT NULL OR id({var}) > $after_id)"
+                else:
+                    condition = f"({prop} IS NULL AND id({var}) > $after_id)"
+            elif descending:
+                condition = f"({prop} < $after_value OR ({prop} = $after_value AND id({var}) > $after_id))"
+            else:
+                condition = f"({prop} > $after_value OR ({prop} = $after_value AND id({var}) > $after_id) OR {prop} IS NULL)"
+            return condition, order_clause, params
 
-            cypher = f"""
-                MATCH p=(start)-{rel_match}->(end)
-                WHERE ANY(n IN nodes(p) WHERE ANY(l IN labels(n) WHERE l IN $labels))
+        def _anchored_paths_match(self, main_label, max_depth, anchor_where=None, path_where=None, rel_filter=None, anchor_conditions=None):
+            """
+            Baut den Pfad-MATCH, der am Hauptlabel verankert ist: zuerst werden die Knoten des
+            Hauptlabels per Label-Scan (bzw. Index) gesucht und `anchor_where` auf ihnen geprüft,
+            erst danach wird über die ausgewählten Relationship-Typen expandiert. Es werden genau
+            die gerichteten Pfade (Länge 1..max_depth) gefunden, die durch einen Anker `m` laufen.
+
+            Die Länge wird schon beim Expandieren begrenzt und nicht erst über `length(p)`: pro
+            Länge k des Teils vor dem Anker gibt es einen UNION-Zweig, der hinter dem Anker nur
+            noch max_depth - k Schritte geht. Sonst würden beide Hälften bis max_depth expandiert,
+            also Pfade bis zur doppelten Länge aufgezählt.
             """
+            rel_types = f":{'|'.join(quote_identifier(r) for r in rel_filter)}" if rel_filter else ""
 
-            if where:
+            conditions = list(anchor_conditions or [])
+            if anchor_where:
+                conditions.append(f"({anchor_where})")
+
+            cypher = f"MATCH (n:{quote_identifier(main_label)})"
+            if conditions:
+                cypher += " WHERE " + " AND ".join(conditions)
+            cypher += " WITH n AS m"
+
+            if max_depth < 0:
+                cypher += f" MATCH p=(start)-[{rel_types}*0..]->(m)-[{rel_types}*0..]->(end) WHERE length(p) >= 1"
+            elif max_depth == 0:
+                cypher += " WITH m, null AS p WHERE false"
+            else:
+                branches = [
+                    f"WITH m MATCH p=(start)-[{rel_types}*{k}]->(m)-[{rel_types}*{1 if k == 0 else 0}..{max_depth - k}]->(end) RETURN p"
+                    for k in range(max_depth + 1)
+                ]
+                cypher += " CALL { " + " UNION ALL ".join(branches) + " }"
+
+            if path_where:
                 # Filter nur auf relevante Labels anwenden
-                label_conditions = []
-                for lbl in labels:
-                    label_conditions.append(f"ANY(n IN nodes(p) WHERE '{lbl}' IN labels(n) AND ({where}))")
-                cypher += " AND (" + " OR ".join(label_conditions) + ")"
+                cypher += f" WITH m, p WHERE ANY(n IN nodes(p) WHERE ANY(l IN labels(n) WHERE l IN $labels) AND ({path_where}))"
+
+            return cypher
+
+        def fetch_main_ids_page(self, labels, main_label, max_depth, page_size, after=None, anchor_where=None, path_where=None, rel_filter=None, where_params=None, order=None):
+            """
+            Keyset-Pagination: liefert die nächsten `page_size` Knoten mit `main_label`, die in
+            einem passenden Pfad liegen, als Liste von (id, Sortierwert).
+            Ohne `order` wird nach id sortiert und `after` ist die letzte id (Sortierwert None),
+            mit `order` wird nach der Property sortiert und `after` ist (Wert, id).
+            """
+            if order:
+                keyset_condition, order_clause, keyset_params = self._ordered_keyset("n", order, after)
+                anchor_conditions = [keyset_condition] if keyset_condition else None
+                cypher = self._anchored_paths_match(main_label, max_depth, anchor_where, path_where, rel_filter, anchor_conditions)
+                cypher += f"""
+                    WITH DISTINCT m AS n
+                    RETURN id(n) AS mid, n.{quote_identifier(order["property"])} AS sort_value
+                    ORDER BY {order_clause}
+                    LIMIT $page_size
+                """
+            else:
+                keyset_params = {"after": -1 if after is None else after}
+                cypher = self._anchored_paths_match(main_label, max_depth, anchor_where, path_where, rel_filter, ["id(n) > $after"])
+                cypher += """
+                    WITH DISTINCT m
+                    RETURN id(m) AS mid, null AS sort_value
+                    ORDER BY mid
+                    LIMIT $page_size
+                """
+            try:
+                records = self.run("fetch_main_ids_page", cypher, {
+                    **(where_params or {}),
+                    **keyset_params,
+                    "labels": labels,
+                    "max_depth": max_depth,
+                    "page_size": page_size,
+                }).data()
+            except Exception as e:
+                raise RuntimeError(f"Neo4j-Fehler bei fetch_main_ids_page: {e}") from e
+            return [(r["mid"], r["sort_value"]) for r in records]
+
+        def aggregate_main_nodes(self, labels, main_label, max_depth, group_by, aggregates, in_paths=True, anchor_where=None, path_where=None, rel_filter=None, where=None, where_params=None):
+            """
+            Gruppierung und Aggregation direkt in Cypher, über die Knoten des Hauptlabels, die
+            auch in der Tabelle stehen würden: die in passenden Pfaden liegen (`in_paths`)
+            oder, wenn es keine solchen Pfade gibt, alle Knoten, auf die `where` passt.
+            """
+            if in_paths:
+                cypher = self._anchored_paths_match(main_label, max_depth, anchor_where, path_where, rel_filter)
+                cypher += " WITH DISTINCT m"
+            else:
+                cypher = f"MATCH (n:{quote_identifier(main_label)})"
+                if where:
+                    cypher += f" WHERE {where}"
+                cypher += " WITH n AS m"
+
+            returns = [f"m.{quote_identifier(col['property'])} AS g{i}" for i, col in enumerate(group_by)]
+            for i, agg in enumerate(aggregates):
+                value = f"m.{quote_identifier(agg['property'])}" if agg["property"] is not None else "m"
+                if agg["function"] == "sum":
+                    value = f"toFloatOrNull({value})"
+                returns.append(f"{agg['function']}({value}) AS a{i}")
+            cypher += " RETURN " + ", ".join(returns)
+
+            try:
+                records = self.run("aggregate_main_nodes", cypher, {**(where_params or {}), "labels": labels, "max_depth": max_depth}).data()
+            except Exception as e:
+                raise RuntimeError(f"Neo4j-Fehler bei aggregate_main_nodes: {e}") from e
+
+            groups = [
+                {
+                    "key": [r[f"g{i}"] for i in range(len(group_by))],
+                    "values": [r[f"a{i}"] for i in range(len(aggregates))],
+                }
+                for r in records
+            ]
+            groups.sort(key=lambda g: [value_sort_key(v) for v in g["key"]])
+            return groups
+
+        def fetch_paths(self, labels, main_label, max_depth, limit=None, anchor_where=None, path_where=None, rel_filter=None, main_ids=None, where_params=None):
+            # nur Pfade, die einen Hauptknoten der aktuellen Seite enthalten
+            anchor_conditions = ["id(n) IN $main_ids"] if main_ids is not None else None
+            cypher = self._anchored_paths_match(main_label, max_depth, anchor_where, path_where, rel_filter, anchor_conditions)
 
-            cypher += " RETURN p"
+            cypher += " RETURN id(m) AS mid, p"
             if limit:
-                cypher += f" LIMIT {limit}"
+                cypher += " LIMIT $limit"
 
             try:
-                records = self.driver.run(cypher, labels=labels).data()
+                records = self.run("fetch_paths", cypher, {
+                    **(where_params or {}),
+                    "labels": labels,
+                    "max_depth": max_depth,
+                    "main_ids": main_ids,
+                    "limit": limit,
+                }).data()
             except Exception as e:
                 raise RuntimeError(f"Neo4j-Fehler bei fetch_paths: {e}") from e
 
@@ -81,9 +332,30 @@ def create_get_data_bp(graph):
                     for rel in p.relationships
                     if not rel_filter or type(rel).__name__ in rel_filter
                 ]
-                paths.append({"nodes": nodes, "rels": rels})
+                paths.append({"anchor": r["mid"], "nodes": nodes, "rels": rels})
             return paths
 
+        def fetch_related(self, label, main_ids, depth, limit=None, where=None, where_params=None):
+            """
+            Knoten mit `label`, die höchstens `depth` Schritte (ohne Richtung) von einem der
+            Hauptknoten entfernt sind, für alle `main_ids` in einer UNWIND-Abfrage.
+            Gibt {Hauptknoten-id: [Knoten]} zurück.
+            """
+            cypher = f"""
+                UNWIND $mids AS mid
+                MATCH (m) WHERE id(m) = mid
+                MATCH (m)-[*1..{depth}]-(n:{quote_identifier(label)})
+            """
+            if where:
+                cypher += f" WHERE {where}"
+            cypher += " WITH mid, collect(DISTINCT n) AS related"
+            if limit:
+                cypher += " RETURN mid, related[..$limit] AS related"
+            else:
+                cypher += " RETURN mid, related"
+            records = self.run("fetch_related", cypher, {**(where_params or {}), "mids": main_ids, "limit": limit}).data()
+            return {r["mid"]: [self._node_to_dict(n) for n in r.get("related") or []] for r in records}
+
     graph_api = GraphAPI(graph)
 
     @bp.route("/get_data_as_table", methods=["GET"])
@@ -91,94 +363,386 @@ def create_get_data_bp(graph):
     def get_data_as_table():
         try:
             params = parse_request_params(request)
-            buckets = build_buckets(graph_api, params)
-            columns = extract_table_columns(buckets)
-            rows = assemble_table_rows(buckets, columns)
-            return jsonify({"columns": columns, "rows": rows})
+
+            # Ergebnis-Cache: nur für vollständige JSON-Antworten ohne Debug-Infos.
+            # Die Write-Generation wird vor dem Lesen festgehalten, damit ein paralleler
+            # Schreibzugriff nie unter der neuen Generation gecacht wird.
+            cache_key = None
+            if table_cache.enabled and params["format"] != "ndjson" and not is_debug_request(request) and "__profile" not in request.args:
+                cache_key = (get_write_generation(), table_cache_key(params))
+                body = table_cache.get(cache_key)
+                if body is not None:
+                    return Response(body, mimetype="application/json")
+
+            stats = {"roundTripsBefore": 0, "roundTripsAfter": 0}
+            if params["aggregates"]:
+                with phase("assemble"):
+                    result, pushdown = build_aggregate_result(graph_api, params, stats)
+                if is_debug_request(request):
+                    result["debug"] = {"attach": stats, "statements": graph_api.statement_stats(), "aggregatePushdown": pushdown, "timings": current_timings()}
+                return jsonify(result)
+
+            with phase("assemble"):
+                buckets, next_cursor = build_buckets(graph_api, params, stats)
+                columns = extract_table_columns(buckets)
+            if params["format"] == "ndjson":
+                return Response(stream_with_context(generate_ndjson(buckets, columns, next_cursor, params)), mimetype="application/x-ndjson")
+            with phase("assemble"):
+                if params["format"] == "compact":
+                    rows = iter_table_rows(drain_buckets(buckets), columns)
+                else:
+                    rows = assemble_table_rows(buckets, columns)
+                if needs_row_sort(params):
+                    rows = sort_table_rows(rows, columns, params["order_by"])
+                if params["format"] == "compact":
+                    result = compact_table(rows, columns)
+                else:
+                    result = {"columns": columns, "rows": rows}
+            if params["page_size"]:
+                result["nextCursor"] = next_cursor
+            if is_debug_request(request):
+                # ohne "serialize", das läuft erst nach diesem Feld
+                result["debug"] = {"attach": stats, "statements": graph_api.statement_stats(), "timings": current_timings()}
+            response = jsonify(result)
+            if cache_key is not None:
+                table_cache.put(cache_key, response.get_data())
+            return response
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500
 
-    def build_buckets(graph_api, params):
-        selected_labels, main_label, max_depth, limit, filter_labels, where, rel_filter = params
-        paths = graph_api.fetch_paths(selected_labels, max_depth, limit, where, rel_filter)
+    @bp.route("/get_data_as_table/statement_stats", methods=["GET"])
+    @conditional_login_required
+    def get_data_as_table_statement_stats():
+        return jsonify(graph_api.statement_stats())
+
+    def generate_ndjson(buckets, columns, next_cursor, params):
+        """
+        Streamt das Ergebnis zeilenweise als NDJSON: zuerst eine Zeile mit den Spalten,
+        dann eine Zeile pro Tabellenzeile, sobald der jeweilige Bucket zusammengesetzt ist.
+        Bei Pagination folgt zum Schluss eine Zeile mit dem nextCursor.
+        """
+        dumps = current_app.json.dumps
+        yield dumps({"columns": columns}) + "\n"
+        try:
+            rows = iter_table_rows(drain_buckets(buckets), columns)
+            if needs_row_sort(params):
+                # Sortierung über andere Labels braucht alle Zeilen, bevor die erste raus darf
+                rows = sort_table_rows(rows, columns, params["order_by"])
+            for row in rows:
+                yield dumps(row) + "\n"
+        except Exception as e:
+            # der Status-Code ist bereits gesendet, der Fehler kommt als eigene Zeile
+            yield dumps({"status": "error", "message": str(e)}) + "\n"
+            return
+        if params["page_size"]:
+            yield dumps({"nextCursor": next_cursor}) + "\n"
+
+    def needs_row_sort(params):
+        """
+        Zeilen müssen in Python sortiert werden, außer die Sortierung besteht nur aus der
+        Property des Hauptlabels, nach der schon die Seite in Cypher sortiert wurde.
+        """
+        order_by = params["order_by"]
+        if not order_by:
+            return False
+        return not (params["page_order"] and len(order_by) == 1)
+
+    def sort_table_rows(rows, columns, order_by):
+        """Sortiert die Zeilen (stabil) nach den orderBy-Spalten, die erste Spalte hat Vorrang."""
+        index = {(col["nodeType"], col["property"]): i for i, col in enumerate(columns)}
+        rows = list(rows)
+        for order in reversed(order_by):
+            i = index.get((order["nodeType"], order["property"]))
+            if i is None:
+                continue  # Spalte kommt in keinem Knoten vor, alle Werte wären NULL
+            rows.sort(key=lambda row: value_sort_key(row["cells"][i]["value"]), reverse=order["direction"] == "desc")
+        return rows
+
+    def build_aggregate_result(graph_api, params, stats=None):
+        """
+        groupBy/agg: liefert statt der Zeilen nur die Gruppen mit ihren Aggregaten.
+        Bei Abfragen mit nur einem Label wird in Cypher aggregiert, sonst über die
+        zusammengesetzten Tabellenzeilen. Gibt (result, pushdown) zurück.
+        """
+        group_by = params["group_by"]
+        aggregates = params["aggregates"]
+        pushdown = len(params["selected_labels"]) == 1 and not params["limit"] and not params["filter_labels"]
+
+        if pushdown:
+            selected_labels = params["selected_labels"]
+            main_label = params["main_label"]
+            max_depth = params["max_depth"]
+            anchor_where = params["anchor_where"]
+            path_where = params["path_where"]
+            rel_filter = params["rel_filter"]
+            where_params = params["where_params"]
+            # wie build_buckets: Knoten aus Pfaden, nur wenn es keine gibt alle Knoten des Labels
+            in_paths = bool(graph_api.fetch_main_ids_page(selected_labels, main_label, max_depth, 1, None, anchor_where, path_where, rel_filter, where_params))
+            groups = graph_api.aggregate_main_nodes(
+                selected_labels, main_label, max_depth, group_by, aggregates, in_paths,
+                anchor_where, path_where, rel_filter, params["where"], where_params
+            )
+        else:
+            # Aggregate gelten für die gesamte Ergebnismenge, nicht für eine Seite
+            buckets, _ = build_buckets(graph_api, {**params, "page_size": None}, stats)
+            columns = extract_table_columns(buckets)
+            groups = aggregate_table_rows(iter_table_rows(drain_buckets(buckets), columns), columns, group_by, aggregates)
+
+        return {"groupBy": group_by, "aggregates": aggregates, "groups": groups}, pushdown
+
+    def aggregate_table_rows(rows, columns, group_by, aggregates):
+        """Gruppiert Tabellenzeilen nach den groupBy-Spalten und berechnet count/sum/min/max wie Cypher."""
+        index = {(col["nodeType"], col["property"]): i for i, col in enumerate(columns)}
+
+        def cell_value(row, col):
+            i = index.get((col["nodeType"], col["property"]))
+            return row["cells"][i]["value"] if i is not None else None
+
+        groups = {}
+        if not group_by:
+            groups["[]"] = ([], [])  # ohne Gruppierung gibt es immer genau eine Gruppe
+        for row in rows:
+            key = [cell_value(row, col) for col in group_by]
+            groups.setdefault(json.dumps(key, sort_keys=True, default=str), (key, []))[1].append(row)
+
+        result = []
+        for key, group_rows in groups.values():
+            values = []
+            for agg in aggregates:
+                if agg["property"] is None:
+                    values.append(len(group_rows))
+                    continue
+                column_values = [v for v in (cell_value(row, agg) for row in group_rows) if v is not None]
+                if agg["function"] == "count":
+                    values.append(len(column_values))
+                elif agg["function"] == "sum":
+                    values.append(sum(to_float_or_none(v) or 0.0 for v in column_values))
+                elif agg["function"] == "min":
+                    values.append(min(column_values, key=value_sort_key) if column_values else None)
+                else:
+                    values.append(max(column_values, key=value_sort_key) if column_values else None)
+            result.append({"key": key, "values": values})
+
+        result.sort(key=lambda g: [value_sort_key(v) for v in g["key"]])
+        return result
+
+    def compact_table(rows, columns):
+        """
+        Kompaktes Antwortformat (format=compact): jeder Knoten und jede Relation steht nur einmal
+        in der Antwort, die Zeilen verweisen nur noch per id darauf.
+
+        - nodeTypes:       Labels in Spaltenreihenfolge (ohne Duplikate)
+        - nodes:           {nodeId: {property: value}} für alle Knoten, die in einer Zeile vorkommen
+        - relations:       [[fromId, toId, relation], ...] ohne Duplikate
+        - relationSets:    Listen von Indizes in `relations`, eine pro Bucket
+        - rows:            pro Zeile die nodeId je Eintrag in nodeTypes (oder null)
+        - rowRelationSets: pro Zeile der Index in `relationSets`
+
+        Der Client (render_table.js) baut daraus wieder die Zellen im normalen Format.
+        """
+        node_types = list(dict.fromkeys(col["nodeType"] for col in columns))
+        type_index = {label: i for i, label in enumerate(node_types)}
+
+        nodes = {}
+        relations = []
+        relation_index = {}
+        relation_sets = []
+        relation_set_index = {}
+        compact_rows = []
+        row_relation_sets = []
+
+        last_relations = None
+        last_set = None
+        for row in rows:
+            node_ids = [None] * len(node_types)
+            for col, cell in zip(columns, row["cells"]):
+                node_id = cell["nodeId"]
+                if node_id is None:
+                    continue
+                node_ids[type_index[col["nodeType"]]] = node_id
+                props = nodes.setdefault(node_id, {})
+                if cell["value"] is not None:
+                    props[col["property"]] = cell["value"]
+
+            # alle Zeilen eines Buckets teilen sich dieselbe Relations-Liste
+            if row["relations"] is not last_relations:
+                last_relations = row["relations"]
+                indexes = []
+                for rel in last_relations:
+                    key = (rel.get("fromId"), rel.get("toId"), rel.get("relation"))
+                    if key not in relation_index:
+                        relation_index[key] = len(relations)
+                        relations.append(list(key))
+                    indexes.append(relation_index[key])
+                set_key = tuple(indexes)
+                if set_key not in relation_set_index:
+                    relation_set_index[set_key] = len(relation_sets)
+                    relation_sets.append(indexes)
+                last_set = relation_set_index[set_key]
+
+            compact_rows.append(node_ids)
+            row_relation_sets.append(last_set)
+
+        return {
+            "format": "compact",
+            "columns": columns,
+            "nodeTypes": node_types,
+            "nodes": nodes,
+            "relations": relations,
+            "relationSets": relation_sets,
+            "rows": compact_rows,
+            "rowRelationSets": row_relation_sets,
+        }
+
+    def table_cache_key(params):
+        """Normalisierte Parameter als Cache-Schlüssel (Reihenfolge von Filtern ist egal)."""
+        normalized = dict(params)
+        for key in ("filter_labels", "rel_filter"):
+            if normalized[key]:
+                normalized[key] = sorted(normalized[key])
+        return json.dumps(normalized, sort_keys=True, default=str)
+
+    def is_debug_request(req):
+        return req.args.get("debug", "").lower() in ("1", "true", "yes")
+
+    def build_buckets(graph_api, params, stats=None):
+        """
+        Baut die Buckets (ein Bucket pro Hauptknoten) und gibt (buckets, next_cursor) zurück.
+        Ohne `page_size` wird wie bisher die gesamte Ergebnismenge aufgebaut und next_cursor ist None.
+        """
+        if params["page_size"]:
+            return build_bucket_page(graph_api, params, stats)
+
+        selected_labels = params["selected_labels"]
+        main_label = params["main_label"]
+        limit = params["limit"]
+        where = params["where"]
+        where_params = params["where_params"]
+        filter_labels = params["filter_labels"]
+
+        paths = graph_api.fetch_paths(
+            selected_labels, main_label, params["max_depth"], limit,
+            params["anchor_where"], params["path_where"], params["rel_filter"], where_params=where_params
+        )
         if paths:
             buckets = extract_nodes_from_paths(paths, main_label, selected_labels, filter_labels)
         else:
             buckets = {}
-            for node in graph_api.fetch_nodes(main_label, limit, where):
+            for node in graph_api.fetch_nodes(main_label, limit, where, where_params=where_params):
                 add_node_to_bucket(buckets, node, main_label)
-        return ensure_all_labels_present(graph_api, buckets, selected_labels, filter_labels, limit, where, max_depth)
+        buckets = ensure_all_labels_present(graph_api, buckets, selected_labels, filter_labels, limit, where, params["max_depth"], stats, where_params=where_params)
+        return buckets, None
 
-    def ensure_all_labels_present(graph_api, buckets, selected_labels, filter_labels, limit, where, max_depth):
+    def build_bucket_page(graph_api, params, stats=None):
+        """
+        Keyset-Pagination über die ids der Hauptknoten: es werden nur die Buckets der aktuellen
+        Seite aufgebaut, der Aufwand hängt also von `page_size` ab und nicht von der Anzahl
+        aller Knoten des Hauptlabels.
+        """
+        selected_labels = params["selected_labels"]
+        main_label = params["main_label"]
+        max_depth = params["max_depth"]
+        where = params["where"]
+        where_params = params["where_params"]
+        rel_filter = params["rel_filter"]
+        filter_labels = params["filter_labels"]
+        page_size = params["page_size"]
+        after = params["after"]
+        page_order = params["page_order"]
+
+        # eine id mehr holen, um zu wissen, ob es eine weitere Seite gibt
+        anchor_where = params["anchor_where"]
+        path_where = params["path_where"]
+
+        page = graph_api.fetch_main_ids_page(selected_labels, main_label, max_depth, page_size + 1, after, anchor_where, path_where, rel_filter, where_params, page_order)
+
+        buckets = {}
+        if page:
+            page_ids = [mid for mid, _ in page[:page_size]]
+            paths = graph_api.fetch_paths(selected_labels, main_label, max_depth, None, anchor_where, path_where, rel_filter, page_ids, where_params)
+            buckets = extract_nodes_from_paths(paths, main_label, selected_labels, filter_labels, set(page_ids))
+            # Zeilen in Cursor-Reihenfolge ausgeben
+            buckets = {mid: buckets[mid] for mid in page_ids if mid in buckets}
+        elif after is None or not graph_api.fetch_main_ids_page(selected_labels, main_label, max_depth, 1, None, anchor_where, path_where, rel_filter, where_params):
+            # keine Pfade mit Hauptknoten vorhanden: direkt über die Knoten des Hauptlabels blättern
+            if page_order:
+                nodes = graph_api.fetch_nodes(main_label, page_size + 1, where, after, where_params, page_order)
+                page = [(node["id"], node["props"].get(page_order["property"])) for node in nodes]
+            else:
+                nodes = graph_api.fetch_nodes(main_label, page_size + 1, where, -1 if after is None else after, where_params)
+                page = [(node["id"], None) for node in nodes]
+            for node in nodes[:page_size]:
+                add_node_to_bucket(buckets, node, main_label)
+
+        next_cursor = None
+        if len(page) > page_size:
+            last_id, last_value = page[page_size - 1]
+            # sortierte Seiten brauchen Wert und id als Cursor, der Client reicht ihn unverändert zurück
+            next_cursor = json.dumps([encode_cursor_value(last_value), last_id]) if page_order else last_id
+
+        # Labels ohne jeden Treffer bei den Hauptknoten werden wie ohne Pagination global
+        # ergänzt, aber nur auf der ersten Seite: über die ids des Hauptlabels lassen sie sich
+        # nicht blättern und würden sonst auf jeder Seite wiederholt.
+        buckets = ensure_all_labels_present(graph_api, buckets, selected_labels, filter_labels, params["limit"], where, max_depth, stats, fill_missing_globally=after is None, where_params=where_params)
+        return buckets, next_cursor
+
+    def ensure_all_labels_present(graph_api, buckets, selected_labels, filter_labels, limit, where, max_depth, stats=None, fill_missing_globally=True, where_params=None):
         """
         Ensure requested labels are present:
-        - For each existing bucket attach nodes of requested labels that are related to that bucket's main node,
-        searching up to max_depth hops.
-        - For any requested label that still has no nodes attached to *any* bucket, fetch nodes globally and create buckets.
+        - For each requested label attach nodes of that label that are related to the buckets' main nodes,
+        searching up to max_depth hops. All main node ids of one label are sent in a single UNWIND query,
+        so the number of round-trips depends on the label count and not on the row count.
+        If `stats` is given, the round-trips of the old per-bucket lookup ("roundTripsBefore")
+        and of the batched lookup ("roundTripsAfter") are counted there.
+        - For any requested label that still has no nodes attached to *any* bucket, fetch nodes globally and create buckets
+        (unless `fill_missing_globally` is False).
         """
         required_labels = [lbl for lbl in selected_labels if not filter_labels or lbl in filter_labels]
 
-        # helper: build quick relation index from bucket.relations
-        def build_rel_index_for_bucket(bucket):
-            idx = {}
-            for rel in bucket.get("relations", []):
-                a, b = rel.get("fromId"), rel.get("toId")
-                if a is not None:
-                    idx.setdefault(a, set()).add(b)
-                if b is not None:
-                    idx.setdefault(b, set()).add(a)
-            return idx
-
         # determine depth for targeted queries (ensure at least 1)
         depth = max(1, int(max_depth) if max_depth is not None else 2)
 
-        # helper: query related nodes for one main node id and label using max depth
-        def query_related_nodes_cypher(lbl):
-            q = f"""
-                MATCH (m) WHERE id(m) = $mid
-                MATCH (m)-[*1..{depth}]-(n:`{lbl}`)
-            """
-            if where:
-                q += f" WHERE {where}"
-            q += " RETURN n"
-            if limit:
-                q += f" LIMIT {limit}"
-            return q
-
-        # 1) For each existing bucket, attach nodes of required labels that are connected to the main node
-        for main_id, bucket in list(buckets.items()):
-            for lbl in required_labels:
-                # skip if label already present in this bucket
-                if lbl in bucket.get("nodes", {}):
-                    continue
+        # 1) For each required label, attach related nodes to all buckets that miss it with one batched query
+        for lbl in required_labels:
+            # skip buckets where the label is already present
+            mids = [main_id for main_id, bucket in buckets.items() if lbl not in bucket.nodes]
+            if not mids:
+                continue
 
-                cypher = query_related_nodes_cypher(lbl)
-                try:
-                    recs = graph_api.driver.run(cypher, mid=main_id).data()
-                except Exception:
-                    # if the targeted query fails, skip attaching for this bucket/label
-                    continue
+            if stats is not None:
+                stats["roundTripsBefore"] += len(mids)
+                stats["roundTripsAfter"] += 1
 
-                for r in recs:
-                    n = r.get("n")
-                    if n is None:
-                        continue
-                    node_dict = graph_api._node_to_dict(n)
-                    node_dict["props"] = node_dict.get("props") or {}
+            try:
+                related = graph_api.fetch_related(lbl, mids, depth, limit, where, where_params)
+            except Neo4jError as e:
+                # if Neo4j rejects the batched query (e.g. `where` does not fit this label), skip
+                # attaching this label; programming errors (TypeError etc.) are not swallowed
+                print(f"fetch_related({lbl}) fehlgeschlagen, Label wird nicht angehängt: {e}")
+                continue
+
+            for mid, nodes in related.items():
+                bucket = buckets.get(mid)
+                if bucket is None:
+                    continue
+                for node_dict in nodes:
                     node_id = node_dict.get("id")
                     if node_id is None:
                         continue
                     # Attach into this bucket's nodes map (do NOT create a new top-level bucket)
                     # Use a small distance (1..depth) — we set distance=1 for attached related nodes to prefer them
-                    store_or_update_node(bucket.setdefault("nodes", {}), node_id, lbl, node_dict.get("props", {}), 1)
+                    bucket.store_node(node_id, lbl, node_dict.get("props") or {}, 1)
+
+        if not fill_missing_globally:
+            return buckets
 
         # 2) After attachment: if a label still has zero nodes attached to any bucket, fetch globally and create buckets
-        labels_with_nodes = {lbl for bucket in buckets.values() for lbl in bucket.get("nodes", {})}
+        labels_with_nodes = {lbl for bucket in buckets.values() for lbl in bucket.nodes}
         missing_globally = [lbl for lbl in required_labels if lbl not in labels_with_nodes]
 
         for lbl in missing_globally:
             try:
-                global_nodes = graph_api.fetch_nodes(lbl, limit, where)
+                global_nodes = graph_api.fetch_nodes(lbl, limit, where, where_params=where_params)
             except Exception:
                 global_nodes = []
             for node in global_nodes:
@@ -186,151 +750,41 @@ def create_get_data_bp(graph):
 
         return buckets
 
-    def assemble_table_rows(buckets, columns):
+    def qb_to_cypher(qb, main_label=None):
         """
-        Build rows from buckets.
-
-        Dynamic rules (no hardcoded label names):
-        - By default produce a single row per bucket (per main node),
-            picking for each label the node with minimal min_dist.
-        - If some label L in the bucket has multiple nodes AND those
-            L-nodes have distinct related nodes for other labels (i.e. each
-            Bestellung links to its own Shipment), then expand rows
-            by L (one row per L-node). To avoid explosion we choose
-            a single pivot label to expand (the one with the most nodes).
-        """
-        rows = []
-
-        for bucket in buckets.values():
-            nodes_by_label = bucket.get("nodes", {})  # label -> {nodeid: {props, min_dist}}
-            relations = bucket.get("relations", [])
-
-            # detect labels that have >1 node
-            candidate_multi = {label for label, nodes in nodes_by_label.items() if len(nodes) > 1}
-
-            # determine whether a candidate label should actually trigger an expansion:
-            # expansion is warranted if nodes of that label have differing mappings to nodes of other labels.
-            def build_relation_index():
-                # map from node id -> set of directly related node ids (from bucket['relations'])
-                rel_index = {}
-                for rel in relations:
-                    a, b = rel.get("fromId"), rel.get("toId")
-                    if a is not None:
-                        rel_index.setdefault(a, set()).add(b)
-                    if b is not None:
-                        rel_index.setdefault(b, set()).add(a)
-                return rel_index
-
-            rel_index = build_relation_index()
-
-            def related_nodes_of_type(node_id, target_label):
-                """Return set of node ids of `target_label` that are related to node_id (and exist in bucket)."""
-                related = rel_index.get(node_id, set())
-                # intersect with nodes_by_label[target_label] keys
-                targets = nodes_by_label.get(target_label, {})
-                return set(nid for nid in related if nid in targets)
-
-            expansion_candidates = set()
-            for L in candidate_multi:
-                # for label L, check whether L-nodes have distinct relations to any other label
-                L_node_ids = list(nodes_by_label[L].keys())
-                for other_label in nodes_by_label.keys():
-                    if other_label == L:
-                        continue
-                    # build mapping Lnode -> set of related other_label nodes
-                    mapping = [frozenset(related_nodes_of_type(nid, other_label)) for nid in L_node_ids]
-                    # if mapping differs across L nodes and at least one mapping is non-empty, expand
-                    if any(m for m in mapping) and (len(set(mapping)) > 1):
-                        expansion_candidates.add(L)
-                        break  # no need to check other labels for this L
-
-            if expansion_candidates:
-                # pick a single pivot to expand by (the label with the most nodes) to keep things bounded
-                pivot_label = max(expansion_candidates, key=lambda l: len(nodes_by_label.get(l, {})))
-                pivot_items = list(nodes_by_label.get(pivot_label, {}).items())  # [(nodeid, data), ...]
-
-                # for each pivot node, create one row and try to attach related nodes for other labels
-                for pivot_node_id, pivot_node_data in pivot_items:
-                    cells = []
-                    for col in columns:
-                        label = col["nodeType"]
-                        prop = col["property"]
-                        node_map = nodes_by_label.get(label, {})
-
-                        if not node_map:
-                            cells.append({"value": None, "nodeId": None, "nodeType": label})
-                            continue
-
-                        if label == pivot_label:
-                            # use the pivot node
-                            node_id = pivot_node_id
-                            node_data = pivot_node_data
-                        else:
-                            # first try to find nodes of this label directly related to the pivot node
-                            related = related_nodes_of_type(pivot_node_id, label)
-                            if related:
-                                # if multiple related, choose the one with minimal min_dist
-                                best_id = min(related, key=lambda nid: node_map[nid].get("min_dist", 1e9))
-                                node_id = best_id
-                                node_data = node_map[node_id]
-                            else:
-                                # fallback: choose the best node by min_dist (conservative)
-                                node_id, node_data = min(node_map.items(), key=lambda x: x[1].get("min_dist", 1e9))
-
-                        value = node_data.get("props", {}).get(prop) if prop is not None else None
-                        cells.append({"value": value, "nodeId": node_id, "nodeType": label})
-
-                    rows.append({"cells": cells, "relations": relations})
-            else:
-                # no expansion needed: single row per bucket, pick best node per label by min_dist
-                cells = []
-                for col in columns:
-                    label = col["nodeType"]
-                    prop = col["property"]
-                    node_map = nodes_by_label.get(label, {})
-                    if not node_map:
-                        cells.append({"value": None, "nodeId": None, "nodeType": label})
-                        continue
-                    node_id, node_data = min(node_map.items(), key=lambda x: x[1].get("min_dist", 1e9))
-                    value = node_data.get("props", {}).get(prop) if prop is not None else None
-                    cells.append({"value": value, "nodeId": node_id, "nodeType": label})
-                rows.append({"cells": cells, "relations": relations})
+        Übersetzt die QueryBuilder-JSON in eine WHERE-Bedingung auf `n` und ein Parameter-Dict.
+        Die Werte landen als $p0, $p1, ... in den Parametern und nicht im Query-Text, damit
+        gleich aufgebaute Suchen denselben Statement-Text haben und Neo4j den Plan-Cache nutzt.
 
-        return rows
+        Zusätzlich wird die Bedingung für die verankerte Pfadsuche aufgeteilt: Regeln auf Feldern
+        des Hauptlabels (z.B. "Person.name" bei main_label "Person") werden als `anchor_where`
+        direkt auf dem Anker geprüft, der Rest als `path_where` auf den Knoten des Pfades.
 
-    def extract_table_columns(buckets):
-        if not buckets:
-            return []
-        label_property_pairs = {
-            (label, prop)
-            for bucket in buckets.values()
-            for label, node_map in bucket.get("nodes", {}).items()
-            for node_data in node_map.values()
-            for prop in node_data.get("props", {})
-        }
-        if not label_property_pairs:
-            return []
-        return [
-            {"nodeType": label, "property": prop}
-            for label, prop in sorted(label_property_pairs, key=lambda x: (x[0], str(x[1])))
-        ]
-
-    def qb_to_cypher(qb):
+        Gibt (where, params, anchor_where, path_where) zurück, where ist None wenn es keine Regeln gibt.
+        """
         if not qb.get("valid"):
-            return None
+            return None, {}, None, None
+
+        params = {}
+
+        def param(v):
+            name = f"p{len(params)}"
+            params[name] = v
+            return f"${name}"
 
         def parse_rule(rule):
             field = rule["field"]
             op = rule["operator"]
             value = rule.get("value")
             field_name = field.split('.')[-1]
+            prop = f"n.{quote_identifier(field_name)}"
 
             # Helper für string comparison case-insensitive
             def ci_value(v):
                 if isinstance(v, str):
-                    return f"'{v.lower()}'"
+                    return param(v.lower())
 
-                return str(v)
+                return param(v)
 
             if op in {"equal", "not_equal", "less", "less_or_equal", "greater", "greater_or_equal"}:
                 op_map = {
@@ -344,53 +798,78 @@ def create_get_data_bp(graph):
                 cypher_op = op_map[op]
                 # nur Strings case-insensitive machen
                 if isinstance(value, str):
-                    return f"TOLOWER(n.`{field_name}`) {cypher_op} {ci_value(value)}"
+                    return f"TOLOWER({prop}) {cypher_op} {ci_value(value)}"
 
-                return f"n.`{field_name}` {cypher_op} {ci_value(value)}"
+                return f"{prop} {cypher_op} {ci_value(value)}"
 
             elif op == "contains":
-                return f"TOLOWER(n.`{field_name}`) CONTAINS '{value.lower()}'"
+                return f"TOLOWER({prop}) CONTAINS {ci_value(value)}"
             elif op == "begins_with":
-                return f"TOLOWER(n.`{field_name}`) STARTS WITH '{value.lower()}'"
+                return f"TOLOWER({prop}) STARTS WITH {ci_value(value)}"
             elif op == "ends_with":
-                return f"TOLOWER(n.`{field_name}`) ENDS WITH '{value.lower()}'"
+                return f"TOLOWER({prop}) ENDS WITH {ci_value(value)}"
 
             elif op == "not_contains":
-                return f"NOT TOLOWER(n.`{field_name}`) CONTAINS '{value.lower()}'"
+                return f"NOT TOLOWER({prop}) CONTAINS {ci_value(value)}"
             elif op == "not_begins_with":
-                return f"NOT TOLOWER(n.`{field_name}`) STARTS WITH '{value.lower()}'"
+                return f"NOT TOLOWER({prop}) STARTS WITH {ci_value(value)}"
             elif op == "not_ends_with":
-                return f"NOT TOLOWER(n.`{field_name}`) ENDS WITH '{value.lower()}'"
+                return f"NOT TOLOWER({prop}) ENDS WITH {ci_value(value)}"
 
             elif op == "in":
                 if not isinstance(value, (list, tuple)):
                     raise ValueError("Operator 'in' requires a list of values")
-                value_list = ', '.join(f"'{v.lower()}'" for v in value)
-                return f"TOLOWER(n.`{field_name}`) IN [{value_list}]"
+                return f"TOLOWER({prop}) IN {param([v.lower() for v in value])}"
             elif op == "not_in":
                 if not isinstance(value, (list, tuple)):
                     raise ValueError("Operator 'not_in' requires a list of values")
-                value_list = ', '.join(f"'{v.lower()}'" for v in value)
-                return f"NOT TOLOWER(n.`{field_name}`) IN [{value_list}]"
+                return f"NOT TOLOWER({prop}) IN {param([v.lower() for v in value])}"
 
             elif op == "is_empty":
-                return f"n.`{field_name}` = ''"
+                return f"{prop} = ''"
             elif op == "is_not_empty":
-                return f"n.`{field_name}` <> ''"
+                return f"{prop} <> ''"
 
             elif op == "is_null":
-                return f"n.`{field_name}` IS NULL"
+                return f"{prop} IS NULL"
             elif op == "is_not_null":
-                return f"n.`{field_name}` IS NOT NULL"
+                return f"{prop} IS NOT NULL"
 
             raise ValueError(f"Unsupported operator: {op}")
 
         if "rules" in qb and qb["rules"]:
             parsed_rules = [parse_rule(r) for r in qb["rules"]]
             condition = qb.get("condition", "AND").upper()
-            return f" {condition} ".join(parsed_rules)
+            if condition not in ("AND", "OR"):
+                raise ValueError(f"Unsupported condition: {condition}")
+            where = f" {condition} ".join(parsed_rules)
 
-        return None
+            rule_labels = [r["field"].split('.')[0] if '.' in r["field"] else None for r in qb["rules"]]
+            anchor_where, path_where = split_where_for_anchor(parsed_rules, rule_labels, condition, main_label)
+            return where, params, anchor_where, path_where
+
+        return None, {}, None, None
+
+    def split_where_for_anchor(parsed_rules, rule_labels, condition, main_label):
+        """
+        Teilt die Regeln in (anchor_where, path_where) auf.
+        Bei AND dürfen die Regeln des Hauptlabels vor die Expansion gezogen werden,
+        bei OR nur dann, wenn sich alle Regeln auf das Hauptlabel beziehen.
+        """
+        where = f" {condition} ".join(parsed_rules)
+        if main_label is None:
+            return None, where
+
+        anchor_rules = [rule for rule, label in zip(parsed_rules, rule_labels) if label == main_label]
+        path_rules = [rule for rule, label in zip(parsed_rules, rule_labels) if label != main_label]
+
+        if not path_rules:
+            return where, None
+
+        if condition == "OR" or not anchor_rules:
+            return None, where
+
+        return " AND ".join(anchor_rules), " AND ".join(path_rules)
 
     def parse_request_params(req):
         nodes_param = req.args.get("nodes")
@@ -403,6 +882,60 @@ def create_get_data_bp(graph):
         limit_raw = req.args.get("limit")
         limit = int(limit_raw) if limit_raw else None
 
+        # Keyset-Pagination: after=<id des letzten Hauptknotens>&pageSize=N
+        page_size_raw = req.args.get("pageSize")
+        page_size = int(page_size_raw) if page_size_raw else None
+        if page_size is not None and page_size < 1:
+            raise ValueError("Parameter 'pageSize' must be >= 1")
+
+        # Sortierung: orderBy=Person.name:desc,Stadt.stadt
+        order_by = []
+        order_by_raw = req.args.get("orderBy")
+        if order_by_raw:
+            for part in order_by_raw.split(","):
+                ref, sep, direction = part.strip().rpartition(":")
+                if not sep or direction.lower() not in ("asc", "desc"):
+                    ref, direction = part.strip(), "asc"
+                order_by.append({**parse_column_ref(ref, selected_labels), "direction": direction.lower()})
+
+        # beim Blättern kann nur nach einer Property des Hauptlabels in Cypher sortiert werden
+        page_order = order_by[0] if page_size and order_by and order_by[0]["nodeType"] == main_label else None
+
+        after_raw = req.args.get("after")
+        after = None
+        if after_raw:
+            if page_order:
+                after = json.loads(after_raw)
+                if not isinstance(after, list) or len(after) != 2:
+                    raise ValueError("Parameter 'after' must be the nextCursor of the previous page")
+                after = (decode_cursor_value(after[0]), int(after[1]))
+            else:
+                after = int(after_raw)
+
+        # Gruppierung/Aggregation: groupBy=Person.geschlecht&agg=count,sum:Person.alter
+        group_by_raw = req.args.get("groupBy")
+        group_by = [parse_column_ref(ref, selected_labels) for ref in group_by_raw.split(",")] if group_by_raw else []
+        aggregates = []
+        agg_raw = req.args.get("agg")
+        if agg_raw:
+            for part in agg_raw.split(","):
+                function, _, ref = part.strip().partition(":")
+                function = function.lower()
+                if function not in AGGREGATE_FUNCTIONS:
+                    raise ValueError(f"Unsupported aggregate: {function}")
+                if ref:
+                    aggregates.append({"function": function, **parse_column_ref(ref, selected_labels)})
+                elif function == "count":
+                    aggregates.append({"function": "count", "nodeType": None, "property": None})
+                else:
+                    raise ValueError(f"Aggregate '{function}' needs a column, e.g. {function}:{main_label}.property")
+        if group_by and not aggregates:
+            aggregates.append({"function": "count", "nodeType": None, "property": None})
+
+        output_format = req.args.get("format", "json").strip().lower()
+        if output_format not in ("json", "ndjson", "compact"):
+            raise ValueError(f"Unsupported format: {output_format}")
+
         filter_labels_raw = req.args.get("filterLabels")
         filter_labels = [l.strip() for l in filter_labels_raw.split(",")] if filter_labels_raw else None
 
@@ -411,91 +944,49 @@ def create_get_data_bp(graph):
 
         qb_raw = req.args.get("qb")
         where = None
+        where_params = {}
+        anchor_where = None
+        path_where = None
         if qb_raw and qb_raw.lower() != "null":
             qb_json = json.loads(qb_raw)
             if qb_json:  # prüfen, dass es nicht None ist
-                where = qb_to_cypher(qb_json)
+                where, where_params, anchor_where, path_where = qb_to_cypher(qb_json, main_label)
 
-        # allow manual where override
+        # allow manual where override (wird wie bisher auf den Knoten des Pfades geprüft)
         manual_where = req.args.get("where")
         if manual_where:
             where = manual_where
+            where_params = {}
+            anchor_where = None
+            path_where = manual_where
+
+        return {
+            "selected_labels": selected_labels,
+            "main_label": main_label,
+            "max_depth": max_depth,
+            "limit": limit,
+            "filter_labels": filter_labels,
+            "where": where,
+            "where_params": where_params,
+            "anchor_where": anchor_where,
+            "path_where": path_where,
+            "rel_filter": rel_filter,
+            "page_size": page_size,
+            "after": after,
+            "format": output_format,
+            "order_by": order_by,
+            "page_order": page_order,
+            "group_by": group_by,
+            "aggregates": aggregates,
+        }
 
-        return selected_labels, main_label, max_depth, limit, filter_labels, where, rel_filter
-
-    def extract_nodes_from_paths(paths, main_label, selected_labels, filter_labels=None):
-        buckets = {}
-        for p in paths:
-            nodes, rels = p["nodes"], p["rels"]
-            for idx, node in enumerate(nodes):
-                if main_label in node["labels"]:
-                    bucket = buckets.setdefault(node["id"], {"nodes": {}, "adjacent": set(), "relations": []})
-                    add_path_nodes_to_bucket(bucket, nodes, idx, selected_labels, filter_labels)
-                    add_path_relations_to_bucket(bucket, node["id"], rels)
-        return buckets
-
-    def add_path_nodes_to_bucket(bucket, node_list, main_index, selected_labels, filter_labels=None):
-        for idx, node in enumerate(node_list):
-            node_id = node["id"]
-            if node_id is None:
-                continue
-            labels = [l for l in node["labels"] if l in selected_labels]
-            labels = [l for l in labels if not filter_labels or l in filter_labels]
-            for label in labels:
-                store_or_update_node(bucket.setdefault("nodes", {}), node_id, label, node["props"], abs(idx - main_index))
-
-    def add_path_relations_to_bucket(bucket, main_id, relationships):
-        for rel in relationships:
-            from_id, to_id = rel["fromId"], rel["toId"]
-            if from_id is None or to_id is None:
-                continue
-            add_relation(bucket, main_id, from_id, to_id, rel["type"])
-
-    def add_relation(bucket, main_id, from_id, to_id, relation_name):
-        rel = {"fromId": from_id, "toId": to_id, "relation": relation_name}
-        if rel not in bucket.get("relations", []):
-            bucket["relations"].append(rel)
-        if from_id == main_id:
-            bucket["adjacent"].add(to_id)
-        if to_id == main_id:
-            bucket["adjacent"].add(from_id)
-
-    def build_cells_for_bucket(bucket, columns):
-        return [build_cell(bucket, col) for col in columns]
-
-    def build_cell(bucket, col):
-        node_candidates = bucket.get("nodes", {}).get(col["nodeType"], {})
-        chosen = select_best_node(node_candidates, bucket.get("adjacent", set()))
-        value = None
-        if chosen:
-            props = chosen[1].get("props", {})
-            if col["property"] is not None:
-                value = props.get(col["property"])
-        return {"value": value, "nodeId": chosen[0] if chosen else None}
-
-    def select_best_node(nodes_map, adjacent_nodes):
-        if not nodes_map:
-            return None
-        # 1) direkt benachbarte Nodes priorisieren
-        direct_candidates = {nid: data for nid, data in nodes_map.items() if data.get("min_dist", 1e9) == 1}
-        if direct_candidates:
-            return min(direct_candidates.items(), key=lambda x: x[1].get("min_dist", 1e9))
-        # 2) wenn keine direkten, fallback auf adjacents
-        candidates = {nid: data for nid, data in nodes_map.items() if nid in adjacent_nodes} or nodes_map
-        return min(candidates.items(), key=lambda x: x[1].get("min_dist", 1e9))
-
-    def store_or_update_node(bucket_nodes, node_id, label, props, distance):
-        node_map = bucket_nodes.setdefault(label, {})
-        existing = node_map.get(node_id)
-        if not existing or distance < existing.get("min_dist", 1e9):
-            node_map[node_id] = {"props": props, "min_dist": distance}
-
-    def add_node_to_bucket(buckets, node, label):
-        node_id = node["id"]
-        if node_id is None:
-            return
-        bucket = buckets.setdefault(node_id, {"nodes": {}, "adjacent": set(), "relations": []})
-        # Node korrekt speichern
-        bucket["nodes"].setdefault(label, {})[node_id] = {"props": node.get("props", {}), "min_dist": 0}
+    def parse_column_ref(ref, selected_labels):
+        """'Label.property' -> Spalte im Format von extract_table_columns."""
+        label, sep, prop = ref.strip().partition(".")
+        if not sep or not label or not prop:
+            raise ValueError(f"Invalid column '{ref}', expected Label.property")
+        if label not in selected_labels:
+            raise ValueError(f"Label '{label}' is not part of 'nodes'")
+        return {"nodeType": label, "property": prop}
 
     return bp
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
 from oasis_helper import conditional_login_required
+import statements
 
 def create_graph_data_bp(graph):
     bp = Blueprint("graph_data", __name__)
@@ -10,14 +11,8 @@ def create_graph_data_bp(graph):
         if graph is None:
             return jsonify({"error": "Neo4j connection not available"}), 500
 
-        query = """
-        MATCH (n)
-        OPTIONAL MATCH (n)-[r]->(m)
-        RETURN n, m, r, ID(n) AS n_id, ID(m) AS m_id, ID(r) AS r_id
-        """
-
         try:
-            result = graph.run(query)
+            result = statements.GRAPH_DATA.run(graph)
 
             nodes = {}
             links = []
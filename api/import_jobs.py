@@ -0,0 +1,48 @@
+from flask import Blueprint, request, jsonify, session, url_for
+from oasis_helper import conditional_login_required
+from import_job_manager import import_jobs
+from upload_spool import upload_spool
+
+def create_import_jobs_bp(graph):
+    bp = Blueprint("import_jobs", __name__)
+
+    @bp.route('/import_jobs', methods=['POST'])
+    @conditional_login_required
+    def submit_import_job():
+        """
+        Startet den Import des Uploads aus der Session mit dem Mapping aus dem Body im
+        Hintergrund und antwortet sofort mit der Job-id (202).
+        """
+        mapping_data = request.get_json(silent=True)
+        if not mapping_data:
+            return jsonify({"status": "error", "message": "Mapping fehlt"}), 400
+
+        if 'upload_id' not in session and 'raw_data' not in session:
+            return jsonify({"status": "error", "message": "raw_data not in session."}), 400
+
+        upload_id = session.pop('upload_id', None)
+        if upload_id is not None and not upload_spool.exists(upload_id):
+            return jsonify({"status": "error", "message": "Upload ist abgelaufen, bitte die Daten erneut hochladen."}), 410
+
+        try:
+            job = import_jobs.submit(graph, mapping_data, upload_id=upload_id, raw_data=session.pop('raw_data', None))
+        except Exception as e:
+            print(f"Fehler beim Starten des Imports: {e}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+        return jsonify({
+            "status": "queued",
+            "jobId": job.id,
+            "statusUrl": url_for("import_jobs.import_job_status", job_id=job.id)
+        }), 202
+
+    @bp.route('/import_jobs/<job_id>', methods=['GET'])
+    @conditional_login_required
+    def import_job_status(job_id):
+        """Fortschritt eines Imports: verarbeitete Zeilen, Zeilen/s, ETA und Fehler."""
+        job = import_jobs.get(job_id)
+        if job is None:
+            return jsonify({"status": "error", "message": f"Import-Job {job_id} nicht gefunden"}), 404
+        return jsonify(job.status())
+
+    return bp
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
 from oasis_helper import conditional_login_required
+import statements
 
 def create_labels_bp(graph):
     bp = Blueprint("labels_bp", __name__)
@@ -10,12 +11,7 @@ def create_labels_bp(graph):
 
         def fetch_labels(self):
             try:
-                records = self.driver.run("""
-                    MATCH (n)
-                    WITH DISTINCT labels(n) AS lbls
-                    UNWIND lbls AS lbl
-                    RETURN DISTINCT lbl ORDER BY lbl
-                """).data()
+                records = statements.LABELS.run(self.driver).data()
                 return [r["lbl"] for r in records]
             except Exception as e:
                 raise RuntimeError(f"Neo4j error fetching labels: {e}") from e
@@ -1,9 +1,24 @@
 from flask import Blueprint, jsonify, request
 from oasis_helper import conditional_login_required
+import statements
 
 def create_properties_bp(graph):
     bp = Blueprint("properties_bp", __name__)
 
+    def sample_type(val):
+        """Typ einer Property anhand eines Beispielwerts schätzen."""
+        if isinstance(val, bool):
+            return "Boolean"
+        if isinstance(val, int):
+            return "Integer"
+        if isinstance(val, float):
+            return "Float"
+        if isinstance(val, str):
+            return "String"
+        if isinstance(val, list):
+            return "List"
+        return "Unknown"
+
     class GraphAPI:
         def __init__(self, driver):
             self.driver = driver
@@ -14,41 +29,13 @@ def create_properties_bp(graph):
 
             try:
                 # Mit APOC: liefert uns saubere Typen
-                query = f"""
-                MATCH (n:{label})
-                UNWIND keys(n) AS key
-                RETURN DISTINCT key, apoc.meta.type(n[key]) AS type
-                ORDER BY key
-                """
-                records = self.driver.run(query).data()
+                records = statements.PROPERTY_TYPES_APOC.run(self.driver, label=label).data()
                 return [{"property": r["key"], "type": r["type"]} for r in records]
 
             except Exception:
                 # Fallback: ohne APOC, wir schätzen Typen
-                query = f"""
-                MATCH (n:{label})
-                UNWIND keys(n) AS key
-                RETURN DISTINCT key, head(collect(n[key])) AS sample
-                ORDER BY key
-                """
-                records = self.driver.run(query).data()
-                props = []
-                for r in records:
-                    val = r.get("sample")
-                    if isinstance(val, bool):
-                        t = "Boolean"
-                    elif isinstance(val, int):
-                        t = "Integer"
-                    elif isinstance(val, float):
-                        t = "Float"
-                    elif isinstance(val, str):
-                        t = "String"
-                    elif isinstance(val, list):
-                        t = "List"
-                    else:
-                        t = "Unknown"
-                    props.append({"property": r["key"], "type": t})
-                return props
+                records = statements.PROPERTY_SAMPLES.run(self.driver, label=label).data()
+                return [{"property": r["key"], "type": sample_type(r.get("sample"))} for r in records]
 
     graph_api = GraphAPI(graph)
 
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
 from oasis_helper import conditional_login_required
+import statements
 
 def create_relationships_bp(graph):
     bp = Blueprint("relationships_bp", __name__)
@@ -11,18 +12,14 @@ def create_relationships_bp(graph):
         def fetch_relationships(self):
             try:
                 # probiere system call
-                records = self.driver.run("CALL db.relationshipTypes()").data()
+                records = statements.DB_RELATIONSHIP_TYPES.run(self.driver).data()
                 rels = [r["relationshipType"] for r in records if "relationshipType" in r]
                 if rels:
                     return sorted(set(rels))
             except Exception:
                 # fallback: aus existierenden relationships ziehen
                 try:
-                    query = """
-                    MATCH ()-[r]->()
-                    RETURN DISTINCT type(r) AS rel_type
-                    """
-                    records = self.driver.run(query).data()
+                    records = statements.RELATIONSHIP_TYPES_SCAN.run(self.driver).data()
                     rels = [r["rel_type"] for r in records if r.get("rel_type")]
                     return sorted(set(rels))
                 except Exception as e:
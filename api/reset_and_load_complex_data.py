@@ -3,6 +3,8 @@ import random
 from flask import Blueprint, jsonify
 from faker import Faker
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 fake = Faker()
 
@@ -10,29 +12,21 @@ def create_complex_data_bp(graph):
     bp = Blueprint("complex_data", __name__)
 
     def fn_clear_database():
-        graph.run("MATCH (n) DETACH DELETE n")
+        statements.DELETE_ALL.run(graph)
 
     # --- Entity Creators ---
     def fn_create_node(label, props):
-        query = f"CREATE (n:{label} $props) RETURN ID(n) AS id"
-        result = graph.run(query, props=props).data()
+        result = statements.SAMPLE_CREATE_NODE.run(graph, {"props": props}, label=label).data()
         return result[0]["id"]
 
-    def fn_create_relationship(from_id, to_label, to_props, rel_type, rel_props=None):
-        props_str = ""
-        if rel_props:
-            props_str = " {" + ", ".join(f"{k}: ${k}" for k in rel_props.keys()) + "}"
-        query = f"""
-            MATCH (f) WHERE ID(f)=$fid
-            MATCH (t:{to_label} {{{', '.join(f'{k}: ${k}' for k in to_props.keys())}}})
-            MERGE (f)-[r:{rel_type}{props_str}]->(t)
-        """
-        params = {"fid": from_id}
-        if to_props:
-            params.update(to_props)
-        if rel_props:
-            params.update(rel_props)
-        graph.run(query, **params)
+    def fn_create_relationship(from_id, to_label, to_props, rel_type, role=None):
+        # to_props: genau eine Property, über die der Zielknoten gefunden wird
+        (to_key, to_value), = to_props.items()
+        params = {"fid": from_id, "to_value": to_value}
+        if role is None:
+            statements.SAMPLE_RELATE.run(graph, params, to_label=to_label, to_key=to_key, rel_type=rel_type)
+        else:
+            statements.SAMPLE_RELATE_WITH_ROLE.run(graph, {**params, "rolle": role}, to_label=to_label, to_key=to_key, rel_type=rel_type)
 
     @bp.route('/reset_and_load_complex_data')
     @conditional_login_required
@@ -127,7 +121,7 @@ def create_complex_data_bp(graph):
                 book_ids[props["titel"]] = bid
                 # Autor zufällig
                 autor_key = random.choice(list(person_ids.keys()))
-                fn_create_relationship(person_ids[autor_key], "Buch", {"titel": props["titel"]}, "HAT_GESCHRIEBEN", {"rolle":"Autor"})
+                fn_create_relationship(person_ids[autor_key], "Buch", {"titel": props["titel"]}, "HAT_GESCHRIEBEN", "Autor")
 
             # --- Events ---
             event_ids = {}
@@ -147,12 +141,14 @@ def create_complex_data_bp(graph):
                 # Teilnehmer zufällig
                 for _ in range(random.randint(5,30)):
                     person_key = random.choice(list(person_ids.keys()))
-                    fn_create_relationship(person_ids[person_key], "Event", {"name": props["name"]}, "NIMMT_TEIL_AN", {"rolle": random.choice(["Speaker","Attendee","Organizer"])})
+                    fn_create_relationship(person_ids[person_key], "Event", {"name": props["name"]}, "NIMMT_TEIL_AN", random.choice(["Speaker","Attendee","Organizer"]))
 
             return jsonify({"status":"success","message":"Sehr komplexer Datensatz erstellt mit vielen Entity-Typen!"})
 
         except Exception as e:
             logging.exception("Error loading complex data")
             return jsonify({"status":"error","message":str(e)}),500
+        finally:
+            bump_write_generation()
 
     return bp
@@ -1,66 +1,37 @@
 from flask import Blueprint, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_reset_and_load_data_bp(graph):
     bp = Blueprint("reset_and_load_data", __name__)
 
     def fn_clear_database():
-        query = """
-            MATCH (n)
-            DETACH DELETE n
-        """
-        graph.run(query)
+        statements.DELETE_ALL.run(graph)
 
     def fn_create_person(vorname, nachname):
-        query = """
-            CREATE (p:Person {vorname:$vorname, nachname:$nachname})
-            RETURN ID(p) AS id
-        """
-        result = graph.run(query, vorname=vorname, nachname=nachname).data()
+        result = statements.SAMPLE_CREATE_PERSON.run(graph, {"vorname": vorname, "nachname": nachname}).data()
         person_id = result[0]["id"]
         return person_id
 
     def fn_create_relation_lives_in(person_vorname, person_nachname, ort_id):
-        query = """
-            MATCH (p:Person {vorname:$vorname, nachname:$nachname})
-            MATCH (o:Ort) WHERE ID(o)=$ort_id
-            MERGE (p)-[:WOHNT_IN]->(o)
-        """
-        graph.run(query, vorname=person_vorname, nachname=person_nachname, ort_id=ort_id)
+        statements.SAMPLE_PERSON_LIVES_IN.run(graph, {"vorname": person_vorname, "nachname": person_nachname, "ort_id": ort_id})
 
     def fn_create_relation_located_in(ort_id, stadt_name):
-        query = """
-            MATCH (o:Ort) WHERE ID(o)=$ort_id
-            MATCH (s:Stadt {name:$stadt})
-            MERGE (o)-[:LIEGT_IN]->(s)
-        """
-        graph.run(query, ort_id=ort_id, stadt=stadt_name)
+        statements.SAMPLE_ORT_LOCATED_IN.run(graph, {"ort_id": ort_id, "stadt": stadt_name})
 
     def fn_create_address(street, plz):
-        query = """
-            CREATE (o:Ort {straße:$street, plz:$plz})
-            RETURN ID(o) AS id
-        """
-        result = graph.run(query, street=street, plz=plz).data()
+        result = statements.SAMPLE_CREATE_ADDRESS.run(graph, {"street": street, "plz": plz}).data()
         addr_id = result[0]["id"]
         return addr_id
 
     def fn_create_book(title, year):
-        query = """
-            CREATE (b:Buch {titel:$title, erscheinungsjahr:$year})
-            RETURN ID(b) AS id
-        """
-        result = graph.run(query, title=title, year=year).data()
+        result = statements.SAMPLE_CREATE_BOOK.run(graph, {"title": title, "year": year}).data()
         book_id = result[0]["id"]
         return book_id
 
     def fn_create_relation_has_written(person_vorname, person_nachname, book_title):
-        query = """
-            MATCH (p:Person {vorname:$vorname, nachname:$nachname})
-            MATCH (b:Buch {titel:$title})
-            MERGE (p)-[:HAT_GESCHRIEBEN]->(b)
-        """
-        graph.run(query, vorname=person_vorname, nachname=person_nachname, title=book_title)
+        statements.SAMPLE_HAS_WRITTEN.run(graph, {"vorname": person_vorname, "nachname": person_nachname, "title": book_title})
 
     @bp.route('/reset_and_load_data')
     @conditional_login_required
@@ -102,5 +73,7 @@ def create_reset_and_load_data_bp(graph):
 
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500
+        finally:
+            bump_write_generation()
 
     return bp
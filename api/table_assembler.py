@@ -0,0 +1,362 @@
+"""
+Zusammensetzen der Tabelle für /api/get_data_as_table aus Pfaden bzw. Knoten.
+
+Pro Hauptknoten gibt es einen Bucket mit den Knoten aller ausgewählten Labels (samt Abstand
+zum Hauptknoten) und den Relationen dazwischen. Aus jedem Bucket entstehen eine oder (bei
+Pivot-Expansion) mehrere Tabellenzeilen.
+
+Für große Buckets werden Pivot-Erkennung und Knotenauswahl mit NumPy auf dichten
+Index-Arrays gerechnet (DenseBucket), kleine Buckets bleiben bei den Python-Sets, weil dort
+der Aufbau der Arrays teurer ist als die Rechnung. Sehr breite Buckets ebenfalls, die
+Nachbar-Matrizen wachsen mit |Label| x Knoten. Beide Wege liefern dieselben Zeilen.
+"""
+import os
+
+import numpy as np
+
+# ab so vielen Knoten in einem Bucket wird mit NumPy gerechnet (0 = immer, -1 = nie)
+DENSE_MIN_NODES = int(os.getenv("OASIS_TABLE_DENSE_MIN_NODES", "64"))
+
+# größte Nachbar-Matrix (|Label| x Knoten im Bucket), bis zu der mit NumPy gerechnet wird;
+# darüber kostet sie (als bool, in row_choices zusätzlich als float64) mehr Speicher als die Sets
+DENSE_MAX_CELLS = int(os.getenv("OASIS_TABLE_DENSE_MAX_CELLS", "4000000"))
+
+class NodeEntry:
+    __slots__ = ("props", "min_dist")
+
+    def __init__(self, props, min_dist):
+        self.props = props
+        self.min_dist = min_dist
+
+class Bucket:
+    """
+    Knoten und Relationen zu einem Hauptknoten.
+
+    - nodes:     label -> {node_id: NodeEntry}
+    - adjacent:  ids der direkten Nachbarn des Hauptknotens
+    - relations: (fromId, toId, relation) -> Relation als dict, Einfügereihenfolge bleibt erhalten
+    """
+    __slots__ = ("nodes", "adjacent", "relations", "_relation_list", "_adjacency")
+
+    def __init__(self):
+        self.nodes = {}
+        self.adjacent = set()
+        self.relations = {}
+        self._relation_list = None
+        self._adjacency = None
+
+    def store_node(self, node_id, label, props, distance):
+        """Speichert den Knoten unter `label`, bei mehreren Pfaden gilt der kürzeste Abstand."""
+        node_map = self.nodes.setdefault(label, {})
+        existing = node_map.get(node_id)
+        if existing is None or distance < existing.min_dist:
+            node_map[node_id] = NodeEntry(props, distance)
+
+    def add_relation(self, main_id, from_id, to_id, relation_name):
+        key = (from_id, to_id, relation_name)
+        if key not in self.relations:
+            self.relations[key] = {"fromId": from_id, "toId": to_id, "relation": relation_name}
+            self._relation_list = None
+            self._adjacency = None
+        if from_id == main_id:
+            self.adjacent.add(to_id)
+        if to_id == main_id:
+            self.adjacent.add(from_id)
+
+    def relation_list(self):
+        """Die Relationen als Liste; alle Zeilen eines Buckets teilen sich dasselbe Listenobjekt."""
+        if self._relation_list is None:
+            self._relation_list = list(self.relations.values())
+        return self._relation_list
+
+    def adjacency(self):
+        """node id -> ids der direkt verbundenen Knoten, einmal pro Bucket aufgebaut."""
+        if self._adjacency is None:
+            adjacency = {}
+            for from_id, to_id, _ in self.relations:
+                if from_id is not None:
+                    adjacency.setdefault(from_id, set()).add(to_id)
+                if to_id is not None:
+                    adjacency.setdefault(to_id, set()).add(from_id)
+            self._adjacency = adjacency
+        return self._adjacency
+
+def extract_nodes_from_paths(paths, main_label, selected_labels, filter_labels=None, main_ids=None):
+    buckets = {}
+    for p in paths:
+        nodes, rels = p["nodes"], p["rels"]
+        # verankerte Pfade gehören nur zum Bucket ihres Ankers
+        anchor = p.get("anchor")
+        for idx, node in enumerate(nodes):
+            if anchor is not None and node["id"] != anchor:
+                continue
+            if main_label in node["labels"] and (main_ids is None or node["id"] in main_ids):
+                bucket = buckets.get(node["id"])
+                if bucket is None:
+                    bucket = buckets[node["id"]] = Bucket()
+                add_path_nodes_to_bucket(bucket, nodes, idx, selected_labels, filter_labels)
+                add_path_relations_to_bucket(bucket, node["id"], rels)
+    return buckets
+
+def add_path_nodes_to_bucket(bucket, node_list, main_index, selected_labels, filter_labels=None):
+    for idx, node in enumerate(node_list):
+        node_id = node["id"]
+        if node_id is None:
+            continue
+        for label in node["labels"]:
+            if label in selected_labels and (not filter_labels or label in filter_labels):
+                bucket.store_node(node_id, label, node["props"], abs(idx - main_index))
+
+def add_path_relations_to_bucket(bucket, main_id, relationships):
+    for rel in relationships:
+        from_id, to_id = rel["fromId"], rel["toId"]
+        if from_id is None or to_id is None:
+            continue
+        bucket.add_relation(main_id, from_id, to_id, rel["type"])
+
+def add_node_to_bucket(buckets, node, label):
+    node_id = node["id"]
+    if node_id is None:
+        return
+    bucket = buckets.get(node_id)
+    if bucket is None:
+        bucket = buckets[node_id] = Bucket()
+    # Node korrekt speichern
+    bucket.nodes.setdefault(label, {})[node_id] = NodeEntry(node.get("props", {}), 0)
+
+def select_best_node(nodes_map, adjacent_nodes):
+    if not nodes_map:
+        return None
+    # 1) direkt benachbarte Nodes priorisieren
+    direct_candidates = {nid: entry for nid, entry in nodes_map.items() if entry.min_dist == 1}
+    if direct_candidates:
+        return next(iter(direct_candidates.items()))
+    # 2) wenn keine direkten, fallback auf adjacents
+    candidates = {nid: entry for nid, entry in nodes_map.items() if nid in adjacent_nodes} or nodes_map
+    return closest_node(candidates)
+
+def closest_node(nodes_map):
+    """(node_id, NodeEntry) mit dem kleinsten Abstand, bei Gleichstand der zuerst gespeicherte."""
+    return min(nodes_map.items(), key=lambda item: item[1].min_dist)
+
+def extract_table_columns(buckets):
+    if not buckets:
+        return []
+    label_property_pairs = {
+        (label, prop)
+        for bucket in buckets.values()
+        for label, node_map in bucket.nodes.items()
+        for entry in node_map.values()
+        for prop in entry.props
+    }
+    if not label_property_pairs:
+        return []
+    return [
+        {"nodeType": label, "property": prop}
+        for label, prop in sorted(label_property_pairs, key=lambda x: (x[0], str(x[1])))
+    ]
+
+def assemble_table_rows(buckets, columns):
+    return list(iter_table_rows(buckets.values(), columns))
+
+def drain_buckets(buckets):
+    """Gibt die Buckets einzeln zurück und entfernt sie dabei aus `buckets`, damit der Speicher freigegeben wird."""
+    while buckets:
+        main_id = next(iter(buckets))
+        yield buckets.pop(main_id)
+
+def iter_table_rows(buckets, columns):
+    """
+    Build rows from buckets (an iterable of Bucket objects), yielding them bucket by bucket.
+
+    Dynamic rules (no hardcoded label names):
+    - By default produce a single row per bucket (per main node),
+        picking for each label the node with minimal min_dist.
+    - If some label L in the bucket has multiple nodes AND those
+        L-nodes have distinct related nodes for other labels (i.e. each
+        Bestellung links to its own Shipment), then expand rows
+        by L (one row per L-node). To avoid explosion we choose
+        a single pivot label to expand (the one with the most nodes).
+    """
+    for bucket in buckets:
+        nodes_by_label = bucket.nodes
+        relations = bucket.relation_list()
+
+        if use_dense(bucket):
+            for chosen in DenseBucket(bucket).row_choices():
+                yield {"cells": build_cells(columns, chosen), "relations": relations}
+            continue
+
+        pivot_label = find_pivot_label(bucket)
+
+        # bester Knoten pro Label (kleinster Abstand), einmal pro Bucket statt einmal pro Zelle
+        closest = {label: closest_node(node_map) for label, node_map in nodes_by_label.items() if node_map}
+
+        if pivot_label is None:
+            # no expansion needed: single row per bucket, pick best node per label by min_dist
+            yield {"cells": build_cells(columns, closest), "relations": relations}
+            continue
+
+        adjacency = bucket.adjacency()
+        # for each pivot node, create one row and try to attach related nodes for other labels
+        for pivot_node_id, pivot_entry in nodes_by_label[pivot_label].items():
+            related = adjacency.get(pivot_node_id, ())
+            chosen = {}
+            for label, node_map in nodes_by_label.items():
+                if not node_map:
+                    continue
+                if label == pivot_label:
+                    chosen[label] = (pivot_node_id, pivot_entry)
+                    continue
+                # first try to find nodes of this label directly related to the pivot node,
+                # if multiple related, choose the one with minimal min_dist
+                related_ids = [nid for nid in node_map if nid in related]
+                if related_ids:
+                    best_id = min(related_ids, key=lambda nid: node_map[nid].min_dist)
+                    chosen[label] = (best_id, node_map[best_id])
+                else:
+                    # fallback: choose the best node by min_dist (conservative)
+                    chosen[label] = closest[label]
+            yield {"cells": build_cells(columns, chosen), "relations": relations}
+
+def find_pivot_label(bucket):
+    """
+    Label, nach dem der Bucket in mehrere Zeilen aufgeteilt wird, oder None.
+    Ein Label kommt in Frage, wenn es mehrere Knoten hat und diese zu unterschiedlichen
+    Knoten eines anderen Labels verbunden sind; gewählt wird das mit den meisten Knoten.
+    """
+    nodes_by_label = bucket.nodes
+    candidate_multi = [label for label, node_map in nodes_by_label.items() if len(node_map) > 1]
+    if not candidate_multi:
+        return None
+
+    adjacency = bucket.adjacency()
+    expansion_candidates = []
+    for L in candidate_multi:
+        L_related = [adjacency.get(nid, frozenset()) for nid in nodes_by_label[L]]
+        for other_label, other_nodes in nodes_by_label.items():
+            if other_label == L:
+                continue
+            # mapping L-node -> set of related other_label nodes
+            mapping = {frozenset(nid for nid in related if nid in other_nodes) for related in L_related}
+            # if mapping differs across L nodes and at least one mapping is non-empty, expand
+            if len(mapping) > 1:
+                expansion_candidates.append(L)
+                break  # no need to check other labels for this L
+
+    if not expansion_candidates:
+        return None
+    return max(expansion_candidates, key=lambda l: len(nodes_by_label[l]))
+
+def use_dense(bucket):
+    if DENSE_MIN_NODES < 0:
+        return False
+    sizes = [len(node_map) for node_map in bucket.nodes.values()]
+    total = sum(sizes)
+    if total < DENSE_MIN_NODES:
+        return False
+    return max(sizes) * total <= DENSE_MAX_CELLS
+
+class DenseBucket:
+    """
+    Ein Bucket als Arrays: jede Knoten-id bekommt einen dichten Index, pro Label gibt es
+    die Indizes und Abstände seiner Knoten (in Einfügereihenfolge), die Relationen liegen
+    als Kantenliste (in beide Richtungen) vor. Damit werden dieselben Entscheidungen wie in
+    find_pivot_label / iter_table_rows getroffen, nur als Array-Operationen.
+    """
+    __slots__ = ("bucket", "labels", "members", "dists", "n", "edge_src", "edge_dst")
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.labels = [label for label, node_map in bucket.nodes.items() if node_map]
+
+        index = {}
+        self.members = {}
+        self.dists = {}
+        for label in self.labels:
+            node_map = bucket.nodes[label]
+            self.members[label] = np.fromiter((index.setdefault(nid, len(index)) for nid in node_map), dtype=np.intp, count=len(node_map))
+            self.dists[label] = np.fromiter((entry.min_dist for entry in node_map.values()), dtype=np.float64, count=len(node_map))
+        self.n = len(index)
+
+        # nur Relationen zwischen Knoten des Buckets sind für die Auswahl relevant
+        src, dst = [], []
+        for from_id, to_id, _ in bucket.relations:
+            a, b = index.get(from_id), index.get(to_id)
+            if a is not None and b is not None:
+                src.append(a)
+                dst.append(b)
+        self.edge_src = np.array(src + dst, dtype=np.intp)
+        self.edge_dst = np.array(dst + src, dtype=np.intp)
+
+    def neighbour_matrix(self, label):
+        """Bool-Matrix |label| x n: Zeile i markiert die Nachbarn des i-ten Knotens von `label`."""
+        rows = np.full(self.n, -1, dtype=np.intp)
+        rows[self.members[label]] = np.arange(len(self.members[label]))
+        matrix = np.zeros((len(self.members[label]), self.n), dtype=bool)
+        hit = rows[self.edge_src] >= 0
+        matrix[rows[self.edge_src[hit]], self.edge_dst[hit]] = True
+        return matrix
+
+    def pivot_label(self):
+        expansion_candidates = []
+        for L in self.labels:
+            if len(self.members[L]) < 2:
+                continue
+            neighbours = self.neighbour_matrix(L)
+            for other_label in self.labels:
+                if other_label == L:
+                    continue
+                # Nachbarn unter den other_label-Knoten, unterschiedliche Zeilen = unterschiedliche Zuordnung
+                sub = neighbours[:, self.members[other_label]]
+                if (sub != sub[0]).any():
+                    expansion_candidates.append(L)
+                    break
+        if not expansion_candidates:
+            return None
+        return max(expansion_candidates, key=lambda l: len(self.members[l]))
+
+    def row_choices(self):
+        """Pro Zeile ein dict label -> (node_id, NodeEntry), wie in iter_table_rows."""
+        node_items = {label: list(self.bucket.nodes[label].items()) for label in self.labels}
+        # argmin liefert bei Gleichstand den ersten Index, also wie min() den zuerst gespeicherten Knoten
+        closest = {label: int(np.argmin(self.dists[label])) for label in self.labels}
+
+        pivot_label = self.pivot_label()
+        if pivot_label is None:
+            yield {label: node_items[label][closest[label]] for label in self.labels}
+            return
+
+        neighbours = self.neighbour_matrix(pivot_label)
+        picks = {}
+        for label in self.labels:
+            if label == pivot_label:
+                continue
+            related = neighbours[:, self.members[label]]
+            masked = np.where(related, self.dists[label], np.inf)
+            best = masked.argmin(axis=1)
+            picks[label] = np.where(related.any(axis=1), best, closest[label])
+
+        for row, pivot_item in enumerate(node_items[pivot_label]):
+            chosen = {}
+            for label in self.labels:
+                if label == pivot_label:
+                    chosen[label] = pivot_item
+                else:
+                    chosen[label] = node_items[label][picks[label][row]]
+            yield chosen
+
+def build_cells(columns, chosen):
+    """Eine Zelle pro Spalte aus den je Label gewählten (node_id, NodeEntry)."""
+    cells = []
+    for col in columns:
+        label = col["nodeType"]
+        prop = col["property"]
+        choice = chosen.get(label)
+        if choice is None:
+            cells.append({"value": None, "nodeId": None, "nodeType": label})
+            continue
+        node_id, entry = choice
+        value = entry.props.get(prop) if prop is not None else None
+        cells.append({"value": value, "nodeId": node_id, "nodeType": label})
+    return cells
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_update_node_bp(graph):
     bp = Blueprint("update_node", __name__)
@@ -14,14 +16,13 @@ def create_update_node_bp(graph):
         if not graph:
             return jsonify({"status": "error", "message": "Datenbank nicht verbunden."}), 500
 
-        # Abfrage, um den Node zu finden und das Property zu aktualisieren
-        query = f"""
-            MATCH (n) WHERE ID(n) = {node_id}
-            SET n.{property_name} = $new_value
-            RETURN n
-        """
+        # wie in create_node: nur Bezeichner als Property-Namen (der Name wird gequotet, wäre also sonst gültig)
+        if property_name is not None and not str(property_name).isidentifier():
+            return jsonify({"status": "error", "message": f"Ungültiger Property-Name: {property_name}"}), 400
+
         try:
-            graph.run(query, new_value=new_value)
+            statements.UPDATE_NODE_PROPERTY.run(graph, {"node_id": node_id, "value": new_value}, property=property_name)
+            bump_write_generation()
             return jsonify({"status": "success", "message": f"Node {node_id} wurde aktualisiert."})
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500
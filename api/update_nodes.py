@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from oasis_helper import conditional_login_required
+from table_cache import bump_write_generation
+import statements
 
 def create_update_nodes_bp(graph):
     bp = Blueprint("update_nodes", __name__)
@@ -23,15 +25,8 @@ def create_update_nodes_bp(graph):
             return jsonify({"status": "error", "message": "Datenbank nicht verbunden."}), 500
 
         try:
-            # Dynamische Erstellung der Cypher-Abfrage
-            query = f"""
-                UNWIND $ids AS id
-                MATCH (n) WHERE ID(n) = id
-                SET n.{property_name} = $value
-            """
-
-            # Führe die Abfrage aus
-            graph.run(query, ids=node_ids, value=new_value)
+            statements.UPDATE_NODES_PROPERTY.run(graph, {"ids": node_ids, "value": new_value}, property=property_name)
+            bump_write_generation()
 
             return jsonify({"status": "success", "message": f"{len(node_ids)} Nodes wurden aktualisiert."})
         except Exception as e:
@@ -18,6 +18,7 @@ import csv
 import uuid
 import json
 from collections import defaultdict
+from functools import partial
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import urlparse, urlunparse
@@ -202,6 +203,11 @@ try:
 
     from dotenv import load_dotenv
     import oasis_helper
+    from table_cache import table_cache, bump_write_generation
+    import metrics
+    import server_timing
+    from slow_queries import slow_query_log, profile_statement
+    from request_profiler import request_profiler
 
     from api.get_data_as_table import create_get_data_bp
     from api.dump_database import create_dump_database_bp
@@ -223,8 +229,13 @@ try:
     from api.properties import create_properties_bp
     from api.relationships import create_relationships_bp
     from api.query_overview import create_query_overview
+    from api.import_jobs import create_import_jobs_bp
 
     from index_manager import create_index_bp
+    from graph_fanout import GraphFanout
+    import statements
+    from import_engine import create_import_engine
+    from upload_spool import upload_spool, SpoolQuotaExceeded, open_csv
     
     import json
     import urllib.parse
@@ -259,18 +270,23 @@ login_manager.login_message = "Bitte melde dich an, um fortzufahren."
 app.secret_key = oasis_helper.load_or_generate_secret_key()
 
 graph = oasis_helper.get_graph_db_connection()
+metrics.init_app(app)  # zuerst, damit die Request-Metrik den endgültigen Status (z.B. 503) sieht
+server_timing.init_app(app)
+request_profiler.init_app(app)
+graph.init_app(app)
+graph_fanout = GraphFanout(graph.reads)
 
 app.config['GRAPH'] = graph
 
-app.register_blueprint(create_get_data_bp(graph), url_prefix='/api')
-app.register_blueprint(create_dump_database_bp(graph), url_prefix='/api')
+app.register_blueprint(create_get_data_bp(graph.reads), url_prefix='/api')
+app.register_blueprint(create_dump_database_bp(graph.reads), url_prefix='/api')
 app.register_blueprint(create_reset_and_load_data_bp(graph), url_prefix='/api')
 app.register_blueprint(create_delete_node_bp(graph), url_prefix='/api')
 app.register_blueprint(create_add_property_to_nodes_bp(graph), url_prefix='/api')
 app.register_blueprint(create_delete_nodes_bp(graph), url_prefix='/api')
 app.register_blueprint(create_create_node_bp(graph), url_prefix='/api')
 app.register_blueprint(create_delete_all_bp(graph), url_prefix='/api')
-app.register_blueprint(create_graph_data_bp(graph), url_prefix='/api')
+app.register_blueprint(create_graph_data_bp(graph.reads), url_prefix='/api')
 app.register_blueprint(create_update_node_bp(graph), url_prefix='/api')
 app.register_blueprint(create_add_row_bp(graph), url_prefix='/api')
 app.register_blueprint(create_add_column_bp(graph), url_prefix='/api')
@@ -278,9 +294,10 @@ app.register_blueprint(create_save_queries(), url_prefix='/api')
 app.register_blueprint(create_update_nodes_bp(graph), url_prefix='/api')
 app.register_blueprint(create_add_relationship_bp(graph), url_prefix='/api')
 app.register_blueprint(create_complex_data_bp(graph), url_prefix='/api')
-app.register_blueprint(create_labels_bp(graph), url_prefix='/api')
-app.register_blueprint(create_properties_bp(graph), url_prefix='/api')
-app.register_blueprint(create_relationships_bp(graph), url_prefix='/api')
+app.register_blueprint(create_labels_bp(graph.reads), url_prefix='/api')
+app.register_blueprint(create_properties_bp(graph.reads), url_prefix='/api')
+app.register_blueprint(create_relationships_bp(graph.reads), url_prefix='/api')
+app.register_blueprint(create_import_jobs_bp(graph), url_prefix='/api')
 
 app.register_blueprint(create_index_bp(graph), url_prefix='/')
 app.register_blueprint(create_query_overview(), url_prefix='/')
@@ -408,6 +425,17 @@ def method_not_allowed(e):
 def page_not_found(e):
     return render_template('404.html'), 404
 
+def search_per_label(query):
+    """Sucht `query` in den Knoten jedes Labels und ihren Nachbarn, eine Abfrage pro Label, alle gleichzeitig."""
+    # 🔹 Alle Labels abfragen
+    labels = [r['label'] for r in graph_fanout.data(statements.DB_LABELS)]
+
+    # 🔹 Ergebnisse in Label-Reihenfolge
+    return graph_fanout.gather(*(
+        partial(graph_fanout.data, statements.SEARCH_LABEL, {"query": query.lower()}, label=label)
+        for label in labels
+    ))
+
 @app.route('/search')
 @conditional_login_required
 def search():
@@ -453,19 +481,9 @@ def search():
         print("Fehler beim Laden der gespeicherten Queries:", e)
 
     try:
-        # 🔹 Alle Labels abfragen
-        labels = [r['label'] for r in graph.run("CALL db.labels() YIELD label RETURN label").data()]
-
-        for label in labels:
-            cypher = f"""
-            MATCH (n:`{label}`)-[r]->(m)
-            WHERE ANY(prop IN keys(n) WHERE toLower(toString(n[prop])) CONTAINS $query)
-               OR ANY(prop IN keys(m) WHERE toLower(toString(m[prop])) CONTAINS $query)
-            RETURN n, type(r) AS rel, m
-            LIMIT 20
-            """
-            neo_results = graph.run(cypher, query=query.lower()).data()
+        per_label = search_per_label(query)
 
+        for neo_results in per_label:
             for r in neo_results:
                 n = r['n']
                 m = r['m']
@@ -550,7 +568,6 @@ def upload_data():
         return "Keine Daten hochgeladen", 400
 
     data = request.form['data']
-    session['raw_data'] = data
 
     try:
         f = io.StringIO(data)
@@ -558,22 +575,30 @@ def upload_data():
         f.seek(0)
         reader = csv.reader(f, dialect)
         headers = next(reader)
-
-        # Lege Header in der Session ab
-        session['headers'] = headers
-
-        return render_template('mapping.html', headers=headers)
     except csv.Error as e:
         return f"Fehler beim Parsen der Daten: {e}", 400
 
+    # Die Daten landen im Upload-Spool, in der Session steht nur die id
+    try:
+        upload_id = upload_spool.put(data)
+    except SpoolQuotaExceeded as e:
+        return str(e), 413
+    upload_spool.remove(session.pop('upload_id', None))
+    session.pop('raw_data', None)
+    session['upload_id'] = upload_id
+
+    # Lege Header in der Session ab
+    session['headers'] = headers
+
+    return render_template('mapping.html', headers=headers)
+
 @app.route('/get_rel_types', methods=['GET'])
 @conditional_login_required
 def get_rel_types():
     """Gibt eine Liste aller existierenden Relationship-Typen in der DB zurück."""
     try:
         # Führe eine Cypher-Abfrage aus, um alle eindeutigen Relationship-Typen zu finden
-        query = "MATCH ()-[r]->() RETURN DISTINCT type(r) AS type"
-        result = graph.run(query).data()
+        result = statements.REL_TYPES.run(graph).data()
         types = [d['type'] for d in result]
         return jsonify(types)
     except Exception as e:
@@ -590,120 +615,39 @@ def save_mapping():
         print("Fehler: Datenbank nicht verbunden.")
         return jsonify({"status": "error", "message": "Datenbank nicht verbunden."}), 500
 
-    if 'raw_data' not in session:
+    if 'upload_id' not in session and 'raw_data' not in session:
         return jsonify({"status": "error", "message": "raw_data not in session."}), 500
 
-    reader = parse_csv_from_session()
-    if reader is None:
-        return jsonify({"status": "error", "message": "Fehler beim Analysieren der CSV-Daten."}), 400
+    upload_id = session.get('upload_id')
+    if upload_id is not None and not upload_spool.exists(upload_id):
+        session.pop('upload_id')
+        return jsonify({"status": "error", "message": "Upload ist abgelaufen, bitte die Daten erneut hochladen."}), 410
 
-    tx = graph.begin()
+    with parse_csv_from_session() as reader:
+        if reader is None:
+            return jsonify({"status": "error", "message": "Fehler beim Analysieren der CSV-Daten."}), 400
 
-    try:
-        for _, row in enumerate(reader):
-            process_row(row, mapping_data)
-
-        graph.commit(tx)
-        #print("\nGesamtvorgang erfolgreich: Daten wurden in die Neo4j-Datenbank importiert.")
-        return jsonify({"status": "success", "message": "Daten erfolgreich in Neo4j importiert."})
-    except Exception as e:
-        tx.rollback()
-        print(f"\n❌ Fehler beim Speichern in der DB: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        engine = create_import_engine(graph, mapping_data)
+        try:
+            stats = engine.run(reader)
+            print(f"Import: {stats['rows']} Zeilen in {stats['batches']} Batches, {stats['seconds']} s ({stats['rowsPerSecond']} Zeilen/s)")
+            return jsonify({"status": "success", "message": "Daten erfolgreich in Neo4j importiert.", **stats})
+        except Exception as e:
+            print(f"\n❌ Fehler beim Speichern in der DB: {e}")
+            return jsonify({"status": "error", "message": str(e), **engine.stats()}), 500
+        finally:
+            # auch bei Fehlern können schon Batches committet sein
+            bump_write_generation()
 
 def parse_csv_from_session():
-    """Liest die CSV-Daten aus der Session und gibt einen DictReader zurück."""
-    raw_data = session.pop('raw_data')
-    f = io.StringIO(raw_data)
-    try:
-        dialect = csv.Sniffer().sniff(f.read(1024))
-        f.seek(0)
-        reader = csv.DictReader(f, dialect=dialect)
-        return reader
-    except csv.Error as e:
-        print(f"Fehler beim Analysieren der CSV-Daten: {e}")
-        return None
-
-def process_row(row, mapping_data):
-    """Verarbeitet eine Zeile: Knoten mergen und Beziehungen erstellen."""
-    nodes_created = {}
-
-    # Knoten erstellen/mergen
-    for node_type, fields in mapping_data.get('nodes', {}).items():
-        node = merge_node(node_type, fields, row)
-        if node:
-            nodes_created[node_type] = node
-
-    # Beziehungen erstellen
-    for rel_data in mapping_data.get('relationships', []):
-        create_relationship(rel_data['from'], rel_data['to'], rel_data['type'], nodes_created)
-
-def merge_node(node_type, fields, row):
-    """Merged einen Knoten vom Typ node_type mit gegebenen Properties."""
-    node_var = safe_var_name(node_type)
-    node_label = f"`{node_type}`"
-
-    all_props = {}
-    for field_map in fields:
-        original_name = field_map['original']
-        renamed_name = field_map['renamed']
-        value = row.get(original_name)
-        if value:
-            all_props[renamed_name] = value
-
-    if not all_props:
-        #print(f"  ❌ Keine Daten für den Knoten-Typ '{node_type}' in dieser Zeile. Überspringe.")
-        return None
-
-    identifier_key, identifier_value = next(iter(all_props.items()))
-    #print(f"  ➡️ Versuche, einen Knoten vom Typ '{node_type}' zu mergen.")
-    #print(f"     Identifikator: '{identifier_key}' = '{identifier_value}'")
-    #print(f"     Alle Properties: {all_props}")
-
-    cypher_query = f"""
-    MERGE ({node_var}:{node_label} {{`{identifier_key}`: $identifier_value}})
-    ON CREATE SET {node_var} = $all_props
-    RETURN {node_var}
-    """
-
-    params = {"identifier_value": identifier_value, "all_props": all_props}
-    result = graph.run(cypher_query, **params).data()
-
-    if result:
-        return result[0][node_var]
-
-    print(f"  ⚠️ MERGE-Vorgang für '{node_type}' hat nichts zurückgegeben.")
-    return None
-
-def create_relationship(from_node_type, to_node_type, rel_type, nodes_created):
-    """Erstellt eine Beziehung zwischen zwei vorhandenen Knoten."""
-    clean_rel_type = rel_type.replace(' ', '_').upper()
-    rel_label = f"`{clean_rel_type}`"
-
-    from_var = safe_var_name(from_node_type)
-    to_var = safe_var_name(to_node_type)
-
-    #print(f"  ➡️ Versuche, eine Beziehung '{rel_type}' zu erstellen.")
-
-    if from_node_type in nodes_created and to_node_type in nodes_created:
-        from_node = nodes_created[from_node_type]
-        to_node = nodes_created[to_node_type]
-
-        rel_query = f"""
-        MATCH ({from_var}:`{from_node_type}`) WHERE id({from_var}) = {from_node.identity}
-        MATCH ({to_var}:`{to_node_type}`) WHERE id({to_var}) = {to_node.identity}
-        MERGE ({from_var})-[rel:{rel_label}]->({to_var})
-        """
-        graph.run(rel_query)
-        #print(f"  ✅ Beziehung '{clean_rel_type}' zwischen '{from_node_type}' und '{to_node_type}' erstellt.")
-    #else:
-        #print(f"  ❌ Beziehung konnte nicht erstellt werden, Knoten fehlen: '{from_node_type}' (vorhanden: {from_node_type in nodes_created}), '{to_node_type}' (vorhanden: {to_node_type in nodes_created}).")
+    """DictReader über den Upload der Session (siehe upload_spool.open_csv), nimmt ihn aus der Session."""
+    return open_csv(session.pop('upload_id', None), session.pop('raw_data', None))
 
 def get_all_nodes_and_relationships():
     """Holt alle aktuell vorhandenen Node-Typen und Relationship-Typen aus der Datenbank."""
     try:
-        node_labels = graph.run("MATCH (n) RETURN DISTINCT labels(n) AS labels").data()
-        relationship_types = graph.run("MATCH ()-[r]->() RETURN DISTINCT type(r) AS relType").data()
+        node_labels = statements.NODE_LABEL_SETS.run(graph).data()
+        relationship_types = statements.RELATIONSHIP_TYPES.run(graph).data()
     except Exception as e:
         raise RuntimeError(f"Fehler beim Abfragen der Datenbank: {e}")
 
@@ -748,10 +692,6 @@ def overview():
 
     return render_template('overview.html', db_info=db_info, error=None)
 
-def safe_var_name(label):
-    # Ersetzt alle nicht-alphanumerischen Zeichen durch "_"
-    return "".join(ch if ch.isalnum() else "_" for ch in label.lower())
-
 
 @app.context_processor
 def inject_sidebar_data():
@@ -868,6 +808,108 @@ def admin_panel():
     finally:
         session.close()
 
+@app.route('/admin/table_cache', methods=['GET'])
+@login_required
+@admin_required
+def admin_table_cache_stats():
+    """Treffer-, Fehl- und Verdrängungszähler des Tabellen-Caches."""
+    return jsonify(table_cache.stats())
+
+@app.route('/admin/table_cache/clear', methods=['POST'])
+@login_required
+@admin_required
+def admin_table_cache_clear():
+    table_cache.invalidate()
+    return jsonify(success=True)
+
+@app.route('/admin/graph_pool', methods=['GET'])
+@login_required
+@admin_required
+def admin_graph_pool_stats():
+    """Auslastung des Neo4j-Connection-Pools."""
+    return jsonify(graph.pool_stats())
+
+@app.route('/admin/slow_queries', methods=['GET'])
+@login_required
+@admin_required
+def admin_slow_queries():
+    """Ringpuffer der langsamen Cypher-Abfragen (Schwelle OASIS_SLOW_QUERY_MS)."""
+    if request.args.get('format') == 'json':
+        return jsonify(slow_query_log.entries())
+    return render_template('admin_slow_queries.html', entries=slow_query_log.entries(), threshold_ms=slow_query_log.threshold_ms)
+
+@app.route('/admin/slow_queries/<int:entry_id>/profile', methods=['POST'])
+@login_required
+@admin_required
+def admin_profile_slow_query(entry_id):
+    """Geloggte Abfrage mit PROFILE wiederholen (Transaktion wird zurückgerollt)."""
+    entry = slow_query_log.get(entry_id)
+    if entry is None:
+        return jsonify({"status": "error", "message": "Eintrag nicht (mehr) im Log"}), 404
+    if not entry["replayable"]:
+        return jsonify({"status": "error", "message": "Parameter sind geschwärzt oder gekürzt, keine Wiederholung möglich"}), 400
+    try:
+        return jsonify(profile_statement(graph, entry))
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/admin/slow_queries/clear', methods=['POST'])
+@login_required
+@admin_required
+def admin_clear_slow_queries():
+    slow_query_log.clear()
+    return jsonify(success=True)
+
+@app.route('/admin/profiles', methods=['GET'])
+@login_required
+@admin_required
+def admin_profiles():
+    """Mit ?__profile=cpu|mem aufgezeichnete Requests."""
+    return render_template('admin_profiles.html', reports=request_profiler.store.summaries())
+
+@app.route('/admin/profiles/<int:report_id>.<kind>', methods=['GET'])
+@login_required
+@admin_required
+def admin_download_profile(report_id, kind):
+    report = request_profiler.store.get(report_id)
+    if report is None:
+        abort(404)
+    if kind == 'txt':
+        return Response(report["text"], mimetype="text/plain; charset=utf-8")
+    raw_kind = 'pstats' if report["mode"] == 'cpu' else 'tracemalloc'
+    if kind != raw_kind:
+        abort(404)
+    return send_file(
+        io.BytesIO(report["raw"]),
+        mimetype="application/octet-stream",
+        as_attachment=True,
+        download_name=f"profile-{report_id}-{report['endpoint']}.{raw_kind}"
+    )
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metriken im Prometheus-Textformat. Mit OASIS_METRICS_TOKEN nur mit passendem Bearer-Token."""
+    token = os.getenv("OASIS_METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+
+    pool = graph.pool_stats()
+    cache = table_cache.stats()
+    spool = upload_spool.stats()
+    gauges = {
+        # beim In-Memory-Backend gibt es keinen Pool, fehlende Werte werden ausgelassen
+        "oasis_graph_sessions_in_use": ("Belegte Sessions im Neo4j-Pool", pool.get("sessionsInUse")),
+        "oasis_graph_pool_timeouts": ("Requests ohne freie Session nach acquire_timeout", pool.get("timeouts")),
+        "oasis_graph_circuit_open": ("1 wenn Neo4j gerade nicht erreichbar ist", pool.get("circuitBreaker", {}).get("state") == "open"),
+        "oasis_graph_memory_nodes": ("Knoten im In-Memory-Graphen (GRAPH_BACKEND=memory)", pool.get("nodes")),
+        "oasis_table_cache_hits": ("Treffer im Tabellen-Cache", cache["hits"]),
+        "oasis_table_cache_misses": ("Fehlzugriffe im Tabellen-Cache", cache["misses"]),
+        "oasis_table_cache_bytes": ("Belegter Speicher des Tabellen-Caches", cache["bytes"]),
+        "oasis_upload_spool_bytes": ("Belegter Platz im Upload-Spool", spool["bytes"]),
+        "oasis_upload_spool_rejected": ("Wegen Größe oder Quota abgelehnte Uploads", spool["rejected"]),
+    }
+    return Response(metrics.registry.render(gauges), mimetype="text/plain; version=0.0.4")
+
 @app.route('/admin/delete/<int:user_id>', methods=['POST'])
 @login_required
 @admin_required
@@ -1,4 +1,5 @@
 from functools import wraps
+from flask import render_template
 from db import *
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 
@@ -0,0 +1,90 @@
+"""
+Benchmark für den CSV-Import (import_engine.py): seriell gegen parallel mit mehreren Schreibern.
+
+Erzeugt eine CSV mit `--rows` Zeilen (Person, Stadt, jede zweite Zeile eine Bestellung; Personen
+kommen mehrfach vor) und importiert sie für jede Schreiberzahl aus `--writers` in den Graphen aus
+oasis_helper.get_graph_db_connection (also Neo4j über NEO4J_URI usw., oder GRAPH_BACKEND=memory).
+Die Labels haben das Präfix `--label-prefix` und werden vor jedem Lauf gelöscht, die Indexe auf
+die Merge-Schlüssel legt der Import selbst an (OASIS_IMPORT_KEY_SCHEMA).
+
+    python3 benchmarks/bench_import.py --rows 1000000 --writers 1,2,4,8
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import oasis_helper
+import statements
+from import_engine import create_import_engine
+
+def write_csv(path, rows, seed):
+    rnd = random.Random(seed)
+    persons = max(1, rows * 2 // 3)
+    cities = max(1, rows // 1000)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "alter", "stadt", "bestellung", "betrag"])
+        for i in range(rows):
+            order = f"B{i}" if i % 2 == 0 else ""
+            writer.writerow([f"Person{rnd.randrange(persons)}", rnd.randint(18, 90), f"Stadt{rnd.randrange(cities)}", order, rnd.randint(1, 500) if order else ""])
+
+def mapping(prefix):
+    return {
+        "nodes": {
+            f"{prefix}Person": [{"original": "name", "renamed": "name"}, {"original": "alter", "renamed": "alter"}],
+            f"{prefix}Stadt": [{"original": "stadt", "renamed": "stadt"}],
+            f"{prefix}Bestellung": [{"original": "bestellung", "renamed": "nummer"}, {"original": "betrag", "renamed": "betrag"}],
+        },
+        "relationships": [
+            {"from": f"{prefix}Person", "to": f"{prefix}Stadt", "type": "WOHNT_IN"},
+            {"from": f"{prefix}Person", "to": f"{prefix}Bestellung", "type": "HAT"},
+        ],
+    }
+
+def prepare(graph, prefix):
+    for label in ("Person", "Stadt", "Bestellung"):
+        label = f"{prefix}{label}"
+        cypher = f"MATCH (n:{statements.quote_identifier(label)}) WITH n LIMIT 10000 DETACH DELETE n RETURN count(*) AS deleted"
+        while graph.evaluate(cypher):
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--writers", default="1,2,4,8", help="Schreiberzahlen, durch Komma getrennt")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--label-prefix", default="Bench")
+    parser.add_argument("--csv", help="vorhandene CSV statt einer erzeugten (Spalten wie oben)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    path = args.csv
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"bench_import_{args.rows}.csv")
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            write_csv(path, args.rows, args.seed)
+            print(f"CSV mit {args.rows} Zeilen erzeugt in {time.perf_counter() - start:.1f} s: {path}")
+
+    graph = oasis_helper.get_graph_db_connection()
+    for writers in (int(w) for w in args.writers.split(",")):
+        prepare(graph, args.label_prefix)
+        engine = create_import_engine(graph, mapping(args.label_prefix), args.batch_size, writers)
+        with open(path, newline="", encoding="utf-8") as f:
+            stats = engine.run(csv.DictReader(f))
+        print(
+            f"  {writers} Schreiber ({type(engine).__name__}): {stats['rows']} Zeilen in {stats['seconds']:.1f} s, "
+            f"{stats['rowsPerSecond']:.0f} Zeilen/s, {stats['batches']} Transaktionen, "
+            f"{stats['nodes']} Knoten-, {stats['relationships']} Beziehungs-Merges"
+        )
+        for created in stats["indexesCreated"]:
+            print(f"    angelegt: {created['kind']} {created['label']}.{created['property']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark für das In-Memory-Backend (memory_graph.py): Import, Tabelle und Suche ohne Neo4j.
+
+Importiert Personen, Städte und Bestellungen mit der ImportEngine (dieselben MERGE-Statements
+wie der CSV-Import) und misst dann /api/get_data_as_table (erste Seite, gefilterte Seite,
+Aggregation) und die Suche (statements.SEARCH_LABEL pro Label wie /search).
+
+    python3 benchmarks/bench_memory_graph.py --persons 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask import Flask
+import statements
+from memory_graph import MemoryGraph
+from import_engine import ImportEngine
+from api.get_data_as_table import create_get_data_bp
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+MAPPING = {
+    "nodes": {
+        "Person": [{"original": "name", "renamed": "name"}, {"original": "alter", "renamed": "alter"}],
+        "Stadt": [{"original": "stadt", "renamed": "stadt"}],
+        "Bestellung": [{"original": "bestellung", "renamed": "nummer"}, {"original": "betrag", "renamed": "betrag"}],
+    },
+    "relationships": [
+        {"from": "Person", "to": "Stadt", "type": "WOHNT_IN"},
+        {"from": "Person", "to": "Bestellung", "type": "HAT"},
+    ],
+}
+
+def csv_rows(n_persons, seed):
+    """Zeilen wie aus csv.DictReader, jede zweite mit einer Bestellung."""
+    rnd = random.Random(seed)
+    n_cities = max(1, n_persons // 100)
+    for i in range(n_persons):
+        order = i % 2 == 0
+        yield {
+            "name": f"Person{i}",
+            "alter": rnd.randint(18, 90),
+            "stadt": f"Stadt{rnd.randrange(n_cities)}",
+            "bestellung": f"B{i}" if order else "",
+            "betrag": rnd.randint(1, 500) if order else "",
+        }
+
+def build_graph(n_persons, seed):
+    graph = MemoryGraph()
+    ImportEngine(graph, MAPPING).run(csv_rows(n_persons, seed))
+    return graph
+
+def search(graph, query):
+    labels = [r["label"] for r in statements.DB_LABELS.run(graph).data()]
+    return [statements.SEARCH_LABEL.run(graph, {"query": query}, label=label).data() for label in labels]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, default=100000, help="Anzahl Personen (dazu 1/100 Städte, 1/2 Bestellungen)")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    graph, t_import = timed(build_graph, args.persons, args.seed)
+    stats = graph.pool_stats()
+    print(f"Import: {stats['nodes']} Knoten, {stats['relationships']} Relationships in {t_import:.1f} s")
+
+    app = Flask(__name__)
+    app.config["DISABLE_LOGIN"] = True
+    app.register_blueprint(create_get_data_bp(graph), url_prefix="/api")
+    client = app.test_client()
+
+    qb = json.dumps({"condition": "AND", "valid": True, "rules": [
+        {"field": "Person.alter", "operator": "greater", "value": 80},
+        {"field": "Stadt.stadt", "operator": "equal", "value": "Stadt1"},
+    ]})
+    requests = [
+        ("Seite", f"/api/get_data_as_table?nodes=Person,Stadt,Bestellung&pageSize={args.page_size}"),
+        ("Seite, gefiltert", f"/api/get_data_as_table?nodes=Person,Stadt&pageSize={args.page_size}&qb={qb}"),
+        ("Aggregation", "/api/get_data_as_table?nodes=Stadt&groupBy=Stadt.stadt&agg=count"),
+    ]
+    for name, url in requests:
+        response, seconds = timed(client.get, url)
+        body = response.get_json()
+        rows = len(body.get("rows", body.get("groups", [])))
+        print(f"  {name:<18} {seconds * 1000:9.1f} ms  ({response.status_code}, {rows} Zeilen/Gruppen)")
+
+    for query in ("stadt7", "person999"):
+        results, seconds = timed(search, graph, query)
+        print(f"  Suche {query!r:<12} {seconds * 1000:9.1f} ms  ({sum(len(r) for r in results)} Treffer)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Micro-Benchmark für das Zusammensetzen der Tabelle (api/table_assembler.py).
+
+Erzeugt synthetische Pfade im Format von GraphAPI.fetch_paths und misst die Zeit für
+Buckets, Spalten und Zeilen. Braucht keine Neo4j-Datenbank.
+
+    python3 benchmarks/bench_table_assembler.py --paths 10000 --mains 100
+
+Die Zeilen werden einmal mit den Python-Sets (--dense-min-nodes -1) und einmal mit dem
+NumPy-Weg für große Buckets gebaut, beide Ergebnisse müssen gleich sein.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import api.table_assembler as table_assembler
+from api.table_assembler import extract_nodes_from_paths, extract_table_columns, assemble_table_rows
+
+LABELS = ["Person", "Bestellung", "Shipment", "Stadt"]
+REL_TYPES = ["HAT", "VERSENDET_ALS", "WOHNT_IN"]
+
+def make_node(node_id, label, rnd):
+    return {"id": node_id, "labels": [label], "props": {"name": f"{label}{node_id}", "wert": rnd.randint(0, 1000)}}
+
+def make_paths(n_paths, n_mains, seed):
+    rnd = random.Random(seed)
+    pool = {
+        label: [make_node(k * 1_000_000 + i, label, rnd) for i in range(max(n_mains, n_paths // 10))]
+        for k, label in enumerate(LABELS)
+    }
+    mains = pool["Person"][:n_mains]
+
+    paths = []
+    for _ in range(n_paths):
+        main = rnd.choice(mains)
+        nodes = [main] + [rnd.choice(pool[rnd.choice(LABELS[1:])]) for _ in range(rnd.randint(1, 3))]
+        rels = [
+            {"fromId": a["id"], "toId": b["id"], "type": rnd.choice(REL_TYPES)}
+            for a, b in zip(nodes, nodes[1:])
+        ]
+        paths.append({"anchor": main["id"], "nodes": nodes, "rels": rels})
+    return paths
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", type=int, default=10000, help="Anzahl Pfade")
+    parser.add_argument("--mains", type=int, default=100, help="Anzahl Hauptknoten (weniger = größere Buckets)")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen, die beste Zeit zählt")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--dense-min-nodes", type=int, default=table_assembler.DENSE_MIN_NODES,
+                        help="ab so vielen Knoten pro Bucket NumPy verwenden (0 = immer)")
+    args = parser.parse_args()
+
+    paths = make_paths(args.paths, args.mains, args.seed)
+
+    results = {}
+    for engine, dense_min_nodes in (("python", -1), ("numpy", args.dense_min_nodes)):
+        table_assembler.DENSE_MIN_NODES = dense_min_nodes
+        best = {}
+        for _ in range(args.repeat):
+            buckets, t_buckets = timed(extract_nodes_from_paths, paths, "Person", LABELS)
+            columns, t_columns = timed(extract_table_columns, buckets)
+            rows, t_rows = timed(assemble_table_rows, buckets, columns)
+            for name, value in (("buckets", t_buckets), ("columns", t_columns), ("rows", t_rows)):
+                best[name] = min(best.get(name, value), value)
+        results[engine] = rows
+
+        print(f"[{engine}] {args.paths} Pfade, {len(buckets)} Buckets, {len(columns)} Spalten, {len(rows)} Zeilen")
+        for name, value in best.items():
+            print(f"  {name:<8} {value * 1000:8.1f} ms")
+        print(f"  {'gesamt':<8} {sum(best.values()) * 1000:8.1f} ms")
+
+    if results["python"] != results["numpy"]:
+        print("FEHLER: Python- und NumPy-Weg liefern unterschiedliche Zeilen")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context, jsonify
+from py2neo import Graph
+from py2neo.errors import ConnectionBroken, ConnectionUnavailable, ServiceUnavailable
+from metrics import timed_statement
+
+# Fehler, an denen man erkennt, dass Neo4j (gerade) nicht erreichbar ist
+CONNECTION_ERRORS = (ConnectionUnavailable, ServiceUnavailable, ConnectionBroken, OSError)
+
+class GraphPoolTimeout(RuntimeError):
+    """Innerhalb von acquire_timeout war keine Session aus dem Pool frei."""
+
+class GraphUnavailable(RuntimeError):
+    """Neo4j ist nicht erreichbar, der Circuit Breaker ist offen. Wird als 503 beantwortet."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Merkt sich, ob Neo4j erreichbar ist. Nach einem Verbindungsfehler ist er offen, bis ein
+    Reconnect klappt; der nächste Versuch ist jeweils `base_delay * 2^(Fehler-1)` Sekunden
+    später fällig, höchstens `max_delay`.
+    """
+
+    def __init__(self, base_delay=1.0, max_delay=60.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_error = None
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.failures > 0
+
+    def retry_after(self):
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def record_failure(self, error):
+        """True, wenn der Breaker dadurch aufgeht (vorher geschlossen war)."""
+        with self._lock:
+            was_closed = self.failures == 0
+            self.failures += 1
+            self.last_error = str(error)
+            delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+            self.retry_at = time.monotonic() + delay
+            if was_closed:
+                self.opened += 1
+            return was_closed
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.retry_at = 0.0
+
+    def stats(self):
+        return {
+            "state": "open" if self.is_open else "closed",
+            "failures": self.failures,
+            "retryAfter": self.retry_after() if self.is_open else None,
+            "lastError": self.last_error,
+            "opened": self.opened,
+        }
+
+class GraphClient:
+    """
+    Zugriff auf Neo4j für alle Blueprints, statt eines einzelnen geteilten py2neo-`Graph`.
+
+    - Bolt-Connection-Pool mit einstellbarer Größe (`max_size`) und Lebensdauer der
+      Verbindungen (`max_age`), py2neo verwaltet die Verbindungen selbst.
+    - Die Verbindung wird erst beim ersten Zugriff aufgebaut, der Import der App hängt also
+      nicht davon ab, ob Neo4j läuft (`connect_in_background` baut sie vorab auf).
+    - Schlägt die Verbindung fehl, geht der Circuit Breaker auf: alle Zugriffe werfen sofort
+      GraphUnavailable (der Endpunkt antwortet mit 503), ein Hintergrund-Thread versucht mit
+      exponentiellem Backoff neu zu verbinden und schließt den Breaker wieder.
+    - Sessions: ein Request belegt beim ersten Zugriff auf den Graphen einen Platz im Pool
+      und gibt ihn am Ende des Requests wieder frei (`init_app` registriert das Teardown).
+      Außerhalb eines Requests (Skripte, Tests, Hintergrund-Threads) gilt ein Platz pro Aufruf
+      bzw. pro Transaktion.
+    - Ist kein Platz frei, wird höchstens `acquire_timeout` Sekunden gewartet, danach kommt
+      GraphPoolTimeout (py2neo selbst würde ohne Limit warten).
+    - Lesen/Schreiben: `reads` ist eine Sicht auf denselben Client, deren Abfragen als
+      Nur-Lese-Transaktionen laufen. Mit einer Routing-URI (`neo4j://...`) verteilt py2neo sie
+      auf die Reader des Clusters, mit `read_uris` gehen sie reihum an die angegebenen Server
+      (ist einer nicht erreichbar, an den Leader). Alles andere geht an den Leader. Hat ein
+      Request schon geschrieben, liest er danach ebenfalls vom Leader, damit er seine eigenen
+      Änderungen sieht.
+    - Jede Abfrage wird für /metrics erfasst (Laufzeit, Zeilen, Fehler), benannt über
+      `metrics.statement(...)`.
+    - `pool_stats()` liefert Kennzahlen für die Admin-Seite.
+
+    Alle anderen Attribute (schema, nodes, ...) werden an den py2neo-Graph durchgereicht.
+    """
+
+    def __init__(self, uri, auth, max_size=50, max_age=3600, acquire_timeout=30, read_uris=None,
+                 reconnect_base_delay=1.0, reconnect_max_delay=60.0):
+        self.uri = uri
+        self.auth = auth
+        self.max_size = max_size
+        self.max_age = max_age
+        self.acquire_timeout = acquire_timeout
+        self.routing = uri.startswith("neo4j")
+        self.breaker = CircuitBreaker(reconnect_base_delay, reconnect_max_delay)
+
+        self._graph = None
+        self._connect_lock = threading.Lock()
+        self._reconnect_lock = threading.Lock()
+        self._reconnect_thread = None
+
+        self.read_uris = list(read_uris or [])
+        self._readers = [None] * len(self.read_uris)
+        self._next_reader = itertools.cycle(range(len(self.read_uris)))
+        self._reader_lock = threading.Lock()
+        self.reads = ReadRoute(self)
+
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._stats_lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._reads_on_readers = 0
+        self._reads_on_leader = 0
+        self._reader_failovers = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+            auth=(
+                os.getenv("NEO4J_USER", "neo4j"),
+                os.getenv("NEO4J_PASS", "testTEST12345678")
+            ),
+            max_size=int(os.getenv("NEO4J_POOL_SIZE", "50")),
+            max_age=float(os.getenv("NEO4J_POOL_MAX_AGE", "3600")),
+            acquire_timeout=float(os.getenv("NEO4J_POOL_ACQUIRE_TIMEOUT", "30")),
+            read_uris=[u.strip() for u in os.getenv("NEO4J_READ_URIS", "").split(",") if u.strip()],
+            reconnect_max_delay=float(os.getenv("NEO4J_RECONNECT_MAX_DELAY", "60")),
+        )
+
+    def init_app(self, app):
+        app.teardown_appcontext(self._end_request_session)
+        app.register_error_handler(GraphUnavailable, graph_unavailable_response)
+
+        # Die meisten Endpunkte fangen Exception selbst und antworten mit 500. War Neo4j der
+        # Grund, wird daraus ein 503, damit Clients/Proxies wissen, dass sie es später nochmal
+        # versuchen können.
+        @app.after_request
+        def _graph_unavailable_status(response):
+            error = g.pop("_graph_unavailable", None)
+            if error is not None and response.status_code == 500:
+                response.status_code = 503
+                response.headers["Retry-After"] = retry_after_header(error)
+            return response
+
+    # --- Verbindung ---
+
+    def _new_graph(self, uri):
+        # Reserve bei py2neo für Requests, die neben einer offenen Transaktion noch
+        # Autocommit-Abfragen absetzen (z.B. save_mapping) und so zwei Verbindungen brauchen
+        return Graph(uri, auth=self.auth, max_size=self.max_size * 2, max_age=self.max_age)
+
+    def _connect(self):
+        graph = self._graph or self._new_graph(self.uri)
+        graph.run("RETURN 1")
+        self._graph = graph
+        self.breaker.record_success()
+        return graph
+
+    @property
+    def graph(self):
+        """Der py2neo-Graph des Leaders; verbindet beim ersten Zugriff, wirft GraphUnavailable."""
+        if self.breaker.is_open:
+            raise self._unavailable()
+        if self._graph is not None:
+            return self._graph
+        with self._connect_lock:
+            if self._graph is not None:
+                return self._graph
+            try:
+                return self._connect()
+            except Exception as e:
+                self._connection_failed(e)
+                raise self._unavailable() from e
+
+    def _connection_failed(self, error):
+        if self.breaker.record_failure(error):
+            print(f"Neo4j nicht erreichbar, Circuit Breaker offen: {error}")
+        self._start_reconnect()
+
+    def _unavailable(self):
+        error = GraphUnavailable(
+            f"Neo4j nicht erreichbar ({self.breaker.last_error})",
+            retry_after=self.breaker.retry_after()
+        )
+        if has_app_context():
+            g._graph_unavailable = error
+        return error
+
+    def _start_reconnect(self):
+        with self._reconnect_lock:
+            if self._reconnect_thread is not None and self._reconnect_thread.is_alive():
+                return
+            self._reconnect_thread = threading.Thread(target=self._reconnect_loop, name="neo4j-reconnect", daemon=True)
+            self._reconnect_thread.start()
+
+    def _reconnect_loop(self):
+        while self.breaker.is_open:
+            time.sleep(self.breaker.retry_after())
+            try:
+                self._connect()
+                print("Neo4j wieder erreichbar, Circuit Breaker geschlossen")
+            except Exception as e:
+                self.breaker.record_failure(e)
+
+    def connect_in_background(self):
+        """Baut die Verbindung in einem Thread auf, ohne den Aufrufer (App-Import) zu blockieren."""
+        def connect():
+            try:
+                self.graph
+            except GraphUnavailable:
+                pass  # der Reconnect-Thread läuft bereits
+        threading.Thread(target=connect, name="neo4j-connect", daemon=True).start()
+
+    # --- Sessions ---
+
+    def _acquire(self):
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._stats_lock:
+                self._timeouts += 1
+            raise GraphPoolTimeout(f"Keine freie Neo4j-Verbindung nach {self.acquire_timeout}s (Pool-Größe {self.max_size})")
+        waited = time.monotonic() - start
+        with self._stats_lock:
+            self._acquired += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+    def _release(self):
+        with self._stats_lock:
+            self._in_use -= 1
+        self._slots.release()
+
+    def _has_request_session(self):
+        return has_app_context() and g.get("_graph_session") is self
+
+    def _begin_request_session(self):
+        """Belegt den Platz für den aktuellen Request, falls noch nicht geschehen. True wenn es einen gibt."""
+        if not has_app_context():
+            return False
+        if g.get("_graph_session") is not self:
+            self._acquire()
+            g._graph_session = self
+        return True
+
+    def _end_request_session(self, exc=None):
+        if g.pop("_graph_session", None) is self:
+            self._release()
+
+    @contextmanager
+    def session(self):
+        """Ein Platz im Pool für die Dauer des Blocks (im Request: bis zum Ende des Requests)."""
+        graph = self.graph  # wirft GraphUnavailable, bevor ein Platz belegt wird
+        owns_slot = not self._begin_request_session()
+        if owns_slot:
+            self._acquire()
+        try:
+            yield graph
+        except CONNECTION_ERRORS as e:
+            self._connection_failed(e)
+            raise self._unavailable() from e
+        finally:
+            if owns_slot:
+                self._release()
+
+    # --- Statements (Leader) ---
+
+    def _mark_write(self):
+        if has_app_context():
+            g._graph_wrote = True
+
+    def run(self, cypher, parameters=None, **kwparameters):
+        self._mark_write()
+        return timed_statement(self._run, cypher, parameters, **kwparameters)
+
+    def _run(self, cypher, parameters=None, **kwparameters):
+        with self.session() as graph:
+            return graph.run(cypher, parameters, **kwparameters)
+
+    def query(self, cypher, parameters=None, **kwparameters):
+        self._mark_write()
+        return timed_statement(self._query, cypher, parameters, **kwparameters)
+
+    def _query(self, cypher, parameters=None, **kwparameters):
+        with self.session() as graph:
+            return graph.query(cypher, parameters, **kwparameters)
+
+    def evaluate(self, cypher, parameters=None, **kwparameters):
+        return self.run(cypher, parameters, **kwparameters).evaluate()
+
+    def begin(self, readonly=False):
+        graph = self.graph
+        if not readonly:
+            self._mark_write()
+        in_request = self._begin_request_session()
+        if not in_request:
+            self._acquire()
+        try:
+            tx = graph.begin(readonly=readonly)
+        except Exception as e:
+            if not in_request:
+                self._release()
+            if isinstance(e, CONNECTION_ERRORS):
+                self._connection_failed(e)
+                raise self._unavailable() from e
+            raise
+        return PooledTransaction(self, tx, owns_slot=not in_request)
+
+    def commit(self, tx):
+        if isinstance(tx, PooledTransaction):
+            return tx.commit()
+        return self.graph.commit(tx)
+
+    def rollback(self, tx):
+        if isinstance(tx, PooledTransaction):
+            return tx.rollback()
+        return self.graph.rollback(tx)
+
+    # --- Statements (Reader) ---
+
+    def run_read(self, cypher, parameters=None, **kwparameters):
+        """Nur-Lese-Abfrage, geht an einen Reader (siehe Klassenbeschreibung)."""
+        return timed_statement(self._run_read, cypher, parameters, **kwparameters)
+
+    def _run_read(self, cypher, parameters=None, **kwparameters):
+        with self.session() as graph:
+            if self.read_uris and not (has_app_context() and g.get("_graph_wrote")):
+                try:
+                    result = self._pick_reader().auto(readonly=True).run(cypher, parameters, **kwparameters)
+                    self._count("_reads_on_readers")
+                    return result
+                except CONNECTION_ERRORS:
+                    self._count("_reader_failovers")
+
+            result = graph.auto(readonly=True).run(cypher, parameters, **kwparameters)
+            # bei Routing verteilt py2neo selbst, ansonsten ist es der Leader
+            self._count("_reads_on_readers" if self.routing else "_reads_on_leader")
+            return result
+
+    def _pick_reader(self):
+        with self._reader_lock:
+            i = next(self._next_reader)
+            if self._readers[i] is None:
+                self._readers[i] = self._new_graph(self.read_uris[i])
+            return self._readers[i]
+
+    def _count(self, field):
+        with self._stats_lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    # --- Kennzahlen ---
+
+    def pool_stats(self):
+        with self._stats_lock:
+            stats = {
+                "maxSize": self.max_size,
+                "maxAge": self.max_age,
+                "acquireTimeout": self.acquire_timeout,
+                "sessionsInUse": self._in_use,
+                "peakSessionsInUse": self._peak_in_use,
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "waitSecondsTotal": self._wait_total,
+                "waitSecondsMax": self._wait_max,
+                "routing": self.routing,
+                "readers": len(self.read_uris),
+                "readsOnReaders": self._reads_on_readers,
+                "readsOnLeader": self._reads_on_leader,
+                "readerFailovers": self._reader_failovers,
+            }
+        stats["connected"] = self._graph is not None
+        stats["circuitBreaker"] = self.breaker.stats()
+        try:
+            connector = self._graph.service.connector
+            stats["connectionsInUse"] = sum(connector.in_use.values())
+        except Exception:
+            stats["connectionsInUse"] = None
+        return stats
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.graph, name)
+
+def retry_after_header(error):
+    return str(max(1, math.ceil(error.retry_after or 0)))
+
+def graph_unavailable_response(error):
+    response = jsonify({"status": "error", "message": str(error)})
+    response.status_code = 503
+    response.headers["Retry-After"] = retry_after_header(error)
+    return response
+
+class ReadRoute:
+    """
+    Sicht auf einen GraphClient für lesende Blueprints: run/query/evaluate gehen als
+    Nur-Lese-Abfragen an die Reader, Transaktionen sind immer readonly.
+    Die Pool-Session teilt sie sich mit dem Client.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def run(self, cypher, parameters=None, **kwparameters):
+        return self.client.run_read(cypher, parameters, **kwparameters)
+
+    query = run
+
+    def evaluate(self, cypher, parameters=None, **kwparameters):
+        return self.run(cypher, parameters, **kwparameters).evaluate()
+
+    def begin(self, readonly=True):
+        return self.client.begin(readonly=True)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+class PooledTransaction:
+    """py2neo-Transaktion, die ihren Platz im Pool bei commit/rollback wieder freigibt."""
+
+    def __init__(self, client, tx, owns_slot):
+        self._client = client
+        self._tx = tx
+        self._owns_slot = owns_slot
+
+    def _finish(self):
+        if self._owns_slot:
+            self._owns_slot = False
+            self._client._release()
+
+    def run(self, cypher, parameters=None, **kwparameters):
+        return timed_statement(self._tx.run, cypher, parameters, **kwparameters)
+
+    def evaluate(self, cypher, parameters=None, **kwparameters):
+        return self.run(cypher, parameters, **kwparameters).evaluate()
+
+    def commit(self):
+        try:
+            return self._tx.graph.commit(self._tx)
+        finally:
+            self._finish()
+
+    def rollback(self):
+        try:
+            return self._tx.graph.rollback(self._tx)
+        finally:
+            self._finish()
+
+    def __getattr__(self, name):
+        return getattr(self._tx, name)
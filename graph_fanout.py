@@ -0,0 +1,39 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+class GraphFanout:
+    """
+    Mehrere lesende Abfragen eines Requests gleichzeitig absetzen, z.B. in /search eine pro Label.
+
+    Die Views selbst bleiben synchron: unter WSGI belegt ein Request seinen Worker ohnehin bis
+    zum Ende (auch eine async View würde Flask dort in einer eigenen Event-Loop zu Ende laufen
+    lassen). Gleichzeitig laufen nur die Abfragen innerhalb von `gather`, in einem Thread-Pool
+    mit höchstens `fanout` Threads pro Aufruf. Jede wird im Thread komplett gelesen (`.data()`),
+    damit kein Cursor zwischen Threads wandert.
+
+    Alle Abfragen eines Requests teilen sich die Pool-Session des GraphClient. Sie wird vor dem
+    Auffächern belegt, damit parallele Abfragen nicht gleichzeitig versuchen, sie zu öffnen, und
+    die Threads bekommen eine Kopie des Kontexts (Flask-`g`) des Requests.
+    """
+
+    def __init__(self, client, fanout=None):
+        self.client = client
+        self.fanout = fanout or int(os.getenv("NEO4J_FANOUT", "4"))
+
+    def open_session(self):
+        if hasattr(self.client, "_begin_request_session") and not self.client._has_request_session():
+            self.client._begin_request_session()
+
+    def data(self, statement, parameters=None, **identifiers):
+        """Statement ausführen und komplett lesen."""
+        return statement.run(self.client, parameters, **identifiers).data()
+
+    def gather(self, *calls):
+        """Ruft die Funktionen (ohne Argumente) gleichzeitig auf, Ergebnisse in derselben Reihenfolge."""
+        if len(calls) < 2:
+            return [call() for call in calls]
+        self.open_session()
+        with ThreadPoolExecutor(max_workers=min(self.fanout, len(calls)), thread_name_prefix="graph-fanout") as executor:
+            futures = [executor.submit(contextvars.copy_context().run, call) for call in calls]
+            return [future.result() for future in futures]
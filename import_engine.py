@@ -0,0 +1,429 @@
+"""
+CSV-Import für /save_mapping in Batches.
+
+Die Zeilen werden in Batches zu `batch_size` Zeilen (Standard `OASIS_IMPORT_BATCH_SIZE`,
+1000) gelesen. Pro Batch gibt es eine Transaktion mit einem `UNWIND $rows MERGE ...` pro
+Knoten-Typ und einem pro Relationship-Typ statt einer Abfrage pro Zeile und Typ. Schlägt ein
+Batch fehl, wird er zurückgerollt, frühere Batches bleiben committet.
+
+    engine = ImportEngine(graph, mapping_data)
+    stats = engine.run(csv.DictReader(f))   # {"rows": ..., "rowsPerSecond": ..., ...}
+
+Mit `OASIS_IMPORT_WRITERS` > 1 importiert `ParallelImportEngine` mit mehreren Schreibern
+gleichzeitig (siehe dort), `create_import_engine` wählt anhand der Schreiberzahl.
+
+Vor dem Import wird für jeden Merge-Schlüssel ein Index angelegt, falls es noch keinen gibt
+(`OASIS_IMPORT_KEY_SCHEMA`: `index`, `unique` für Uniqueness-Constraints oder `off`), sonst
+wäre jedes MERGE ein Scan über alle Knoten des Labels.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from py2neo.errors import TransientError
+import statements
+from index_manager import IndexManager
+
+DEFAULT_BATCH_SIZE = int(os.getenv("OASIS_IMPORT_BATCH_SIZE", "1000"))
+DEFAULT_WRITERS = int(os.getenv("OASIS_IMPORT_WRITERS", "1"))
+KEY_SCHEMA = os.getenv("OASIS_IMPORT_KEY_SCHEMA", "index").lower()
+
+# so oft wird eine Transaktion nach TransientError (z.B. Deadlock) wiederholt
+TRANSIENT_RETRIES = 3
+
+# so lange darf ein Schreiber des parallelen Imports keinen Batch annehmen bzw. am Ende nicht
+# fertig werden (hängende Bolt-Session, Sperre), danach bricht der Import ab
+WRITER_TIMEOUT = float(os.getenv("OASIS_IMPORT_WRITER_TIMEOUT", "600"))
+
+class ImportWriterStalled(RuntimeError):
+    """Ein Schreiber des parallelen Imports hat innerhalb von WRITER_TIMEOUT nichts angenommen."""
+
+def clean_rel_type(rel_type):
+    return rel_type.replace(' ', '_').upper()
+
+def node_props(fields, row):
+    """Properties eines Knotens aus einer Zeile, leere Werte fallen weg."""
+    props = {}
+    for field_map in fields:
+        value = row.get(field_map['original'])
+        if value:
+            props[field_map['renamed']] = value
+    return props
+
+def merge_keys(nodes):
+    """
+    (Label, Property), über die gemergt wird: die erste zugeordnete Property jedes Knoten-Typs.
+    Ist sie in einer Zeile leer, mergt die Zeile über die nächste, dafür gibt es keinen Index.
+    """
+    return [(label, fields[0]['renamed']) for label, fields in nodes.items() if fields]
+
+class ImportEngine:
+    """Importiert Zeilen nach einem Mapping aus mapping.js ({"nodes": ..., "relationships": ...})."""
+
+    def __init__(self, graph, mapping_data, batch_size=None):
+        self.graph = graph
+        self.nodes = (mapping_data or {}).get('nodes') or {}
+        self.relationships = [
+            (rel['from'], rel['to'], clean_rel_type(rel['type']))
+            for rel in (mapping_data or {}).get('relationships') or []
+        ]
+        self.batch_size = max(1, int(batch_size or DEFAULT_BATCH_SIZE))
+
+        self.rows = 0
+        self.batches = 0
+        self.nodes_merged = 0
+        self.relationships_merged = 0
+        self.seconds = 0.0
+        self.phase = None
+        self.indexes_created = []
+        self._started = None
+
+    def prepare(self):
+        """Legt fehlende Indexe bzw. Constraints für die Merge-Schlüssel an und wartet, bis sie ONLINE sind."""
+        if KEY_SCHEMA == "off" or not self.nodes:
+            return
+        self.phase = "indexes"
+        try:
+            self.indexes_created = IndexManager(self.graph).ensure_lookup_indexes(
+                merge_keys(self.nodes), unique=KEY_SCHEMA == "unique"
+            )
+        finally:
+            self.phase = None
+
+    def run(self, rows):
+        self.prepare()
+        start = self._started = time.perf_counter()
+        rows = iter(rows)
+        try:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                nodes, relationships = self._import_batch(batch)
+                self.rows += len(batch)
+                self.batches += 1
+                self.nodes_merged += nodes
+                self.relationships_merged += relationships
+        finally:
+            self.seconds = time.perf_counter() - start
+            self._started = None
+        return self.stats()
+
+    def stats(self):
+        """Zwischenstand, kann während `run` aus einem anderen Thread abgefragt werden."""
+        if self._started is not None:
+            self.seconds = time.perf_counter() - self._started
+        return {
+            "rows": self.rows,
+            "batches": self.batches,
+            "nodes": self.nodes_merged,
+            "relationships": self.relationships_merged,
+            "seconds": round(self.seconds, 3),
+            "rowsPerSecond": round(self.rows / self.seconds, 1) if self.seconds > 0 else None,
+            "phase": self.phase,
+            "indexesCreated": list(self.indexes_created),
+        }
+
+    def _import_batch(self, batch):
+        return self._in_transaction(lambda tx: self._merge_batch(tx, batch))
+
+    def _in_transaction(self, work, retries=0):
+        """`work(tx)` in einer Transaktion, nach TransientError bis zu `retries` Mal erneut."""
+        for attempt in range(retries + 1):
+            tx = self.graph.begin()
+            try:
+                result = work(tx)
+                self.graph.commit(tx)
+                return result
+            except TransientError:
+                try:
+                    self.graph.rollback(tx)
+                except Exception:
+                    pass  # nach fehlgeschlagenem Commit ist die Transaktion schon zu
+                if attempt == retries:
+                    raise
+                time.sleep(0.05 * 2 ** attempt)
+            except Exception:
+                self.graph.rollback(tx)
+                raise
+
+    def _node_rows(self, batch):
+        """
+        {(Label, Schlüssel): [Zeile]} für einen Batch. Gemergt wird wie bisher über die erste
+        nicht-leere Property, der Schlüssel kann daher pro Zeile verschieden sein.
+        """
+        groups = {}
+        for i, row in enumerate(batch):
+            for label, fields in self.nodes.items():
+                props = node_props(fields, row)
+                if not props:
+                    continue
+                key, value = next(iter(props.items()))
+                groups.setdefault((label, key), []).append({"i": i, "identifier_value": value, "all_props": props})
+        return groups
+
+    def _relationship_rows(self, batch_len, ids):
+        """{(von, nach, Typ): [{"from_id", "to_id"}]}, jedes Knotenpaar nur einmal pro Batch."""
+        groups = {}
+        for from_label, to_label, rel_type in self.relationships:
+            pairs = {}
+            for i in range(batch_len):
+                from_id = ids.get((i, from_label))
+                to_id = ids.get((i, to_label))
+                if from_id is not None and to_id is not None:
+                    pairs[from_id, to_id] = None
+            if pairs:
+                rows = groups.setdefault((from_label, to_label, rel_type), [])
+                rows.extend({"from_id": a, "to_id": b} for a, b in pairs)
+        return groups
+
+    def _merge_batch(self, tx, batch):
+        ids = {}
+        for (label, key), rows in self._node_rows(batch).items():
+            records = statements.IMPORT_MERGE_NODES.run(tx, {"rows": rows}, label=label, key=key).data()
+            for record in records:
+                ids[record["i"], label] = record["id"]
+
+        relationships = 0
+        for (from_label, to_label, rel_type), rows in self._relationship_rows(len(batch), ids).items():
+            statements.IMPORT_MERGE_RELATIONSHIPS.run(
+                tx, {"rows": rows},
+                from_label=from_label, to_label=to_label, rel_type=rel_type
+            )
+            relationships += len(rows)
+        return len(ids), relationships
+
+class ParallelImportEngine(ImportEngine):
+    """
+    Import mit `writers` Schreibern gleichzeitig, jeder mit eigener Transaktion und eigenem
+    Platz im Neo4j-Pool (`writers` sollte daher kleiner als `NEO4J_POOL_SIZE` sein).
+
+    1. Knoten: die Zeilen werden nach dem Merge-Schlüssel (Label, Property, Wert) auf die
+       Schreiber verteilt. Derselbe Knoten landet so immer beim selben Schreiber, zwei
+       Transaktionen warten nie auf die Sperre desselben Knotens. Jeder Knoten wird nur beim
+       ersten Vorkommen gemergt (ON CREATE SET greift ohnehin nur dort).
+    2. Beziehungen, erst wenn alle Knoten existieren: die Paare werden nach Start- und
+       Endknoten in writers x writers Eimer geteilt und in `writers` Runden abgearbeitet, in
+       Runde r nimmt Schreiber w den Eimer (w, w + r). Gleichzeitig laufende Transaktionen
+       teilen sich so weder Start- noch Endknoten-Partition. Das reicht nur, wenn kein Knoten
+       zugleich Start und Ende ist: bei verketteten Mappings (Person -> Stadt -> Land) laufen
+       die Typen daher in getrennten Durchgängen, Typen von einem Label auf sich selbst mit
+       einem einzigen Schreiber.
+
+    Die Zuordnung Schlüssel -> Knoten-id hält der Import für die Dauer von Phase 2 im Speicher.
+    """
+
+    def __init__(self, graph, mapping_data, batch_size=None, writers=None, writer_timeout=None):
+        super().__init__(graph, mapping_data, batch_size)
+        self.writers = max(1, int(writers or DEFAULT_WRITERS))
+        self.writer_timeout = WRITER_TIMEOUT if writer_timeout is None else writer_timeout
+        self._count_lock = threading.Lock()
+
+    def run(self, rows):
+        self.prepare()
+        start = self._started = time.perf_counter()
+        try:
+            self.phase = "nodes"
+            ids, pairs = self._merge_nodes(iter(rows))
+            self.phase = "relationships"
+            self._merge_relationships(ids, pairs)
+            self.phase = None
+        finally:
+            self.seconds = time.perf_counter() - start
+            self._started = None
+        return self.stats()
+
+    def _count(self, batches=0, nodes=0, relationships=0):
+        with self._count_lock:
+            self.batches += batches
+            self.nodes_merged += nodes
+            self.relationships_merged += relationships
+
+    # --- Phase 1: Knoten ---
+
+    def _merge_nodes(self, rows):
+        """
+        Liest alle Zeilen und verteilt die Knoten auf die Schreiber. Gibt die Knoten-ids
+        (Index des Schlüssels -> id) und die Beziehungen als {(von, nach, Typ): {(Index, Index)}} zurück.
+        """
+        queues = [queue.Queue(maxsize=4) for _ in range(self.writers)]
+        ids = [{} for _ in range(self.writers)]
+        errors = []
+
+        def writer(partition):
+            while True:
+                chunk = queues[partition].get()
+                if chunk is None:
+                    return
+                if errors:
+                    continue  # nur noch leeren, damit der Leser nicht blockiert
+                try:
+                    self._write_nodes(chunk, ids[partition])
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [
+            threading.Thread(target=writer, args=(p,), name=f"import-writer-{p}", daemon=True)
+            for p in range(self.writers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        stalled = set()
+
+        def hand_over(partition, chunk):
+            # put ohne Timeout hinge mit, wenn der Schreiber in _write_nodes festsitzt
+            deadline = time.monotonic() + self.writer_timeout
+            while True:
+                try:
+                    queues[partition].put(chunk, timeout=min(0.5, self.writer_timeout))
+                    return
+                except queue.Full:
+                    if errors and chunk is not None:
+                        raise errors[0]
+                    if not threads[partition].is_alive() or time.monotonic() > deadline:
+                        stalled.add(partition)
+                        raise ImportWriterStalled(f"{threads[partition].name} nimmt keine Batches mehr an")
+
+        index = {}
+        pending = [[] for _ in range(self.writers)]
+        pairs = {}
+        try:
+            for row in rows:
+                if errors:
+                    break
+                keys = {}
+                for label, fields in self.nodes.items():
+                    props = node_props(fields, row)
+                    if not props:
+                        continue
+                    key, value = next(iter(props.items()))
+                    node_key = (label, key, value)
+                    n = index.get(node_key)
+                    if n is None:
+                        n = index[node_key] = len(index)
+                        partition = hash(node_key) % self.writers
+                        pending[partition].append((n, label, key, value, props))
+                        if len(pending[partition]) >= self.batch_size:
+                            hand_over(partition, pending[partition])
+                            pending[partition] = []
+                    keys[label] = n
+
+                for rel in self.relationships:
+                    from_n = keys.get(rel[0])
+                    to_n = keys.get(rel[1])
+                    if from_n is not None and to_n is not None:
+                        pairs.setdefault(rel, {})[from_n, to_n] = None
+                self.rows += 1
+        finally:
+            for partition in range(self.writers):
+                if partition in stalled:
+                    continue
+                try:
+                    if pending[partition] and not errors:
+                        hand_over(partition, pending[partition])
+                    hand_over(partition, None)
+                except ImportWriterStalled:
+                    pass  # steht in `stalled`
+            deadline = time.monotonic() + self.writer_timeout
+            for partition, thread in enumerate(threads):
+                if partition not in stalled:
+                    thread.join(max(0.0, deadline - time.monotonic()))
+
+        if errors:
+            raise errors[0]
+        hanging = [thread.name for thread in threads if thread.is_alive()]
+        if hanging:
+            raise ImportWriterStalled(f"{', '.join(hanging)} nach {self.writer_timeout:.0f}s nicht fertig")
+
+        node_ids = {}
+        for partition_ids in ids:
+            node_ids.update(partition_ids)
+        return node_ids, pairs
+
+    def _write_nodes(self, chunk, ids):
+        groups = {}
+        for n, label, key, value, props in chunk:
+            groups.setdefault((label, key), []).append({"i": n, "identifier_value": value, "all_props": props})
+
+        def work(tx):
+            merged = {}
+            for (label, key), rows in groups.items():
+                for record in statements.IMPORT_MERGE_NODES.run(tx, {"rows": rows}, label=label, key=key).data():
+                    merged[record["i"]] = record["id"]
+            return merged
+
+        ids.update(self._in_transaction(work, TRANSIENT_RETRIES))
+        self._count(batches=1, nodes=len(chunk))
+
+    # --- Phase 2: Beziehungen ---
+
+    def _merge_relationships(self, ids, pairs):
+        with ThreadPoolExecutor(max_workers=self.writers, thread_name_prefix="import-writer") as executor:
+            for round_buckets in self._relationship_rounds(ids, pairs):
+                # list() wartet die Runde ab und gibt Fehler weiter
+                list(executor.map(self._write_relationships, round_buckets))
+
+    def _relationship_rounds(self, ids, pairs):
+        """
+        Liefert die Eimer je Runde; die Eimer einer Runde teilen sich keinen Knoten und
+        können gleichzeitig geschrieben werden.
+        """
+        for rel_types, writers in self._relationship_passes(list(pairs)):
+            buckets = {}
+            for rel in rel_types:
+                for from_n, to_n in pairs.pop(rel):
+                    from_id = ids.get(from_n)
+                    to_id = ids.get(to_n)
+                    if from_id is None or to_id is None:
+                        continue
+                    bucket = buckets.setdefault((from_id % writers, to_id % writers), {})
+                    bucket.setdefault(rel, []).append({"from_id": from_id, "to_id": to_id})
+
+            for r in range(writers):
+                round_buckets = [buckets.pop((w, (w + r) % writers), None) for w in range(writers)]
+                round_buckets = [b for b in round_buckets if b]
+                if round_buckets:
+                    yield round_buckets
+
+    def _relationship_passes(self, rel_types):
+        """
+        Teilt die Beziehungstypen in Durchgänge [(Typen, Schreiber)], in denen kein Label
+        zugleich Start- und End-Label ist. Nur dann gehört jeder Knoten eines Durchgangs
+        entweder zu den Start- oder zu den Endknoten und die Runden sind überschneidungsfrei.
+        """
+        passes = []
+        for rel in rel_types:
+            from_label, to_label = rel[0], rel[1]
+            if from_label == to_label:
+                passes.append(([rel], set(), set(), 1))
+                continue
+            for types, starts, ends, writers in passes:
+                if writers > 1 and from_label not in ends and to_label not in starts:
+                    break
+            else:
+                types, starts, ends = [], set(), set()
+                passes.append((types, starts, ends, self.writers))
+            types.append(rel)
+            starts.add(from_label)
+            ends.add(to_label)
+        return [(types, writers) for types, _, _, writers in passes]
+
+    def _write_relationships(self, bucket):
+        for (from_label, to_label, rel_type), rows in bucket.items():
+            for offset in range(0, len(rows), self.batch_size):
+                batch = rows[offset:offset + self.batch_size]
+                self._in_transaction(lambda tx: statements.IMPORT_MERGE_RELATIONSHIPS.run(
+                    tx, {"rows": batch},
+                    from_label=from_label, to_label=to_label, rel_type=rel_type
+                ), TRANSIENT_RETRIES)
+                self._count(batches=1, relationships=len(batch))
+
+def create_import_engine(graph, mapping_data, batch_size=None, writers=None):
+    """ParallelImportEngine bei mehr als einem Schreiber, sonst ImportEngine."""
+    writers = int(writers or DEFAULT_WRITERS)
+    if writers > 1:
+        return ParallelImportEngine(graph, mapping_data, batch_size, writers)
+    return ImportEngine(graph, mapping_data, batch_size)
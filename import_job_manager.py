@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from import_engine import create_import_engine
+from table_cache import bump_write_generation
+from upload_spool import open_csv, upload_spool
+
+class ImportJob:
+    """Ein CSV-Import im Hintergrund, der Fortschritt kommt aus den Zählern der ImportEngine."""
+
+    def __init__(self, job_id, engine, upload_id=None, raw_data=None):
+        self.id = job_id
+        self.engine = engine
+        self.upload_id = upload_id
+        self.raw_data = raw_data
+        self.state = "queued"
+        self.rows_total = None
+        self.errors = []
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def run(self):
+        self.state = "running"
+        try:
+            if self.upload_id is not None:
+                self.rows_total = upload_spool.count_lines(self.upload_id)
+            else:
+                self.rows_total = max(0, len(self.raw_data.splitlines()) - 1)
+
+            with open_csv(self.upload_id, self.raw_data) as reader:
+                self.raw_data = None
+                if reader is None:
+                    raise ValueError("Fehler beim Analysieren der CSV-Daten.")
+                self.engine.run(reader)
+            self.state = "done"
+        except Exception as e:
+            print(f"Import-Job {self.id} fehlgeschlagen: {e}")
+            traceback.print_exc()
+            self.errors.append(str(e))
+            self.state = "failed"
+        finally:
+            self.finished_at = time.time()
+            if self.upload_id is not None:
+                upload_spool.unpin(self.upload_id)
+            # auch bei Fehlern können schon Batches committet sein
+            bump_write_generation()
+
+    def status(self):
+        stats = self.engine.stats()
+        rows_total = self.rows_total
+        if rows_total is not None:
+            # Zeilen mit Zeilenumbrüchen in Anführungszeichen zählen doppelt, daher nur Schätzung
+            rows_total = max(rows_total, stats["rows"])
+            if self.state == "done":
+                rows_total = stats["rows"]
+
+        eta = None
+        # in der Beziehungs-Phase des parallelen Imports sind alle Zeilen gelesen, dafür gibt es keine ETA
+        if self.state == "running" and stats["phase"] != "relationships" and rows_total is not None and stats["rowsPerSecond"]:
+            eta = round((rows_total - stats["rows"]) / stats["rowsPerSecond"], 1)
+
+        return {
+            "id": self.id,
+            "state": self.state,
+            "phase": stats["phase"],
+            "rowsProcessed": stats["rows"],
+            "rowsTotal": rows_total,
+            "rowsPerSecond": stats["rowsPerSecond"],
+            "etaSeconds": eta,
+            "batches": stats["batches"],
+            "nodes": stats["nodes"],
+            "relationships": stats["relationships"],
+            "seconds": stats["seconds"],
+            "errors": list(self.errors),
+            "indexesCreated": stats["indexesCreated"],
+            "createdAt": self.created_at,
+            "finishedAt": self.finished_at,
+        }
+
+class ImportJobManager:
+    """
+    Führt Importe in einem Thread-Pool im Prozess aus (`workers` gleichzeitig, weitere
+    warten). Die letzten `keep` Jobs bleiben für Statusabfragen im Speicher. Jobs gibt es
+    nur in dem Prozess, der sie angenommen hat, und sie gehen beim Neustart verloren.
+    """
+
+    def __init__(self, workers=1, keep=50):
+        self.workers = workers
+        self.keep = keep
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="import-job")
+            return self._executor
+
+    def submit(self, graph, mapping_data, upload_id=None, raw_data=None, batch_size=None, writers=None):
+        engine = create_import_engine(graph, mapping_data, batch_size, writers)
+        if upload_id is not None:
+            # bis der Job läuft, kann es länger dauern als die TTL des Spools
+            upload_spool.pin(upload_id)
+        with self._lock:
+            job = ImportJob(uuid.uuid4().hex, engine, upload_id, raw_data)
+            self._jobs[job.id] = job
+            self._forget_finished()
+        self._pool().submit(job.run)
+        return job
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in ("done", "failed")]
+        for job_id in finished[:max(0, len(self._jobs) - self.keep)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Neueste zuerst."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+import_jobs = ImportJobManager(
+    workers=int(os.getenv("OASIS_IMPORT_WORKERS", "1")),
+    keep=int(os.getenv("OASIS_IMPORT_JOBS_KEEP", "50"))
+)
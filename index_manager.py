@@ -1,68 +1,129 @@
+import os
+import time
 from flask import Blueprint, request, jsonify, render_template
+import statements
+
+# so lange wird höchstens gewartet, bis ein neuer Index bzw. Constraint ONLINE ist
+INDEX_ONLINE_TIMEOUT = float(os.getenv("OASIS_INDEX_ONLINE_TIMEOUT", "300"))
+
+# Index-Arten, die MERGE/MATCH auf Gleichheit einer Property beschleunigen
+LOOKUP_INDEX_TYPES = ("RANGE", "BTREE")
+
+class IndexManager:
+    """Label-/Property-Indexe in Neo4j: anzeigen, anlegen und warten, bis sie ONLINE sind."""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def get_node_labels(self):
+        try:
+            result = statements.INDEX_LABELS.run(self.driver).data()
+            return [r["label"] for r in result]
+        except Exception as e:
+            raise RuntimeError(f"Neo4j-Fehler bei get_node_labels: {e}") from e
+
+    def get_properties_for_label(self, label):
+        try:
+            result = statements.LABEL_PROPERTY_KEYS.run(self.driver, label=label).data()
+            return [r["prop"] for r in result]
+        except Exception as e:
+            raise RuntimeError(f"Neo4j-Fehler bei get_properties_for_label({label}): {e}") from e
+
+    def get_existing_indexes(self):
+        try:
+            result = statements.SHOW_INDEXES.run(self.driver).data()
+            indexes = []
+            for r in result:
+                labels = r.get("labelsOrTypes") or []
+                if isinstance(labels, str):
+                    labels = [labels]
+                props = r.get("properties") or []
+                if isinstance(props, str):
+                    props = [props]
+                if labels and props:  # nur echte Label-Property-Indizes
+                    indexes.append({
+                        "name": r.get("name"),
+                        "entityType": (r.get("entityType") or "").upper(),
+                        "labels": labels,
+                        "properties": props,
+                        "type": (r.get("type") or "").upper(),
+                        "state": (r.get("state") or "").upper(),
+                        "unique": bool(r.get("owningConstraint")) or r.get("uniqueness") == "UNIQUE",
+                    })
+            return indexes
+        except Exception as e:
+            print(f"Warnung: Fehler beim Abrufen der Indizes: {e}")
+            return []
+
+    def create_index(self, label, prop, timeout=INDEX_ONLINE_TIMEOUT):
+        statements.CREATE_INDEX.run(self.driver, label=label, property=prop)
+        self.wait_online(label, prop, timeout)
+
+    def create_unique_constraint(self, label, prop, timeout=INDEX_ONLINE_TIMEOUT):
+        """Eindeutigkeit von label.prop, schlägt fehl, wenn es schon doppelte Werte gibt."""
+        statements.CREATE_UNIQUE_CONSTRAINT.run(self.driver, label=label, property=prop)
+        self.wait_online(label, prop, timeout)
+
+    def wait_online(self, label, prop, timeout=INDEX_ONLINE_TIMEOUT):
+        """
+        Fragt SHOW INDEXES ab, bis der Index für label.prop ONLINE ist. Zählt nur Knoten-Indexe
+        der Arten aus LOOKUP_INDEX_TYPES auf genau dieser Property, ein Volltext- oder
+        Relationship-Index auf demselben Label/Property ist nicht der angelegte.
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        while True:
+            states = [
+                idx["state"] for idx in self.get_existing_indexes()
+                if idx["entityType"] == "NODE" and idx["type"] in LOOKUP_INDEX_TYPES
+                and label in idx["labels"] and idx["properties"] == [prop]
+            ]
+            if not states:
+                raise RuntimeError(f"Index für {label}.{prop} wurde nicht gefunden")
+            if "ONLINE" in states:
+                return  # Index ist fertig
+            if "FAILED" in states:
+                raise RuntimeError(f"Index für {label}.{prop} ist FAILED")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Index für {label}.{prop} ist nach {timeout:.0f}s noch nicht ONLINE")
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    def ensure_lookup_indexes(self, pairs, unique=False):
+        """
+        Legt für jedes (Label, Property) aus `pairs` einen Index an, falls es noch keinen gibt, mit
+        dem Neo4j Gleichheitsabfragen auf diese Property beantworten kann, und wartet, bis er ONLINE
+        ist. Mit `unique` wird stattdessen ein Uniqueness-Constraint angelegt, bei doppelten Werten
+        im Bestand ersatzweise ein normaler Index. Gibt die angelegten als
+        [{"label", "property", "kind"}] zurück.
+        """
+        existing = {
+            (label, idx["properties"][0])
+            for idx in self.get_existing_indexes()
+            if idx["entityType"] == "NODE" and (idx["type"] in LOOKUP_INDEX_TYPES or idx["unique"])
+            for label in idx["labels"]
+        }
+        created = []
+        for label, prop in dict.fromkeys(pairs):
+            if (label, prop) in existing:
+                continue
+            kind = "index"
+            if unique:
+                try:
+                    self.create_unique_constraint(label, prop)
+                    kind = "constraint"
+                except Exception as e:
+                    print(f"Uniqueness-Constraint für {label}.{prop} nicht möglich ({e}), lege Index an")
+            if kind == "index":
+                self.create_index(label, prop)
+            print(f"{'Constraint' if kind == 'constraint' else 'Index'} für {label}.{prop} angelegt")
+            created.append({"label": label, "property": prop, "kind": kind})
+        return created
 
 def create_index_bp(graph):
     bp = Blueprint("index_bp", __name__)
 
-    class GraphAPI:
-        def __init__(self, driver):
-            self.driver = driver
-
-        def get_node_labels(self):
-            try:
-                result = self.driver.run("CALL db.labels()").data()
-                return [r["label"] for r in result]
-            except Exception as e:
-                raise RuntimeError(f"Neo4j-Fehler bei get_node_labels: {e}") from e
-
-        def get_properties_for_label(self, label):
-            try:
-                result = self.driver.run(
-                    f"MATCH (n:`{label}`) UNWIND keys(n) AS k RETURN DISTINCT k AS prop"
-                ).data()
-                return [r["prop"] for r in result]
-            except Exception as e:
-                raise RuntimeError(f"Neo4j-Fehler bei get_properties_for_label({label}): {e}") from e
-
-        def get_existing_indexes(self):
-            try:
-                result = self.driver.run("SHOW INDEXES").data()
-                indexes = []
-                for r in result:
-                    labels = r.get("labelsOrTypes") or []
-                    if isinstance(labels, str):
-                        labels = [labels]
-                    props = r.get("properties") or []
-                    if isinstance(props, str):
-                        props = [props]
-                    if labels and props:  # nur echte Label-Property-Indizes
-                        indexes.append({"labels": labels, "properties": props})
-                return indexes
-            except Exception as e:
-                print(f"Warnung: Fehler beim Abrufen der Indizes: {e}")
-                return []
-
-        def create_index(self, label, prop):
-            query = f"CREATE INDEX IF NOT EXISTS FOR (n:`{label}`) ON (n.`{prop}`)"
-            self.driver.run(query)
-
-            # systematisch prüfen, bis der Index ONLINE ist
-            while True:
-                indexes = self.driver.run("SHOW INDEXES").data()
-                found = False
-                for idx in indexes:
-                    labels = idx.get("labelsOrTypes") or idx.get("entityType") or []
-                    props = idx.get("properties") or []
-                    state = idx.get("state") or ""
-                    if label in labels and prop in props:
-                        found = True
-                        if state.upper() == "ONLINE":
-                            return  # Index ist fertig
-
-                        break  # Index existiert, aber nicht ONLINE
-                if not found:
-                    raise RuntimeError(f"Index für {label}.{prop} wurde nicht gefunden")
-
-    api = GraphAPI(graph)
+    api = IndexManager(graph)
 
     # === GET-Route: GUI-Seite ===
     @bp.route("/index_manager", methods=["GET"])
@@ -71,7 +132,10 @@ def create_index_bp(graph):
             node_labels = api.get_node_labels()
             label_props = {label: api.get_properties_for_label(label) for label in node_labels}
             existing_indexes = api.get_existing_indexes()
-            indexed_pairs = {(l, p) for idx in existing_indexes for l in idx["labels"] for p in idx["properties"]}
+            indexed_pairs = {
+                (l, p) for idx in existing_indexes if idx["entityType"] == "NODE"
+                for l in idx["labels"] for p in idx["properties"]
+            }
             return render_template(
                 "index_manager.html",
                 labels=node_labels,
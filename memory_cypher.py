@@ -0,0 +1,2106 @@
+"""
+Cypher für das In-Memory-Backend (GRAPH_BACKEND=memory, siehe memory_graph.py).
+
+Parser und Auswertung für den Teil von Cypher, den die Blueprints, statements.py und der
+CSV-Import schicken, damit auf Neo4j und auf dem In-Memory-Graphen dieselben Statements laufen:
+
+- MATCH/OPTIONAL MATCH (auch Pfade variabler Länge und benannte Pfade) mit WHERE,
+  WITH/RETURN mit DISTINCT, Aggregation, ORDER BY, SKIP und LIMIT, UNWIND, UNION [ALL],
+  CALL { ... } und CALL db.labels()/db.relationshipTypes()/db.propertyKeys(),
+- CREATE, MERGE mit ON CREATE/ON MATCH SET, SET, REMOVE, [DETACH] DELETE,
+- SHOW INDEXES, CREATE INDEX, CREATE CONSTRAINT ... IS UNIQUE, DROP INDEX/CONSTRAINT.
+
+Alles andere (APOC, Pattern-Ausdrücke im WHERE, zusammengesetzte Indexe, ...) ergibt wie bei
+Neo4j einen ClientError, die Aufrufer haben dafür denselben Fallback wie bei Neo4j.
+
+Ein MATCH beginnt bei einer schon gebundenen Variable, sonst bei `id(n) = ...` bzw.
+`id(n) IN ...` aus dem WHERE, dann über einen Property-Index (Inline-Properties oder
+`n.key = ...` im WHERE) und erst zuletzt beim kleinsten Label-Scan.
+"""
+import math
+import re
+import threading
+from itertools import islice
+from interchange.time import Date
+from py2neo.errors import Neo4jError
+from memory_graph import MemoryNode, MemoryRelationship, MemoryPath
+
+# so viele geparste Statements werden gemerkt (wie MAX_COMPILED in statements.py)
+MAX_PARSED = 1024
+
+SYNTAX_ERROR = "Neo.ClientError.Statement.SyntaxError"
+TYPE_ERROR = "Neo.ClientError.Statement.TypeError"
+
+_MISSING = object()
+
+# unter diesem Schlüssel stehen in der Zeile die Ergebnisse der Aggregationen einer Gruppe
+_AGGREGATES_KEY = "\0aggregates"
+
+def _error(message, code=SYNTAX_ERROR):
+    return Neo4jError(message, code)
+
+def _type_error(message):
+    return Neo4jError(message, TYPE_ERROR)
+
+# --- Ergebnis ----------------------------------------------------------------------------
+
+class MemoryRecord:
+    """Eine Ergebniszeile wie py2neo.Record: Zugriff per Spaltenname oder Position."""
+
+    __slots__ = ("_keys", "_values")
+
+    def __init__(self, keys, values):
+        self._keys = keys
+        self._values = values
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return list(self._values)
+
+    def items(self):
+        return list(zip(self._keys, self._values))
+
+    def data(self):
+        return dict(zip(self._keys, self._values))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError, IndexError):
+            return default
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._values[key]
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"MemoryRecord({self.data()!r})"
+
+class MemoryCursor:
+    """Ergebnis von MemoryGraph.run, mit den Methoden von py2neo.Cursor, die die App benutzt."""
+
+    def __init__(self, keys, rows):
+        self._keys = list(keys)
+        self._rows = rows
+        self._position = 0
+
+    def keys(self):
+        return list(self._keys)
+
+    def data(self, *keys):
+        rows = [dict(zip(self._keys, row)) for row in self._rows[self._position:]]
+        self._position = len(self._rows)
+        if keys:
+            rows = [{key: row[key] for key in keys} for row in rows]
+        return rows
+
+    def evaluate(self, field=0):
+        record = next(self, None)
+        return None if record is None else record[field]
+
+    def __next__(self):
+        if self._position >= len(self._rows):
+            raise StopIteration
+        self._position += 1
+        return MemoryRecord(self._keys, self._rows[self._position - 1])
+
+    def __iter__(self):
+        return self
+
+# --- Werte -------------------------------------------------------------------------------
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _is_entity(value):
+    return isinstance(value, (MemoryNode, MemoryRelationship))
+
+def _bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    raise _type_error(f"Expected a Boolean, got {value!r}")
+
+def _equals(a, b):
+    """`a = b` in Cypher: True, False oder None (NULL)."""
+    if a is None or b is None:
+        return None
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    if _is_number(a) and _is_number(b):
+        return a == b
+    if isinstance(a, (MemoryNode, MemoryRelationship, MemoryPath)) or isinstance(b, (MemoryNode, MemoryRelationship, MemoryPath)):
+        return a == b
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        if len(a) != len(b):
+            return False
+        result = True
+        for x, y in zip(a, b):
+            equal = _equals(x, y)
+            if equal is False:
+                return False
+            if equal is None:
+                result = None
+        return result
+    if isinstance(a, dict) and isinstance(b, dict):
+        if set(a) != set(b):
+            return False
+        return _equals([a[k] for k in sorted(a)], [b[k] for k in sorted(b)])
+    if type(a) is not type(b):
+        return False
+    return a == b
+
+def _compare(a, b):
+    """-1, 0, 1 für `<`/`>` oder None, wenn Cypher die Werte nicht vergleicht."""
+    if a is None or b is None:
+        return None
+    if _is_number(a) and _is_number(b):
+        if a != a or b != b:
+            return None  # NaN
+        return (a > b) - (a < b)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        for x, y in zip(a, b):
+            result = _compare(x, y)
+            if result != 0:
+                return result
+        return (len(a) > len(b)) - (len(a) < len(b))
+    if type(a) is not type(b) or isinstance(a, (dict, MemoryPath)):
+        return None
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        return None
+
+def _order_key(value):
+    """Sortierschlüssel in der Reihenfolge von ORDER BY: Map, Knoten, Relationship, Liste, Pfad,
+    Zeitwerte, String, Boolean, Zahl, NULL."""
+    if value is None:
+        return (9,)
+    if isinstance(value, bool):
+        return (6, value)
+    if isinstance(value, (int, float)):
+        return (7, value) if value == value else (8,)
+    if isinstance(value, str):
+        return (5, value)
+    if isinstance(value, MemoryNode):
+        return (1, value.identity)
+    if isinstance(value, MemoryRelationship):
+        return (2, value.identity)
+    if isinstance(value, MemoryPath):
+        return (4, tuple(r.identity for r in value.relationships), value.nodes[0].identity)
+    if isinstance(value, (list, tuple)):
+        return (3, tuple(_order_key(v) for v in value))
+    if isinstance(value, dict):
+        return (0, tuple(sorted((k, _order_key(v)) for k, v in value.items())))
+    return (4.5, type(value).__name__, value)
+
+def _key(value):
+    """Hashbarer Schlüssel für DISTINCT, Gruppierung und UNION."""
+    if isinstance(value, bool):
+        return ("bool", value)
+    if isinstance(value, MemoryNode):
+        return ("node", value.identity)
+    if isinstance(value, MemoryRelationship):
+        return ("relationship", value.identity)
+    if isinstance(value, MemoryPath):
+        return ("path", value.nodes[0].identity, tuple(r.identity for r in value.relationships))
+    if isinstance(value, (list, tuple)):
+        return ("list", tuple(_key(v) for v in value))
+    if isinstance(value, dict):
+        return ("map", tuple(sorted((k, _key(v)) for k, v in value.items())))
+    return value
+
+def _add(a, b):
+    if a is None or b is None:
+        return None
+    if isinstance(a, (list, tuple)) or isinstance(b, (list, tuple)):
+        return (list(a) if isinstance(a, (list, tuple)) else [a]) + (list(b) if isinstance(b, (list, tuple)) else [b])
+    if _is_number(a) and _is_number(b):
+        return a + b
+    if isinstance(a, str) and (isinstance(b, str) or _is_number(b)):
+        return a + _to_string(b)
+    if isinstance(b, str) and _is_number(a):
+        return _to_string(a) + b
+    try:
+        return a + b
+    except TypeError:
+        raise _type_error(f"Cannot add {a!r} and {b!r}") from None
+
+def _arithmetic(operation, symbol):
+    def apply(a, b):
+        if a is None or b is None:
+            return None
+        if not (_is_number(a) and _is_number(b)):
+            try:
+                return operation(a, b)
+            except TypeError:
+                raise _type_error(f"Cannot apply {symbol} to {a!r} and {b!r}") from None
+        return operation(a, b)
+    return apply
+
+def _divide(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        if b == 0:
+            raise _error("/ by zero", "Neo.ClientError.Statement.ArithmeticError")
+        quotient = abs(a) // abs(b)
+        return quotient if (a < 0) == (b < 0) else -quotient
+    if b == 0:
+        return math.nan if a == 0 else math.copysign(math.inf, a)
+    return a / b
+
+def _modulo(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        if b == 0:
+            raise _error("/ by zero", "Neo.ClientError.Statement.ArithmeticError")
+        remainder = abs(a) % abs(b)
+        return remainder if a >= 0 else -remainder
+    return math.fmod(a, b)
+
+def _in(value, items):
+    if items is None:
+        return None
+    if not isinstance(items, (list, tuple)):
+        raise _type_error(f"IN expects a list, got {items!r}")
+    result = False
+    for item in items:
+        equal = _equals(value, item)
+        if equal:
+            return True
+        if equal is None:
+            result = None
+    return result
+
+def _string_predicate(test):
+    def apply(a, b):
+        if isinstance(a, str) and isinstance(b, str):
+            return test(a, b)
+        return None
+    return apply
+
+def _regex(a, b):
+    if isinstance(a, str) and isinstance(b, str):
+        return re.fullmatch(b, a) is not None
+    return None
+
+def _comparison(test):
+    def apply(a, b):
+        result = _compare(a, b)
+        return None if result is None else test(result)
+    return apply
+
+def _not_equals(a, b):
+    equal = _equals(a, b)
+    return None if equal is None else not equal
+
+_OPERATORS = {
+    "=": _equals,
+    "<>": _not_equals,
+    "<": _comparison(lambda c: c < 0),
+    ">": _comparison(lambda c: c > 0),
+    "<=": _comparison(lambda c: c <= 0),
+    ">=": _comparison(lambda c: c >= 0),
+    "+": _add,
+    "-": _arithmetic(lambda a, b: a - b, "-"),
+    "*": _arithmetic(lambda a, b: a * b, "*"),
+    "/": _arithmetic(_divide, "/"),
+    "%": _arithmetic(_modulo, "%"),
+    "^": _arithmetic(lambda a, b: float(a) ** float(b), "^"),
+    "in": _in,
+    "starts with": _string_predicate(str.startswith),
+    "ends with": _string_predicate(str.endswith),
+    "contains": _string_predicate(lambda a, b: b in a),
+    "=~": _regex,
+}
+
+def _subscript(value, index):
+    if value is None or index is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        if not isinstance(index, int) or isinstance(index, bool):
+            raise _type_error(f"List index must be an integer, got {index!r}")
+        try:
+            return value[index]
+        except IndexError:
+            return None
+    if isinstance(value, dict):
+        if not isinstance(index, str):
+            raise _type_error(f"Map key must be a string, got {index!r}")
+        return value.get(index)
+    raise _type_error(f"Cannot index {value!r}")
+
+# --- Funktionen --------------------------------------------------------------------------
+
+def _null_safe(fn):
+    def apply(value, *args):
+        return None if value is None else fn(value, *args)
+    return apply
+
+def _expect(value, types, function):
+    if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+        raise _type_error(f"Invalid input for function '{function}()': {value!r}")
+    return value
+
+def _to_string(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float, str)):
+        return str(value)
+    if hasattr(value, "iso_format"):
+        return value.iso_format()
+    raise _type_error(f"Invalid input for function 'toString()': {value!r}")
+
+def _to_integer(value):
+    if isinstance(value, (bool, int)):
+        return int(value)
+    if isinstance(value, float):
+        return int(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return int(float(value))
+            except (ValueError, OverflowError):
+                return None
+    raise _type_error(f"Invalid input for function 'toInteger()': {value!r}")
+
+def _to_float(value):
+    if _is_number(value):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    raise _type_error(f"Invalid input for function 'toFloat()': {value!r}")
+
+def _or_null(fn):
+    def apply(value):
+        if isinstance(value, bool):
+            return None
+        try:
+            return fn(value)
+        except Neo4jError:
+            return None
+    return apply
+
+def _length(value):
+    if isinstance(value, MemoryPath):
+        return len(value)
+    return len(_expect(value, (str, list, tuple), "length"))
+
+def _range(start, end, step=1):
+    if step == 0:
+        raise _error("Step argument to range() can't be 0", "Neo.ClientError.Statement.ArgumentError")
+    return list(range(start, end + (1 if step > 0 else -1), step))
+
+def _substring(value, start, length=None):
+    return value[start:] if length is None else value[start:start + length]
+
+def _date(value=_MISSING):
+    if value is _MISSING:
+        return Date.today()
+    if value is None or isinstance(value, Date):
+        return value
+    try:
+        return Date.from_iso_format(_expect(value, str, "date"))
+    except ValueError:
+        raise _error(f"Text cannot be parsed to a Date: {value}", "Neo.ClientError.Statement.ArgumentError") from None
+
+def _coalesce(*values):
+    for value in values:
+        if value is not None:
+            return value
+    return None
+
+# Name (klein geschrieben) -> (min. Argumente, max. Argumente, Funktion)
+_FUNCTIONS = {
+    "id": (1, 1, _null_safe(lambda x: _expect(x, (MemoryNode, MemoryRelationship), "id").identity)),
+    "elementid": (1, 1, _null_safe(lambda x: str(_expect(x, (MemoryNode, MemoryRelationship), "elementId").identity))),
+    "labels": (1, 1, _null_safe(lambda x: list(_expect(x, MemoryNode, "labels").labels))),
+    "type": (1, 1, _null_safe(lambda x: type(_expect(x, MemoryRelationship, "type")).__name__)),
+    "keys": (1, 1, _null_safe(lambda x: list(_expect(x, dict, "keys")))),
+    "properties": (1, 1, _null_safe(lambda x: dict(_expect(x, dict, "properties")))),
+    "startnode": (1, 1, _null_safe(lambda x: _expect(x, MemoryRelationship, "startNode").start_node)),
+    "endnode": (1, 1, _null_safe(lambda x: _expect(x, MemoryRelationship, "endNode").end_node)),
+    "nodes": (1, 1, _null_safe(lambda x: list(_expect(x, MemoryPath, "nodes").nodes))),
+    "relationships": (1, 1, _null_safe(lambda x: list(_expect(x, MemoryPath, "relationships").relationships))),
+    "length": (1, 1, _null_safe(_length)),
+    "size": (1, 1, _null_safe(lambda x: len(_expect(x, (str, list, tuple), "size")))),
+    "head": (1, 1, _null_safe(lambda x: _expect(x, (list, tuple), "head")[0] if x else None)),
+    "last": (1, 1, _null_safe(lambda x: _expect(x, (list, tuple), "last")[-1] if x else None)),
+    "tail": (1, 1, _null_safe(lambda x: list(_expect(x, (list, tuple), "tail")[1:]))),
+    "reverse": (1, 1, _null_safe(lambda x: _expect(x, (str, list, tuple), "reverse")[::-1])),
+    "tolower": (1, 1, _null_safe(lambda x: _expect(x, str, "toLower").lower())),
+    "toupper": (1, 1, _null_safe(lambda x: _expect(x, str, "toUpper").upper())),
+    "trim": (1, 1, _null_safe(lambda x: _expect(x, str, "trim").strip())),
+    "replace": (3, 3, _null_safe(lambda x, a, b: _expect(x, str, "replace").replace(a, b))),
+    "split": (2, 2, _null_safe(lambda x, sep: _expect(x, str, "split").split(sep))),
+    "substring": (2, 3, _null_safe(lambda x, *args: _substring(_expect(x, str, "substring"), *args))),
+    "tostring": (1, 1, _null_safe(_to_string)),
+    "tointeger": (1, 1, _null_safe(_to_integer)),
+    "tofloat": (1, 1, _null_safe(_to_float)),
+    "tointegerornull": (1, 1, _null_safe(_or_null(_to_integer))),
+    "tofloatornull": (1, 1, _null_safe(_or_null(_to_float))),
+    "abs": (1, 1, _null_safe(lambda x: abs(_expect(x, (int, float), "abs")))),
+    "date": (0, 1, _date),
+    "coalesce": (1, 255, _coalesce),
+    "range": (2, 3, _range),
+}
+
+_AGGREGATES = ("count", "collect", "sum", "avg", "min", "max")
+
+class _Aggregate:
+    """Aggregatfunktion einer Projektion, Zustand pro Gruppe: [Anzahl, Werte, gesehene Schlüssel]."""
+
+    def __init__(self, ast):
+        _, self.name, self.distinct, args = ast
+        self.star = args == (("star",),)
+        if not self.star and len(args) != 1:
+            raise _error(f"Function {self.name}() takes exactly one argument")
+        self.argument = None if self.star else _compile(args[0])
+
+    def start(self):
+        return [0, [], set()]
+
+    def add(self, state, row, ctx):
+        if self.star:
+            state[0] += 1
+            return
+        value = self.argument(row, ctx)
+        if value is None:
+            return
+        if self.distinct:
+            key = _key(value)
+            if key in state[2]:
+                return
+            state[2].add(key)
+        state[0] += 1
+        if self.name != "count":
+            state[1].append(value)
+
+    def result(self, state):
+        count, values, _ = state
+        if self.name == "count":
+            return count
+        if self.name == "collect":
+            return values
+        if self.name in ("sum", "avg"):
+            if not all(_is_number(v) for v in values):
+                raise _type_error(f"{self.name}() expects numbers")
+            if self.name == "sum":
+                return sum(values)
+            return sum(values) / len(values) if values else None
+        if not values:
+            return None
+        return (min if self.name == "min" else max)(values, key=_order_key)
+
+# --- Ausdrücke ---------------------------------------------------------------------------
+#
+# Der Parser erzeugt Tupel wie ("property", ("variable", "n"), "name"), `_compile` macht daraus
+# Funktionen (Zeile, Kontext) -> Wert. Eine Zeile ist ein dict Variable -> Wert.
+
+def _walk(ast):
+    yield ast
+    for item in ast[1:]:
+        if isinstance(item, tuple):
+            if item and isinstance(item[0], str):
+                yield from _walk(item)
+            else:
+                for child in item:
+                    if isinstance(child, tuple):
+                        yield from _walk(child)
+
+def _references(ast):
+    return frozenset(node[1] for node in _walk(ast) if node[0] == "variable")
+
+def _has_aggregate(ast):
+    return any(node[0] == "call" and node[1] in _AGGREGATES for node in _walk(ast))
+
+def _compile(ast, aggregates=None):
+    """
+    Übersetzt einen Ausdruck in eine Funktion (row, ctx). `aggregates` sammelt in Projektionen
+    die Aggregatfunktionen (ast -> Platz), deren Ergebnis dann unter _AGGREGATES_KEY steht.
+    """
+    kind = ast[0]
+
+    def sub(child):
+        return _compile(child, aggregates)
+
+    if kind == "literal":
+        value = ast[1]
+        return lambda row, ctx: value
+
+    if kind == "parameter":
+        name = ast[1]
+
+        def parameter(row, ctx):
+            try:
+                return ctx.params[name]
+            except KeyError:
+                raise _error(f"Expected parameter(s): {name}", "Neo.ClientError.Statement.ParameterMissing") from None
+        return parameter
+
+    if kind == "variable":
+        name = ast[1]
+
+        def variable(row, ctx):
+            try:
+                return row[name]
+            except KeyError:
+                raise _error(f"Variable `{name}` not defined") from None
+        return variable
+
+    if kind == "property":
+        target, key = sub(ast[1]), ast[2]
+
+        def prop(row, ctx):
+            value = target(row, ctx)
+            if isinstance(value, dict):
+                return value.get(key)
+            if value is None:
+                return None
+            raise _type_error(f"Type mismatch: cannot read property `{key}` of {value!r}")
+        return prop
+
+    if kind == "subscript":
+        target, index = sub(ast[1]), sub(ast[2])
+        return lambda row, ctx: _subscript(target(row, ctx), index(row, ctx))
+
+    if kind == "slice":
+        target = sub(ast[1])
+        low = sub(ast[2]) if ast[2] is not None else None
+        high = sub(ast[3]) if ast[3] is not None else None
+
+        def slice_(row, ctx):
+            value = target(row, ctx)
+            start = low(row, ctx) if low else None
+            end = high(row, ctx) if high else None
+            if value is None or (low and start is None) or (high and end is None):
+                return None
+            return list(_expect(value, (list, tuple), "slice")[start:end])
+        return slice_
+
+    if kind == "call":
+        _, name, _, args = ast
+        if name in _AGGREGATES:
+            if aggregates is None:
+                raise _error(f"Invalid use of aggregating function {name}(...) in this context")
+            slot = aggregates.setdefault(ast, len(aggregates))
+            return lambda row, ctx: row[_AGGREGATES_KEY][slot]
+        entry = _FUNCTIONS.get(name)
+        if entry is None:
+            raise _error(f"Unknown function '{name}'")
+        low, high, fn = entry
+        if not low <= len(args) <= high:
+            raise _error(f"Function {name}() called with {len(args)} arguments")
+        compiled = [sub(a) for a in args]
+        if len(compiled) == 1:
+            argument = compiled[0]
+            return lambda row, ctx: fn(argument(row, ctx))
+        return lambda row, ctx: fn(*[a(row, ctx) for a in compiled])
+
+    if kind == "list":
+        items = [sub(a) for a in ast[1]]
+        return lambda row, ctx: [item(row, ctx) for item in items]
+
+    if kind == "map":
+        keys, values = ast[1], [sub(a) for a in ast[2]]
+        return lambda row, ctx: {k: v(row, ctx) for k, v in zip(keys, values)}
+
+    if kind == "and":
+        left, right = sub(ast[1]), sub(ast[2])
+
+        def and_(row, ctx):
+            a = _bool(left(row, ctx))
+            if a is False:
+                return False
+            b = _bool(right(row, ctx))
+            if b is False:
+                return False
+            return None if a is None or b is None else True
+        return and_
+
+    if kind == "or":
+        left, right = sub(ast[1]), sub(ast[2])
+
+        def or_(row, ctx):
+            a = _bool(left(row, ctx))
+            if a is True:
+                return True
+            b = _bool(right(row, ctx))
+            if b is True:
+                return True
+            return None if a is None or b is None else False
+        return or_
+
+    if kind == "xor":
+        left, right = sub(ast[1]), sub(ast[2])
+
+        def xor(row, ctx):
+            a, b = _bool(left(row, ctx)), _bool(right(row, ctx))
+            return None if a is None or b is None else a != b
+        return xor
+
+    if kind == "not":
+        operand = sub(ast[1])
+
+        def not_(row, ctx):
+            value = _bool(operand(row, ctx))
+            return None if value is None else not value
+        return not_
+
+    if kind == "binary":
+        fn, left, right = _OPERATORS[ast[1]], sub(ast[2]), sub(ast[3])
+        return lambda row, ctx: fn(left(row, ctx), right(row, ctx))
+
+    if kind == "negate":
+        operand = sub(ast[1])
+
+        def negate(row, ctx):
+            value = operand(row, ctx)
+            if value is None:
+                return None
+            if not _is_number(value):
+                raise _type_error(f"Cannot negate {value!r}")
+            return -value
+        return negate
+
+    if kind == "is_null":
+        operand, negated = sub(ast[1]), ast[2]
+        if negated:
+            return lambda row, ctx: operand(row, ctx) is not None
+        return lambda row, ctx: operand(row, ctx) is None
+
+    if kind == "has_labels":
+        target, labels = sub(ast[1]), ast[2]
+
+        def has_labels(row, ctx):
+            node = target(row, ctx)
+            if node is None:
+                return None
+            return all(label in _expect(node, MemoryNode, "label predicate").labels for label in labels)
+        return has_labels
+
+    if kind == "case":
+        subject = sub(ast[1]) if ast[1] is not None else None
+        whens = [(sub(when[1]), sub(when[2])) for when in ast[2]]
+        default = sub(ast[3]) if ast[3] is not None else None
+
+        def case(row, ctx):
+            value = subject(row, ctx) if subject else None
+            for condition, result in whens:
+                if subject:
+                    matched = _equals(value, condition(row, ctx))
+                else:
+                    matched = _bool(condition(row, ctx))
+                if matched:
+                    return result(row, ctx)
+            return default(row, ctx) if default else None
+        return case
+
+    if kind == "list_predicate":
+        return _list_predicate(ast[1], ast[2], sub(ast[3]), sub(ast[4]))
+
+    if kind == "comprehension":
+        _, name, source, where, projection = ast
+        return _comprehension(name, sub(source), sub(where) if where else None, sub(projection) if projection else None)
+
+    raise _error(f"Unsupported expression {kind}")
+
+def _bind_temporarily(row, name, values, body):
+    """`body(wert)` für jeden Wert, mit `name` in der Zeile gebunden; danach wie vorher."""
+    saved = row.get(name, _MISSING)
+    try:
+        for value in values:
+            row[name] = value
+            yield body(value)
+    finally:
+        if saved is _MISSING:
+            row.pop(name, None)
+        else:
+            row[name] = saved
+
+def _list_predicate(kind, name, source, predicate):
+    def evaluate(row, ctx):
+        items = source(row, ctx)
+        if items is None:
+            return None
+        _expect(items, (list, tuple), kind)
+        matches, unknown = 0, False
+        for result in _bind_temporarily(row, name, items, lambda _: _bool(predicate(row, ctx))):
+            if result is True:
+                matches += 1
+                if kind == "any":
+                    return True
+                if kind == "none" or (kind == "single" and matches > 1):
+                    return False
+            elif result is None:
+                unknown = True
+            elif kind == "all":
+                return False
+        if unknown:
+            return None
+        if kind == "single":
+            return matches == 1
+        return kind != "any"
+    return evaluate
+
+def _comprehension(name, source, where, projection):
+    def evaluate(row, ctx):
+        items = source(row, ctx)
+        if items is None:
+            return None
+        result = []
+
+        def step(item):
+            if where is None or where(row, ctx) is True:
+                result.append(projection(row, ctx) if projection else item)
+
+        for _ in _bind_temporarily(row, name, _expect(items, (list, tuple), "list comprehension"), step):
+            pass
+        return result
+    return evaluate
+
+# --- Muster ------------------------------------------------------------------------------
+
+class _NodePattern:
+    __slots__ = ("var", "labels", "props")
+
+    def __init__(self, var, labels, props):
+        self.var = var
+        self.labels = tuple(labels)
+        # [(key, Funktion, referenzierte Variablen)]
+        self.props = [(key, _compile(value), _references(value)) for key, value in props]
+
+class _RelPattern:
+    __slots__ = ("var", "types", "direction", "var_length", "min_hops", "max_hops", "props")
+
+    def __init__(self, var, types, direction, var_length, min_hops, max_hops, props):
+        self.var = var
+        self.types = tuple(types)
+        self.direction = direction  # "out" (->), "in" (<-) oder "both" (-)
+        self.var_length = var_length
+        self.min_hops = min_hops
+        self.max_hops = max_hops  # None = unbegrenzt
+        self.props = [(key, _compile(value)) for key, value in props]
+
+class _PatternPart:
+    __slots__ = ("path_var", "nodes", "rels")
+
+    def __init__(self, path_var, nodes, rels):
+        self.path_var = path_var
+        self.nodes = nodes
+        self.rels = rels
+
+    def variables(self):
+        names = [self.path_var] + [n.var for n in self.nodes] + [r.var for r in self.rels]
+        return [name for name in names if name is not None]
+
+def _bind_node(pattern, node, row, ctx):
+    """Zeile mit `node` für `pattern` oder None, wenn der Knoten nicht passt."""
+    labels = node.labels
+    for label in pattern.labels:
+        if label not in labels:
+            return None
+    bind = False
+    if pattern.var is not None:
+        bound = row.get(pattern.var, _MISSING)
+        if bound is _MISSING:
+            bind = True
+        elif not (isinstance(bound, MemoryNode) and bound.identity == node.identity):
+            return None
+    for key, value, _ in pattern.props:
+        if _equals(node.get(key), value(row, ctx)) is not True:
+            return None
+    if bind:
+        row = dict(row)
+        row[pattern.var] = node
+    return row
+
+def _relationship_matches(pattern, rel, row, ctx):
+    if pattern.types and type(rel).__name__ not in pattern.types:
+        return False
+    for key, value in pattern.props:
+        if _equals(rel.get(key), value(row, ctx)) is not True:
+            return False
+    return True
+
+def _start(part, row, ctx, hints):
+    """(Position im Muster, Kandidaten) für den Knoten, bei dem das Matching beginnt."""
+    graph = ctx.graph
+    for i, pattern in enumerate(part.nodes):
+        if pattern.var is not None and pattern.var in row:
+            node = row[pattern.var]
+            return i, [node] if isinstance(node, MemoryNode) else []
+
+    for i, pattern in enumerate(part.nodes):
+        for kind, _, value, refs in hints.get(pattern.var, ()):
+            if kind in ("id", "ids") and refs.issubset(row):
+                value = value(row, ctx)
+                ids = value if kind == "ids" else [value]
+                if ids is None:
+                    return i, []
+                nodes = (graph.node(x) for x in dict.fromkeys(ids) if isinstance(x, int) and not isinstance(x, bool))
+                return i, [node for node in nodes if node is not None]
+
+    for i, pattern in enumerate(part.nodes):
+        lookups = [(key, value) for key, value, refs in pattern.props if refs.issubset(row)]
+        lookups += [
+            (key, value) for kind, key, value, refs in hints.get(pattern.var, ())
+            if kind == "property" and refs.issubset(row)
+        ]
+        for key, value in lookups:
+            for label in pattern.labels:
+                ids = graph.index_ids(label, key, value(row, ctx))
+                if ids is not None:
+                    return i, [graph.node(x) for x in ids]
+
+    best = None
+    for i, pattern in enumerate(part.nodes):
+        for label in pattern.labels:
+            nodes = graph.label_nodes(label)
+            if best is None or len(nodes) < len(best[1]):
+                best = (i, nodes)
+    return best if best is not None else (0, graph.label_nodes())
+
+def _adjacent(graph, node, outgoing):
+    return graph.outgoing(node) if outgoing else graph.incoming(node)
+
+def _expand(pattern, node, forward, used, row, ctx):
+    """
+    (Relationships, Knoten) für einen Schritt des Musters ab `node`, jeweils in Laufrichtung.
+    `forward` heißt, das Muster wird von links nach rechts abgelaufen.
+    """
+    graph = ctx.graph
+    if pattern.direction == "both":
+        directions = (True, False)
+    else:
+        directions = ((pattern.direction == "out") == forward,)
+
+    def steps(current, seen):
+        for outgoing in directions:
+            for rel in _adjacent(graph, current, outgoing):
+                rid = rel.identity
+                if rid in used or rid in seen or not _relationship_matches(pattern, rel, row, ctx):
+                    continue
+                if not outgoing and len(directions) == 2 and rel.start_node is rel.end_node:
+                    continue  # Schleife wurde schon als ausgehend gefunden
+                yield rel, rel.end_node if outgoing else rel.start_node
+
+    if not pattern.var_length:
+        for rel, other in steps(node, ()):
+            yield [rel], [other]
+        return
+
+    low, high = pattern.min_hops, pattern.max_hops
+    if low == 0:
+        yield [], []
+
+    def walk(current, rels, nodes, seen):
+        if high is not None and len(rels) >= high:
+            return
+        for rel, other in list(steps(current, seen)):
+            next_rels, next_nodes = rels + [rel], nodes + [other]
+            if len(next_rels) >= low:
+                yield next_rels, next_nodes
+            seen.add(rel.identity)
+            yield from walk(other, next_rels, next_nodes, seen)
+            seen.discard(rel.identity)
+
+    yield from walk(node, [], [], set())
+
+def _extend(part, i, step, node, row, used, ctx):
+    """Matcht das Muster ab Position i in Richtung `step` (+1/-1) weiter: (Zeile, used, Knoten, Rels)."""
+    if (step > 0 and i == len(part.nodes) - 1) or (step < 0 and i == 0):
+        yield row, used, [], []
+        return
+    pattern = part.rels[i] if step > 0 else part.rels[i - 1]
+    next_pattern = part.nodes[i + step]
+    for rels, nodes in _expand(pattern, node, step > 0, used, row, ctx):
+        end = nodes[-1] if nodes else node
+        bound = _bind_node(next_pattern, end, row, ctx)
+        if bound is None:
+            continue
+        if pattern.var is not None:
+            value = (rels if step > 0 else rels[::-1]) if pattern.var_length else rels[0]
+            existing = bound.get(pattern.var, _MISSING)
+            if existing is not _MISSING:
+                if _equals(existing, value) is not True:
+                    continue
+            else:
+                bound = dict(bound)
+                bound[pattern.var] = value
+        next_used = used.union(r.identity for r in rels) if rels else used
+        for result, result_used, more_nodes, more_rels in _extend(part, i + step, step, end, bound, next_used, ctx):
+            yield result, result_used, nodes + more_nodes, rels + more_rels
+
+def _match_part(part, row, used, ctx, hints):
+    """Alle Belegungen von `part`, die zu `row` passen, als (Zeile, benutzte Relationship-ids)."""
+    start, candidates = _start(part, row, ctx, hints)
+    pattern = part.nodes[start]
+    for node in candidates:
+        bound = _bind_node(pattern, node, row, ctx)
+        if bound is None:
+            continue
+        for right, right_used, right_nodes, right_rels in _extend(part, start, 1, node, bound, used, ctx):
+            for result, result_used, left_nodes, left_rels in _extend(part, start, -1, node, right, right_used, ctx):
+                if part.path_var is not None:
+                    result = dict(result)
+                    result[part.path_var] = MemoryPath(left_nodes[::-1] + [node] + right_nodes, left_rels[::-1] + right_rels)
+                yield result, result_used
+
+def _match_parts(parts, row, used, ctx, hints):
+    if not parts:
+        yield row
+        return
+    for bound, bound_used in _match_part(parts[0], row, used, ctx, hints):
+        yield from _match_parts(parts[1:], bound, bound_used, ctx, hints)
+
+def _conjuncts(ast):
+    if ast[0] == "and":
+        return _conjuncts(ast[1]) + _conjuncts(ast[2])
+    return [ast]
+
+def _hints(where):
+    """
+    Startpunkte aus dem WHERE: {Variable: [(Art, Property, Funktion, Variablen)]} für
+    `id(v) = x`, `id(v) IN xs` und `v.key = x`, solange x nicht von v abhängt.
+    """
+    hints = {}
+    for condition in _conjuncts(where) if where is not None else ():
+        if condition[0] != "binary" or condition[1] not in ("=", "in"):
+            continue
+        op, left, right = condition[1:]
+        sides = [(left, right), (right, left)] if op == "=" else [(left, right)]
+        for target, value in sides:
+            if target[0] == "call" and target[1] == "id" and len(target[3]) == 1 and target[3][0][0] == "variable":
+                var, kind, key = target[3][0][1], "id" if op == "=" else "ids", None
+            elif op == "=" and target[0] == "property" and target[1][0] == "variable":
+                var, kind, key = target[1][1], "property", target[2]
+            else:
+                continue
+            refs = _references(value)
+            if var in refs:
+                continue
+            hints.setdefault(var, []).append((kind, key, _compile(value), refs))
+            break
+    return hints
+
+# --- Klauseln ----------------------------------------------------------------------------
+#
+# Jede Klausel bildet einen Iterator von Zeilen auf den nächsten ab. Lesende Klauseln sind
+# lazy, schreibende lesen ihre Eingabe zuerst vollständig und schreiben dann, damit kein
+# Scan über Strukturen läuft, die sich gerade ändern.
+
+class _Context:
+    __slots__ = ("graph", "params")
+
+    def __init__(self, graph, params):
+        self.graph = graph
+        self.params = params
+
+class _Clause:
+    writes = False
+    columns = None
+
+class _Match(_Clause):
+    def __init__(self, parts, where, optional):
+        self.parts = parts
+        self.optional = optional
+        self.where = _compile(where) if where is not None else None
+        self.hints = _hints(where)
+        self.variables = [name for part in parts for name in part.variables()]
+
+    def apply(self, rows, ctx):
+        for row in rows:
+            matched = False
+            for bound in _match_parts(self.parts, row, frozenset(), ctx, self.hints):
+                if self.where is None or self.where(bound, ctx) is True:
+                    matched = True
+                    yield bound
+            if self.optional and not matched:
+                bound = dict(row)
+                for name in self.variables:
+                    bound.setdefault(name, None)
+                yield bound
+
+class _Unwind(_Clause):
+    def __init__(self, source, name):
+        self.source = _compile(source)
+        self.name = name
+
+    def apply(self, rows, ctx):
+        for row in rows:
+            values = self.source(row, ctx)
+            if values is None:
+                continue
+            for value in values if isinstance(values, (list, tuple)) else [values]:
+                bound = dict(row)
+                bound[self.name] = value
+                yield bound
+
+class _Projection(_Clause):
+    """WITH bzw. RETURN."""
+
+    def __init__(self, items, distinct, order, skip, limit, where, is_return):
+        self.star = items is None
+        self.distinct = distinct
+        self.names = [name for name, _ in items or ()]
+        if len(set(self.names)) != len(self.names):
+            raise _error("Multiple result columns with the same name are not supported")
+        aggregates = {}
+        self.keys = []
+        self.values = []
+        for name, ast in items or ():
+            if _has_aggregate(ast):
+                self.values.append((name, _compile(ast, aggregates)))
+            else:
+                self.keys.append((name, _compile(ast)))
+        self.aggregates = [_Aggregate(ast) for ast in aggregates]
+        self.references = frozenset().union(*(_references(ast) for _, ast in items or ()))
+        # ORDER BY auf einen Ausdruck, der auch projiziert wird, sortiert nach der Spalte
+        columns = {ast: name for name, ast in items or ()}
+        self.order = [(_compile(("variable", columns[ast]) if ast in columns else ast), descending) for ast, descending in order]
+        self.skip = _compile(skip) if skip is not None else None
+        self.limit = _compile(limit) if limit is not None else None
+        self.where = _compile(where) if where is not None else None
+        if is_return:
+            if self.star:
+                raise _error("RETURN * is not supported by the in-memory backend")
+            self.columns = self.names
+
+    def apply(self, rows, ctx):
+        if self.star:
+            projected = ((row, row) for row in rows)
+        elif self.aggregates:
+            projected = self._aggregate(rows, ctx)
+        else:
+            projected = self._project(rows, ctx)
+        if self.distinct:
+            projected = self._distinct(projected)
+        if self.order:
+            projected = self._sorted(projected, ctx)
+        skip = self._count(self.skip, ctx, "SKIP") or 0
+        limit = self._count(self.limit, ctx, "LIMIT")
+        if skip or limit is not None:
+            projected = islice(projected, skip, None if limit is None else skip + limit)
+        for row, _ in projected:
+            if self.where is None or self.where(row, ctx) is True:
+                yield row
+
+    def _count(self, expression, ctx, clause):
+        if expression is None:
+            return None
+        value = expression({}, ctx)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise _error(f"Invalid input for {clause}: {value!r}", "Neo.ClientError.Statement.ArgumentError")
+        return value
+
+    def _project(self, rows, ctx):
+        # (projizierte Zeile, Zeile für ORDER BY); ohne DISTINCT sieht ORDER BY auch die alten Variablen
+        keep_row = bool(self.order) and not self.distinct
+        for row in rows:
+            projected = {name: fn(row, ctx) for name, fn in self.keys}
+            if keep_row:
+                env = dict(row)
+                env.update(projected)
+                yield projected, env
+            else:
+                yield projected, projected
+
+    def _aggregate(self, rows, ctx):
+        groups = {}
+        for row in rows:
+            values = [fn(row, ctx) for _, fn in self.keys]
+            key = tuple(_key(v) for v in values)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = (values, row, [a.start() for a in self.aggregates])
+            for aggregate, state in zip(self.aggregates, group[2]):
+                aggregate.add(state, row, ctx)
+        if not groups and not self.keys:
+            groups[()] = ([], {}, [a.start() for a in self.aggregates])
+
+        for values, row, states in groups.values():
+            result = dict(zip((name for name, _ in self.keys), values))
+            env = dict(row)
+            env[_AGGREGATES_KEY] = [a.result(s) for a, s in zip(self.aggregates, states)]
+            for name, fn in self.values:
+                result[name] = fn(env, ctx)
+            projected = {name: result[name] for name in self.names}
+            yield projected, projected
+
+    def _distinct(self, projected):
+        seen = set()
+        for row, env in projected:
+            key = tuple(_key(v) for v in row.values())
+            if key not in seen:
+                seen.add(key)
+                yield row, env
+
+    def _sorted(self, projected, ctx):
+        keyed = [(item, [_order_key(fn(item[1], ctx)) for fn, _ in self.order]) for item in projected]
+        # stabil von der letzten Sortierspalte zur ersten, jede mit ihrer Richtung
+        for position in reversed(range(len(self.order))):
+            keyed.sort(key=lambda pair: pair[1][position], reverse=self.order[position][1])
+        return [item for item, _ in keyed]
+
+def _create_part(part, row, ctx, merge=False):
+    graph = ctx.graph
+    row = dict(row)
+    nodes = []
+    for pattern in part.nodes:
+        if pattern.var is not None and pattern.var in row:
+            node = row[pattern.var]
+            if not isinstance(node, MemoryNode):
+                raise _error(f"Failed to create relationship, node `{pattern.var}` is missing", "Neo.ClientError.Statement.EntityNotFound")
+        else:
+            node = graph.create_node(pattern.labels, {key: value(row, ctx) for key, value, _ in pattern.props})
+            if pattern.var is not None:
+                row[pattern.var] = node
+        nodes.append(node)
+
+    rels = []
+    for i, pattern in enumerate(part.rels):
+        if pattern.var_length or len(pattern.types) != 1:
+            raise _error("Exactly one relationship type must be specified for CREATE or MERGE")
+        if pattern.direction == "both" and not merge:
+            raise _error("Only directed relationships are supported in CREATE")
+        start, end = (nodes[i + 1], nodes[i]) if pattern.direction == "in" else (nodes[i], nodes[i + 1])
+        rel = graph.create_relationship(start.identity, pattern.types[0], end.identity, {key: value(row, ctx) for key, value in pattern.props})
+        if pattern.var is not None:
+            row[pattern.var] = rel
+        rels.append(rel)
+
+    if part.path_var is not None:
+        row[part.path_var] = MemoryPath(nodes, rels)
+    return row
+
+class _Create(_Clause):
+    writes = True
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def apply(self, rows, ctx):
+        result = []
+        for row in list(rows):
+            for part in self.parts:
+                row = _create_part(part, row, ctx)
+            result.append(row)
+        return iter(result)
+
+def _set_item(item):
+    kind = item[0]
+    if kind == "property":
+        target, key, value = _compile(item[1]), item[2], _compile(item[3])
+
+        def set_property(row, ctx):
+            entity = target(row, ctx)
+            if entity is not None:
+                ctx.graph.set_properties(_expect(entity, (MemoryNode, MemoryRelationship), "SET"), {key: value(row, ctx)})
+        return set_property
+
+    target, value, replace = _compile(("variable", item[1])), _compile(item[2]), kind == "replace"
+
+    def set_map(row, ctx):
+        entity = target(row, ctx)
+        if entity is None:
+            return
+        props = value(row, ctx)
+        if props is None:
+            props = {}
+        ctx.graph.set_properties(_expect(entity, (MemoryNode, MemoryRelationship), "SET"), dict(_expect(props, dict, "SET")), replace)
+    return set_map
+
+def _apply_items(items, row, ctx):
+    for item in items:
+        item(row, ctx)
+
+class _Set(_Clause):
+    writes = True
+
+    def __init__(self, items):
+        self.items = [_set_item(item) for item in items]
+
+    def apply(self, rows, ctx):
+        rows = list(rows)
+        for row in rows:
+            _apply_items(self.items, row, ctx)
+        return iter(rows)
+
+class _Merge(_Clause):
+    writes = True
+
+    def __init__(self, part, on_create, on_match):
+        self.part = part
+        self.on_create = [_set_item(item) for item in on_create]
+        self.on_match = [_set_item(item) for item in on_match]
+
+    def apply(self, rows, ctx):
+        result = []
+        for row in list(rows):
+            self._check_nulls(row, ctx)
+            matches = [bound for bound, _ in _match_part(self.part, row, frozenset(), ctx, {})]
+            if matches:
+                for bound in matches:
+                    _apply_items(self.on_match, bound, ctx)
+                    result.append(bound)
+            else:
+                bound = _create_part(self.part, row, ctx, merge=True)
+                _apply_items(self.on_create, bound, ctx)
+                result.append(bound)
+        return iter(result)
+
+    def _check_nulls(self, row, ctx):
+        for pattern in self.part.nodes:
+            if pattern.var is not None and pattern.var in row:
+                continue
+            for key, value, _ in pattern.props:
+                if value(row, ctx) is None:
+                    raise _error(
+                        f"Cannot merge the following node because of null property value for '{key}'",
+                        "Neo.ClientError.Statement.SemanticError"
+                    )
+
+class _Delete(_Clause):
+    writes = True
+
+    def __init__(self, expressions, detach):
+        self.expressions = [_compile(e) for e in expressions]
+        self.detach = detach
+
+    def apply(self, rows, ctx):
+        rows = list(rows)
+        for row in rows:
+            for expression in self.expressions:
+                self._delete(expression(row, ctx), ctx)
+        return iter(rows)
+
+    def _delete(self, value, ctx):
+        if value is None:
+            return
+        if isinstance(value, MemoryNode):
+            ctx.graph.delete_node(value, self.detach)
+        elif isinstance(value, MemoryRelationship):
+            ctx.graph.delete_relationship(value)
+        elif isinstance(value, MemoryPath):
+            for rel in value.relationships:
+                ctx.graph.delete_relationship(rel)
+            for node in value.nodes:
+                ctx.graph.delete_node(node, self.detach)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                self._delete(item, ctx)
+        else:
+            raise _type_error(f"Expected a node, relationship or path to DELETE, got {value!r}")
+
+class _Subquery(_Clause):
+    """CALL { ... }: die Unterabfrage läuft pro Zeile, ihre Spalten kommen zur Zeile dazu."""
+
+    def __init__(self, query):
+        self.query = query
+        self.writes = query.writes
+        # nur die erste Zeile pro Eingabezeile, siehe _SingleQuery
+        self.first_only = False
+
+    def apply(self, rows, ctx):
+        if self.writes:
+            rows = list(rows)
+        for row in rows:
+            results = self.query.rows(ctx, [row])
+            if self.query.columns is None:
+                for _ in results:
+                    pass
+                yield row
+                continue
+            try:
+                for result in results:
+                    bound = dict(row)
+                    bound.update((name, result[name]) for name in self.query.columns)
+                    yield bound
+                    if self.first_only:
+                        break
+            finally:
+                close = getattr(results, "close", None)
+                if close is not None:
+                    close()
+
+_PROCEDURES = {
+    "db.labels": ("label", lambda graph: graph.labels()),
+    "db.relationshiptypes": ("relationshipType", lambda graph: graph.relationship_types()),
+    "db.propertykeys": ("propertyKey", lambda graph: graph.property_keys()),
+}
+
+class _CallProcedure(_Clause):
+    def __init__(self, name, args, yields, where):
+        entry = _PROCEDURES.get(name.lower())
+        if entry is None:
+            raise _error(f"There is no procedure with the name `{name}` registered for this database instance.", "Neo.ClientError.Procedure.ProcedureNotFound")
+        if args:
+            raise _error(f"Procedure {name}() takes no arguments")
+        self.output, self.source = entry
+        self.yields = yields if yields is not None else [(self.output, self.output)]
+        for field, _ in self.yields:
+            if field != self.output:
+                raise _error(f"Unknown procedure output: `{field}`")
+        self.where = _compile(where) if where is not None else None
+        self.columns = [alias for _, alias in self.yields]
+
+    def apply(self, rows, ctx):
+        for row in rows:
+            for value in self.source(ctx.graph):
+                bound = dict(row)
+                for _, alias in self.yields:
+                    bound[alias] = value
+                if self.where is None or self.where(bound, ctx) is True:
+                    yield bound
+
+class _ShowIndexes(_Clause):
+    COLUMNS = (
+        "id", "name", "state", "populationPercent", "type", "entityType",
+        "labelsOrTypes", "properties", "indexProvider", "owningConstraint",
+    )
+
+    def __init__(self, yields, where):
+        self.yields = yields if yields is not None else [(c, c) for c in self.COLUMNS]
+        for field, _ in self.yields:
+            if field not in self.COLUMNS:
+                raise _error(f"Unknown SHOW INDEXES column: `{field}`")
+        self.where = _compile(where) if where is not None else None
+        self.columns = [alias for _, alias in self.yields]
+
+    def apply(self, rows, ctx):
+        for row in rows:
+            for i, index in enumerate(ctx.graph.indexes(), start=1):
+                values = {
+                    "id": i,
+                    "name": index["name"],
+                    "state": "ONLINE",
+                    "populationPercent": 100.0,
+                    "type": "RANGE",
+                    "entityType": "NODE",
+                    "labelsOrTypes": [index["label"]],
+                    "properties": [index["property"]],
+                    "indexProvider": "range-1.0",
+                    "owningConstraint": index["name"] if index["unique"] else None,
+                }
+                bound = dict(row)
+                for field, alias in self.yields:
+                    bound[alias] = values[field]
+                if self.where is None or self.where(bound, ctx) is True:
+                    yield bound
+
+class _CreateIndex(_Clause):
+    writes = True
+
+    def __init__(self, label, key, name, unique, if_not_exists):
+        self.label = label
+        self.key = key
+        self.name = name
+        self.unique = unique
+        self.if_not_exists = if_not_exists
+
+    def apply(self, rows, ctx):
+        for _ in rows:
+            created = ctx.graph.create_index(self.label, self.key, self.name, self.unique)
+            if not created and not self.if_not_exists:
+                raise _error(
+                    f"An equivalent {'constraint' if self.unique else 'index'} already exists on (:{self.label} {{{self.key}}})",
+                    "Neo.ClientError.Schema.EquivalentSchemaRuleAlreadyExists"
+                )
+        return iter(())
+
+class _DropIndex(_Clause):
+    writes = True
+
+    def __init__(self, name, if_exists):
+        self.name = name
+        self.if_exists = if_exists
+
+    def apply(self, rows, ctx):
+        for _ in rows:
+            if not ctx.graph.drop_index(self.name) and not self.if_exists:
+                raise _error(f"Unable to drop index or constraint called `{self.name}`", "Neo.ClientError.Schema.IndexNotFound")
+        return iter(())
+
+# --- Abfragen ----------------------------------------------------------------------------
+
+class _Query:
+    def execute(self, graph, params):
+        ctx = _Context(graph, params)
+        rows = self.rows(ctx, [{}])
+        if self.columns is None:
+            for _ in rows:
+                pass
+            return MemoryCursor([], [])
+        return MemoryCursor(self.columns, [tuple(row[name] for name in self.columns) for row in rows])
+
+class _SingleQuery(_Query):
+    def __init__(self, clauses):
+        self.clauses = clauses
+        self.writes = any(clause.writes for clause in clauses)
+        self.columns = clauses[-1].columns
+        # `CALL { ... } WITH DISTINCT m`, ohne dass danach eine Spalte der Unterabfrage gebraucht
+        # wird: es zählt nur, ob die Unterabfrage etwas liefert, sie hört nach der ersten Zeile auf
+        for clause, following in zip(clauses, clauses[1:]):
+            if (
+                isinstance(clause, _Subquery) and not clause.writes and clause.query.columns
+                and isinstance(following, _Projection) and following.distinct
+                and not following.star and not following.aggregates
+                and not following.references & set(clause.query.columns)
+            ):
+                clause.first_only = True
+
+    def rows(self, ctx, initial):
+        rows = iter(initial)
+        for clause in self.clauses:
+            rows = clause.apply(rows, ctx)
+        return rows
+
+class _Union(_Query):
+    def __init__(self, parts, distinct):
+        self.parts = parts
+        self.distinct = distinct
+        self.writes = any(part.writes for part in parts)
+        self.columns = parts[0].columns
+        for part in parts[1:]:
+            if part.columns != self.columns:
+                raise _error("All sub queries in an UNION must have the same return column names")
+
+    def rows(self, ctx, initial):
+        seen = set()
+        for part in self.parts:
+            for row in part.rows(ctx, initial):
+                if self.distinct:
+                    key = tuple(_key(row[name]) for name in self.columns)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                yield row
+
+# --- Parser ------------------------------------------------------------------------------
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<quoted>`(?:[^`]|``)*`)
+  | (?P<number>(?:\d+\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<param>\$(?:\w+|`(?:[^`]|``)*`))
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op><>|!=|<=|>=|=~|\+=|\.\.|[-+*/%^=<>(){}\[\],.:|;])
+""", re.VERBOSE | re.DOTALL)
+
+_ESCAPES = {"\\": "\\", "'": "'", '"': '"', "n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+def _unescape(body):
+    def replace(match):
+        code = match.group(1)
+        if len(code) == 5:
+            return chr(int(code[1:], 16))
+        return _ESCAPES.get(code, "\\" + code)
+    return re.sub(r"\\(u[0-9a-fA-F]{4}|.)", replace, body, flags=re.DOTALL)
+
+def _unquote(name):
+    return name[1:-1].replace("``", "`")
+
+class _Token:
+    __slots__ = ("kind", "value", "start", "end")
+
+    def __init__(self, kind, value, start, end):
+        self.kind = kind
+        self.value = value
+        self.start = start
+        self.end = end
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise _error(f"Invalid input '{text[pos]}' (offset: {pos})")
+        kind, value = match.lastgroup, match.group()
+        if kind != "space":
+            if kind == "string":
+                value = _unescape(value[1:-1])
+            elif kind == "quoted":
+                value = _unquote(value)
+            elif kind == "number":
+                value = float(value) if any(c in value for c in ".eE") else int(value)
+            elif kind == "param":
+                value = _unquote(value[1:]) if value.startswith("$`") else value[1:]
+            tokens.append(_Token(kind, value, match.start(), match.end()))
+        pos = match.end()
+    tokens.append(_Token("eof", None, len(text), len(text)))
+    return tokens
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    # --- Tokens ---
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def is_keyword(self, word, offset=0):
+        token = self.peek(offset)
+        return token.kind == "name" and token.value.upper() == word
+
+    def accept_keyword(self, *words):
+        if all(self.is_keyword(word, i) for i, word in enumerate(words)):
+            self.pos += len(words)
+            return True
+        return False
+
+    def expect_keyword(self, *words):
+        if not self.accept_keyword(*words):
+            self.fail(" ".join(words))
+
+    def is_op(self, op, offset=0):
+        token = self.peek(offset)
+        return token.kind == "op" and token.value == op
+
+    def accept_op(self, op):
+        if self.is_op(op):
+            self.pos += 1
+            return True
+        return False
+
+    def expect_op(self, op):
+        if not self.accept_op(op):
+            self.fail(f"'{op}'")
+
+    def is_name(self, offset=0):
+        return self.peek(offset).kind in ("name", "quoted")
+
+    def name(self):
+        token = self.peek()
+        if token.kind not in ("name", "quoted"):
+            self.fail("a name")
+        self.pos += 1
+        return token.value
+
+    def fail(self, expected):
+        token = self.peek()
+        found = "end of input" if token.kind == "eof" else f"'{self.text[token.start:token.end]}'"
+        raise _error(f"Invalid input {found}: expected {expected} (offset: {token.start})")
+
+    # --- Abfragen und Klauseln ---
+
+    def statement(self):
+        query = self.union()
+        self.accept_op(";")
+        if self.peek().kind != "eof":
+            self.fail("end of statement")
+        return query
+
+    def union(self):
+        parts = [self.single_query()]
+        distinct = False
+        while self.accept_keyword("UNION"):
+            if not self.accept_keyword("ALL"):
+                distinct = True
+            parts.append(self.single_query())
+        return parts[0] if len(parts) == 1 else _Union(parts, distinct)
+
+    def single_query(self):
+        clauses = []
+        while not (self.peek().kind == "eof" or self.is_op("}") or self.is_op(";") or self.is_keyword("UNION")):
+            if clauses and isinstance(clauses[-1], _Projection) and clauses[-1].columns is not None:
+                self.fail("end of query after RETURN")
+            clauses.append(self.clause())
+        if not clauses:
+            self.fail("a clause")
+        return _SingleQuery(clauses)
+
+    def clause(self):
+        if self.accept_keyword("OPTIONAL", "MATCH"):
+            return self.match(True)
+        if self.accept_keyword("MATCH"):
+            return self.match(False)
+        if self.accept_keyword("UNWIND"):
+            source = self.expression()
+            self.expect_keyword("AS")
+            return _Unwind(source, self.name())
+        if self.accept_keyword("WITH"):
+            return self.projection(False)
+        if self.accept_keyword("RETURN"):
+            return self.projection(True)
+        if self.accept_keyword("CREATE"):
+            if self.accept_keyword("INDEX") or self.accept_keyword("RANGE", "INDEX"):
+                return self.create_index(False)
+            if self.accept_keyword("CONSTRAINT"):
+                return self.create_index(True)
+            return _Create(self.patterns())
+        if self.accept_keyword("MERGE"):
+            return self.merge()
+        if self.accept_keyword("SET"):
+            return _Set(self.set_items())
+        if self.accept_keyword("REMOVE"):
+            return _Set(self.remove_items())
+        if self.accept_keyword("DETACH", "DELETE"):
+            return _Delete(self.expressions(), True)
+        if self.accept_keyword("DELETE"):
+            return _Delete(self.expressions(), False)
+        if self.accept_keyword("CALL"):
+            return self.call()
+        if self.accept_keyword("SHOW"):
+            self.accept_keyword("RANGE") or self.accept_keyword("ALL")
+            if not (self.accept_keyword("INDEXES") or self.accept_keyword("INDEX")):
+                self.fail("INDEXES")
+            yields = self.yield_items() if self.accept_keyword("YIELD") else None
+            where = self.expression() if self.accept_keyword("WHERE") else None
+            return _ShowIndexes(yields, where)
+        if self.accept_keyword("DROP"):
+            if not (self.accept_keyword("INDEX") or self.accept_keyword("CONSTRAINT")):
+                self.fail("INDEX or CONSTRAINT")
+            name = self.name()
+            return _DropIndex(name, self.accept_keyword("IF", "EXISTS"))
+        self.fail("a clause")
+
+    def match(self, optional):
+        parts = self.patterns()
+        where = self.expression() if self.accept_keyword("WHERE") else None
+        return _Match(parts, where, optional)
+
+    def projection(self, is_return):
+        distinct = self.accept_keyword("DISTINCT")
+        items = None if self.accept_op("*") else self.projection_items()
+        order = []
+        if self.accept_keyword("ORDER", "BY"):
+            while True:
+                expression = self.expression()
+                descending = self.accept_keyword("DESC") or self.accept_keyword("DESCENDING")
+                if not descending:
+                    self.accept_keyword("ASC") or self.accept_keyword("ASCENDING")
+                order.append((expression, descending))
+                if not self.accept_op(","):
+                    break
+        skip = self.expression() if self.accept_keyword("SKIP") else None
+        limit = self.expression() if self.accept_keyword("LIMIT") else None
+        where = self.expression() if not is_return and self.accept_keyword("WHERE") else None
+        return _Projection(items, distinct, order, skip, limit, where, is_return)
+
+    def projection_items(self):
+        items = []
+        while True:
+            start = self.peek().start
+            expression = self.expression()
+            end = self.tokens[self.pos - 1].end
+            if self.accept_keyword("AS"):
+                name = self.name()
+            elif expression[0] == "variable":
+                name = expression[1]
+            else:
+                name = self.text[start:end]
+            items.append((name, expression))
+            if not self.accept_op(","):
+                return items
+
+    def merge(self):
+        part = self.pattern_part()
+        on_create, on_match = [], []
+        while self.accept_keyword("ON"):
+            if self.accept_keyword("CREATE", "SET"):
+                on_create += self.set_items()
+            else:
+                self.expect_keyword("MATCH", "SET")
+                on_match += self.set_items()
+        return _Merge(part, on_create, on_match)
+
+    def set_items(self):
+        items = []
+        while True:
+            var = self.name()
+            if self.accept_op("."):
+                key = self.name()
+                self.expect_op("=")
+                items.append(("property", ("variable", var), key, self.expression()))
+            elif self.accept_op("+="):
+                items.append(("merge", var, self.expression()))
+            elif self.accept_op("="):
+                items.append(("replace", var, self.expression()))
+            else:
+                self.fail("'.', '=' or '+='")
+            if not self.accept_op(","):
+                return items
+
+    def remove_items(self):
+        items = []
+        while True:
+            var = self.name()
+            self.expect_op(".")
+            items.append(("property", ("variable", var), self.name(), ("literal", None)))
+            if not self.accept_op(","):
+                return items
+
+    def expressions(self):
+        result = [self.expression()]
+        while self.accept_op(","):
+            result.append(self.expression())
+        return result
+
+    def call(self):
+        if self.accept_op("{"):
+            query = self.union()
+            self.expect_op("}")
+            return _Subquery(query)
+        name = self.name()
+        while self.accept_op("."):
+            name += "." + self.name()
+        self.expect_op("(")
+        args = [] if self.is_op(")") else self.expressions()
+        self.expect_op(")")
+        yields = self.yield_items() if self.accept_keyword("YIELD") else None
+        where = self.expression() if yields is not None and self.accept_keyword("WHERE") else None
+        return _CallProcedure(name, args, yields, where)
+
+    def yield_items(self):
+        items = []
+        while True:
+            field = self.name()
+            items.append((field, self.name() if self.accept_keyword("AS") else field))
+            if not self.accept_op(","):
+                return items
+
+    def create_index(self, unique):
+        name = None
+        if self.is_name() and not any(self.is_keyword(word) for word in ("IF", "FOR", "ON")):
+            name = self.name()
+        if_not_exists = self.accept_keyword("IF", "NOT", "EXISTS")
+        if not self.accept_keyword("FOR"):
+            self.expect_keyword("ON")
+        self.expect_op("(")
+        var = self.name()
+        self.expect_op(":")
+        label = self.name()
+        self.expect_op(")")
+        if unique:
+            if not self.accept_keyword("REQUIRE"):
+                self.expect_keyword("ASSERT")
+            parenthesized = self.accept_op("(")
+            key = self.index_property(var)
+            if parenthesized:
+                self.expect_op(")")
+            self.expect_keyword("IS")
+            self.expect_keyword("UNIQUE")
+        else:
+            self.expect_keyword("ON")
+            self.expect_op("(")
+            key = self.index_property(var)
+            if self.is_op(","):
+                raise _error("Composite indexes are not supported by the in-memory backend")
+            self.expect_op(")")
+        return _CreateIndex(label, key, name, unique, if_not_exists)
+
+    def index_property(self, var):
+        if self.name() != var:
+            self.fail(f"`{var}`")
+        self.expect_op(".")
+        return self.name()
+
+    # --- Muster ---
+
+    def patterns(self):
+        parts = [self.pattern_part()]
+        while self.accept_op(","):
+            parts.append(self.pattern_part())
+        return parts
+
+    def pattern_part(self):
+        path_var = None
+        if self.is_name() and self.is_op("=", 1):
+            path_var = self.name()
+            self.pos += 1
+        nodes = [self.node_pattern()]
+        rels = []
+        while self.is_op("-") or self.is_op("<"):
+            rels.append(self.rel_pattern())
+            nodes.append(self.node_pattern())
+        return _PatternPart(path_var, nodes, rels)
+
+    def node_pattern(self):
+        self.expect_op("(")
+        var = self.name() if self.is_name() else None
+        labels = []
+        while self.accept_op(":"):
+            labels.append(self.name())
+        props = self.pattern_properties()
+        self.expect_op(")")
+        return _NodePattern(var, labels, props)
+
+    def pattern_properties(self):
+        if not self.is_op("{"):
+            return []
+        _, keys, values = self.map_literal()
+        return list(zip(keys, values))
+
+    def rel_pattern(self):
+        left = self.accept_op("<")
+        self.expect_op("-")
+        var, types, var_length, min_hops, max_hops, props = None, [], False, 1, 1, []
+        if self.accept_op("["):
+            var = self.name() if self.is_name() else None
+            if self.accept_op(":"):
+                types.append(self.name())
+                while self.accept_op("|"):
+                    self.accept_op(":")
+                    types.append(self.name())
+            if self.accept_op("*"):
+                var_length, min_hops, max_hops = True, 1, None
+                if self.peek().kind == "number":
+                    min_hops = max_hops = self.hops()
+                    if self.accept_op(".."):
+                        max_hops = self.hops() if self.peek().kind == "number" else None
+                elif self.accept_op(".."):
+                    max_hops = self.hops() if self.peek().kind == "number" else None
+            props = self.pattern_properties()
+            self.expect_op("]")
+        self.expect_op("-")
+        right = self.accept_op(">")
+        if left and right:
+            self.fail("a relationship direction")
+        direction = "in" if left else "out" if right else "both"
+        return _RelPattern(var, types, direction, var_length, min_hops, max_hops, props)
+
+    def hops(self):
+        token = self.peek()
+        if not isinstance(token.value, int):
+            self.fail("an integer")
+        self.pos += 1
+        return token.value
+
+    # --- Ausdrücke ---
+
+    def expression(self):
+        left = self.xor_expression()
+        while self.accept_keyword("OR"):
+            left = ("or", left, self.xor_expression())
+        return left
+
+    def xor_expression(self):
+        left = self.and_expression()
+        while self.accept_keyword("XOR"):
+            left = ("xor", left, self.and_expression())
+        return left
+
+    def and_expression(self):
+        left = self.not_expression()
+        while self.accept_keyword("AND"):
+            left = ("and", left, self.not_expression())
+        return left
+
+    def not_expression(self):
+        if self.accept_keyword("NOT"):
+            return ("not", self.not_expression())
+        return self.comparison()
+
+    def comparison(self):
+        left = self.additive()
+        while True:
+            token = self.peek()
+            if token.kind == "op" and token.value in ("=", "<>", "!=", "<", ">", "<=", ">=", "=~"):
+                self.pos += 1
+                left = ("binary", "<>" if token.value == "!=" else token.value, left, self.additive())
+            elif self.accept_keyword("STARTS", "WITH"):
+                left = ("binary", "starts with", left, self.additive())
+            elif self.accept_keyword("ENDS", "WITH"):
+                left = ("binary", "ends with", left, self.additive())
+            elif self.accept_keyword("CONTAINS"):
+                left = ("binary", "contains", left, self.additive())
+            elif self.accept_keyword("IN"):
+                left = ("binary", "in", left, self.additive())
+            elif self.accept_keyword("IS", "NOT", "NULL"):
+                left = ("is_null", left, True)
+            elif self.accept_keyword("IS", "NULL"):
+                left = ("is_null", left, False)
+            else:
+                return left
+
+    def additive(self):
+        left = self.multiplicative()
+        while self.is_op("+") or self.is_op("-"):
+            op = self.peek().value
+            self.pos += 1
+            left = ("binary", op, left, self.multiplicative())
+        return left
+
+    def multiplicative(self):
+        left = self.power()
+        while self.is_op("*") or self.is_op("/") or self.is_op("%"):
+            op = self.peek().value
+            self.pos += 1
+            left = ("binary", op, left, self.power())
+        return left
+
+    def power(self):
+        left = self.unary()
+        while self.accept_op("^"):
+            left = ("binary", "^", left, self.unary())
+        return left
+
+    def unary(self):
+        if self.accept_op("-"):
+            operand = self.unary()
+            if operand[0] == "literal" and _is_number(operand[1]):
+                return ("literal", -operand[1])
+            return ("negate", operand)
+        if self.accept_op("+"):
+            return self.unary()
+        return self.postfix()
+
+    def postfix(self):
+        expression = self.atom()
+        while True:
+            if self.accept_op("."):
+                expression = ("property", expression, self.name())
+            elif self.accept_op("["):
+                if self.accept_op(".."):
+                    high = None if self.is_op("]") else self.expression()
+                    expression = ("slice", expression, None, high)
+                else:
+                    index = self.expression()
+                    if self.accept_op(".."):
+                        high = None if self.is_op("]") else self.expression()
+                        expression = ("slice", expression, index, high)
+                    else:
+                        expression = ("subscript", expression, index)
+                self.expect_op("]")
+            elif expression[0] == "variable" and self.is_op(":") and self.is_name(1):
+                labels = []
+                while self.accept_op(":"):
+                    labels.append(self.name())
+                expression = ("has_labels", expression, tuple(labels))
+            else:
+                return expression
+
+    def atom(self):
+        token = self.peek()
+        if token.kind in ("string", "number"):
+            self.pos += 1
+            return ("literal", token.value)
+        if token.kind == "param":
+            self.pos += 1
+            return ("parameter", token.value)
+        if token.kind == "quoted":
+            self.pos += 1
+            return ("variable", token.value)
+        if self.accept_op("("):
+            expression = self.expression()
+            self.expect_op(")")
+            return expression
+        if self.is_op("["):
+            return self.list_literal()
+        if self.is_op("{"):
+            return self.map_literal()
+        if token.kind != "name":
+            self.fail("an expression")
+
+        word = token.value.upper()
+        if word in ("TRUE", "FALSE", "NULL"):
+            self.pos += 1
+            return ("literal", {"TRUE": True, "FALSE": False, "NULL": None}[word])
+        if word == "CASE":
+            self.pos += 1
+            return self.case()
+        if word in ("ANY", "ALL", "NONE", "SINGLE") and self.is_op("(", 1):
+            self.pos += 2
+            name = self.name()
+            self.expect_keyword("IN")
+            source = self.expression()
+            self.expect_keyword("WHERE")
+            predicate = self.expression()
+            self.expect_op(")")
+            return ("list_predicate", word.lower(), name, source, predicate)
+
+        # Funktionsaufruf, auch mit Namensraum wie apoc.meta.type(...)
+        offset = 1
+        while self.is_op(".", offset) and self.is_name(offset + 1):
+            offset += 2
+        if self.is_op("(", offset):
+            name = ".".join(self.tokens[self.pos + i].value for i in range(0, offset, 2))
+            self.pos += offset
+            return self.function_call(name)
+        self.pos += 1
+        return ("variable", token.value)
+
+    def function_call(self, name):
+        self.expect_op("(")
+        distinct = self.accept_keyword("DISTINCT")
+        lower = name.lower()
+        if lower == "count" and self.accept_op("*"):
+            self.expect_op(")")
+            return ("call", "count", False, (("star",),))
+        args = () if self.is_op(")") else tuple(self.expressions())
+        self.expect_op(")")
+        return ("call", lower, distinct, args)
+
+    def case(self):
+        subject = None if self.is_keyword("WHEN") else self.expression()
+        whens = []
+        while self.accept_keyword("WHEN"):
+            condition = self.expression()
+            self.expect_keyword("THEN")
+            whens.append(("when", condition, self.expression()))
+        if not whens:
+            self.fail("WHEN")
+        default = self.expression() if self.accept_keyword("ELSE") else None
+        self.expect_keyword("END")
+        return ("case", subject, tuple(whens), default)
+
+    def list_literal(self):
+        self.expect_op("[")
+        if self.is_name() and self.is_keyword("IN", 1):
+            name = self.name()
+            self.pos += 1
+            source = self.expression()
+            where = self.expression() if self.accept_keyword("WHERE") else None
+            projection = self.expression() if self.accept_op("|") else None
+            self.expect_op("]")
+            return ("comprehension", name, source, where, projection)
+        items = () if self.is_op("]") else tuple(self.expressions())
+        self.expect_op("]")
+        return ("list", items)
+
+    def map_literal(self):
+        self.expect_op("{")
+        keys, values = [], []
+        if not self.is_op("}"):
+            while True:
+                keys.append(self.name())
+                self.expect_op(":")
+                values.append(self.expression())
+                if not self.accept_op(","):
+                    break
+        self.expect_op("}")
+        return ("map", tuple(keys), tuple(values))
+
+_parsed: dict[str, _Query] = {}
+_parsed_lock = threading.Lock()
+
+def parse(cypher):
+    """Geparstes Statement (mit `execute(graph, params)`), pro Text einmal geparst."""
+    query = _parsed.get(cypher)
+    if query is None:
+        query = _Parser(cypher).statement()
+        with _parsed_lock:
+            if len(_parsed) >= MAX_PARSED:
+                _parsed.clear()
+            _parsed[cypher] = query
+    return query
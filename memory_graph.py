@@ -0,0 +1,653 @@
+import gc
+import json
+import os
+import threading
+import time
+import weakref
+from py2neo import Relationship
+from py2neo.errors import Neo4jError
+from metrics import timed_statement
+
+# so lange wartet eine Schreibtransaktion auf die offene eines anderen Threads
+TX_TIMEOUT = float(os.getenv("GRAPH_MEMORY_TX_TIMEOUT", "60"))
+
+class MemoryNode(dict):
+    """Knoten des In-Memory-Graphen, verhält sich für die Blueprints wie ein py2neo-Node."""
+
+    __slots__ = ("identity", "labels")
+
+    def __init__(self, identity, labels, props=None):
+        super().__init__(props or {})
+        self.identity = identity
+        self.labels = tuple(labels)
+
+    def __hash__(self):
+        return hash(self.identity)
+
+    def __eq__(self, other):
+        return isinstance(other, MemoryNode) and other.identity == self.identity
+
+    def __repr__(self):
+        return f"MemoryNode({self.identity}, {list(self.labels)}, {dict(self)})"
+
+class MemoryRelationship(dict):
+    """
+    Relationship des In-Memory-Graphen. Wie bei py2neo ist der Typ der Klassenname
+    (`type(rel).__name__`), pro Typ gibt es eine Unterklasse, siehe `relationship_class`.
+    """
+
+    __slots__ = ("identity", "start_node", "end_node")
+
+    def __init__(self, identity, start_node, end_node, props=None):
+        super().__init__(props or {})
+        self.identity = identity
+        self.start_node = start_node
+        self.end_node = end_node
+
+    def __hash__(self):
+        return hash(("relationship", self.identity))
+
+    def __eq__(self, other):
+        return isinstance(other, MemoryRelationship) and other.identity == self.identity
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.identity}, {self.start_node.identity}, {self.end_node.identity}, {dict(self)})"
+
+_relationship_classes: dict[str, type] = {}
+
+def relationship_class(rel_type):
+    cls = _relationship_classes.get(rel_type)
+    if cls is None:
+        cls = _relationship_classes.setdefault(rel_type, type(rel_type, (MemoryRelationship,), {"__slots__": ()}))
+    return cls
+
+class MemoryPath:
+    """Pfad aus Knoten und Relationships in Pfadrichtung, wie py2neo.Path."""
+
+    __slots__ = ("nodes", "relationships")
+
+    def __init__(self, nodes, relationships):
+        self.nodes = tuple(nodes)
+        self.relationships = tuple(relationships)
+
+    @property
+    def start_node(self):
+        return self.nodes[0]
+
+    @property
+    def end_node(self):
+        return self.nodes[-1]
+
+    def __len__(self):
+        return len(self.relationships)
+
+    def __hash__(self):
+        return hash((self.nodes[0].identity, tuple(r.identity for r in self.relationships)))
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, MemoryPath)
+            and other.nodes[0].identity == self.nodes[0].identity
+            and [r.identity for r in other.relationships] == [r.identity for r in self.relationships]
+        )
+
+    def __repr__(self):
+        return f"MemoryPath({[n.identity for n in self.nodes]}, {[r.identity for r in self.relationships]})"
+
+class MemoryTransaction:
+    """
+    Schreibtransaktion auf dem In-Memory-Graphen. Solange sie offen ist, werden alle
+    Änderungen des Threads protokolliert und bei `rollback` rückwärts wieder entfernt.
+    Es ist immer nur eine Schreibtransaktion gleichzeitig offen.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.undo = []
+        self.finished = False
+
+    def run(self, cypher, parameters=None, **kwparameters):
+        return self.graph.run(cypher, parameters, **kwparameters)
+
+    def evaluate(self, cypher, parameters=None, **kwparameters):
+        return self.graph.evaluate(cypher, parameters, **kwparameters)
+
+    def create(self, subgraph):
+        self.graph.create(subgraph)
+
+    def commit(self):
+        self.graph._end_transaction(self)
+
+    def rollback(self):
+        self.graph._undo(self.undo)
+        self.graph._end_transaction(self)
+
+class _WriteSlot:
+    """Die offene Schreibtransaktion: Besitzer-Thread, Undo-Protokoll und (schwach) die Transaktion."""
+
+    __slots__ = ("tx", "thread", "owner", "undo")
+
+    def __init__(self, tx):
+        self.tx = weakref.ref(tx)
+        self.thread = threading.current_thread()
+        self.owner = self.thread.ident
+        self.undo = tx.undo
+
+    def abandoned(self):
+        """Weder committet noch zurückgerollt, aber nicht mehr erreichbar oder der Thread ist beendet."""
+        return self.tx() is None or not self.thread.is_alive()
+
+class MemoryGraph:
+    """
+    Graph im Prozess, als Ersatz für Neo4j bei Benchmarks und Tests (GRAPH_BACKEND=memory).
+
+    Knoten liegen in einem dict (id -> MemoryNode), dazu gibt es:
+    - pro Label die Knoten in Einfügereihenfolge (Label-Scan),
+    - Property-Indexe (label, key) -> {Wert: id(s)}, angelegt per CREATE INDEX/CONSTRAINT,
+    - ausgehende und eingehende Relationships pro Knoten.
+
+    `run`, `query` und `evaluate` werten Cypher mit memory_cypher.py aus, die Blueprints
+    schicken also dieselben Statements wie an Neo4j. Jedes Statement läuft unter einer
+    Sperre, schreibende ohne offene Transaktion in einer eigenen, die bei einem Fehler
+    zurückgerollt wird.
+
+    Schreibtransaktionen laufen nacheinander. Wer auf eine fremde wartet, bekommt nach
+    `tx_timeout` Sekunden einen TransientError. Eine Transaktion, deren Thread beendet ist
+    oder die ohne commit/rollback verworfen wurde, rollt der nächste Schreiber zurück.
+    """
+
+    backend = "memory"
+    # py2neo hasht gebundene Knoten über graph.service und graph.name
+    name = None
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._write_cond = threading.Condition()
+        self._slot = None
+        self.tx_timeout = TX_TIMEOUT
+        self._nodes = {}
+        self._by_label = {}
+        self._indexes = {}
+        self._index_info = {}
+        self._rels = {}
+        self._rel_types = {}
+        self._out = {}
+        self._in = {}
+        self._next_node_id = 0
+        self._next_rel_id = 0
+
+    @classmethod
+    def from_env(cls):
+        """Optional mit einem Dump (Format von /api/dump_database) aus GRAPH_MEMORY_SEED befüllt."""
+        graph = cls()
+        seed = os.getenv("GRAPH_MEMORY_SEED")
+        if seed:
+            with open(seed, encoding="utf-8") as f:
+                graph.load(json.load(f))
+        return graph
+
+    # --- Oberfläche des GraphClient -------------------------------------------------
+
+    @property
+    def reads(self):
+        return self
+
+    @property
+    def service(self):
+        return self
+
+    def init_app(self, app):
+        pass
+
+    def connect_in_background(self):
+        pass
+
+    def pool_stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "connected": True,
+                "sessionsInUse": 0,
+                "nodes": len(self._nodes),
+                "relationships": len(self._rels),
+                "labels": len(self._by_label),
+                "indexes": sorted(f"{label}.{key}" for label, key in self._index_info),
+            }
+
+    def run(self, cypher, parameters=None, **kwparameters):
+        return timed_statement(self._run, cypher, parameters, **kwparameters)
+
+    def _run(self, cypher, parameters=None, **kwparameters):
+        from memory_cypher import parse  # memory_cypher importiert die Klassen aus diesem Modul
+
+        query = parse(cypher)
+        params = dict(parameters or {}, **kwparameters)
+        if not query.writes:
+            with self._lock:
+                return query.execute(self, params)
+
+        return self._write(lambda: query.execute(self, params))
+
+    query = run
+
+    def evaluate(self, cypher, parameters=None, **kwparameters):
+        return self.run(cypher, parameters, **kwparameters).evaluate()
+
+    def _write(self, work):
+        """`work()` in der offenen Transaktion dieses Threads, sonst in einer eigenen."""
+        slot = self._slot
+        if slot is not None and slot.owner == threading.get_ident() and slot.tx() is not None:
+            with self._lock:
+                return work()
+        tx = self.begin()
+        try:
+            with self._lock:
+                result = work()
+        except BaseException:
+            tx.rollback()
+            raise
+        tx.commit()
+        return result
+
+    def begin(self, readonly=False):
+        if readonly:
+            return MemoryTransaction(self)
+        start = time.monotonic()
+        deadline = start + self.tx_timeout
+        collected = False
+        with self._write_cond:
+            while self._slot is not None:
+                slot = self._slot
+                if not collected and time.monotonic() - start > 1.0:
+                    # verworfene Transaktionen in Referenzzyklen (z.B. im Traceback eines Fehlers)
+                    gc.collect()
+                    collected = True
+                if slot.abandoned():
+                    self._undo(slot.undo)
+                    self._slot = None
+                    break
+                if slot.owner == threading.get_ident():
+                    raise Neo4jError(
+                        "In diesem Thread ist schon eine Schreibtransaktion offen",
+                        "Neo.ClientError.Transaction.TransactionStartFailed"
+                    )
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Neo4jError(
+                        f"Die Schreibtransaktion von {slot.thread.name} ist seit {self.tx_timeout:.0f}s offen",
+                        "Neo.TransientError.Transaction.LockAcquisitionTimeout"
+                    )
+                self._write_cond.wait(min(remaining, 0.1))
+            tx = MemoryTransaction(self)
+            self._slot = _WriteSlot(tx)
+            return tx
+
+    def commit(self, tx):
+        tx.commit()
+
+    def rollback(self, tx):
+        tx.rollback()
+
+    # --- py2neo-Objekte (Tests legen Daten mit Node/Relationship an) -------------------
+
+    def create(self, subgraph):
+        """
+        Wie py2neo `Graph.create`: legt die noch nicht gespeicherten Knoten und Relationships
+        eines Node, Relationship oder Subgraph an und setzt ihre `graph` und `identity`.
+        """
+        def work():
+            for entity in list(subgraph.nodes) + list(subgraph.relationships):
+                if entity.graph is not None and entity.identity is not None:
+                    continue
+                if isinstance(entity, Relationship):
+                    created = self.create_relationship(
+                        entity.start_node.identity, type(entity).__name__, entity.end_node.identity, dict(entity)
+                    )
+                else:
+                    created = self.create_node(list(entity.labels), dict(entity))
+                entity.graph = self
+                entity.identity = created.identity
+
+        self._write(work)
+
+    def delete_all(self):
+        self.run("MATCH (n) DETACH DELETE n")
+
+    @property
+    def nodes(self):
+        """Wie py2neo `Graph.nodes`: `graph.nodes.match("Label", key=value).first()`."""
+        return MemoryNodeMatcher(self)
+
+    def _end_transaction(self, tx):
+        if tx.finished:
+            return
+        tx.finished = True
+        with self._write_cond:
+            if self._slot is not None and self._slot.tx() is tx:
+                self._slot = None
+                self._write_cond.notify_all()
+
+    def _undo(self, undo):
+        """Änderungen einer Transaktion rückwärts zurücknehmen (danach ist `undo` leer)."""
+        with self._lock:
+            while undo:
+                action, entity, *args = undo.pop()
+                if action == "node":
+                    self._drop_node(entity)
+                elif action == "relationship":
+                    self._drop_relationship(entity)
+                elif action == "deleted_node":
+                    self._insert_node(entity)
+                elif action == "deleted_relationship":
+                    self._insert_relationship(entity)
+                else:
+                    self._replace_properties(entity, args[0])
+
+    def _log_undo(self, *entry):
+        slot = self._slot
+        if slot is not None and slot.owner == threading.get_ident():
+            slot.undo.append(entry)
+
+    # --- Schreiben -------------------------------------------------------------------
+
+    def create_node(self, labels, props=None, identity=None):
+        with self._lock:
+            if identity is None:
+                identity = self._next_node_id
+            elif identity in self._nodes:
+                raise ValueError(f"Knoten {identity} existiert bereits")
+            self._next_node_id = max(self._next_node_id, identity + 1)
+
+            node = MemoryNode(identity, dict.fromkeys(labels), _without_nulls(props))
+            self._check_unique(node)
+            self._insert_node(node)
+            self._log_undo("node", node)
+            return node
+
+    def create_relationship(self, start_id, rel_type, end_id, props=None, identity=None):
+        with self._lock:
+            start_node = self._nodes.get(start_id)
+            end_node = self._nodes.get(end_id)
+            if start_node is None or end_node is None:
+                raise KeyError(f"Knoten {start_id} oder {end_id} existiert nicht")
+            if identity is None:
+                identity = self._next_rel_id
+            self._next_rel_id = max(self._next_rel_id, identity + 1)
+
+            rel = relationship_class(rel_type)(identity, start_node, end_node, _without_nulls(props))
+            self._insert_relationship(rel)
+            self._log_undo("relationship", rel)
+            return rel
+
+    def set_properties(self, entity, props, replace=False):
+        """Wie `SET n += props` (mit `replace` wie `SET n = props`), None entfernt die Property."""
+        with self._lock:
+            old = dict(entity)
+            new = {} if replace else dict(old)
+            for key in props:
+                new.pop(key, None)
+            new.update(_without_nulls(props))
+            self._replace_properties(entity, new)
+            if isinstance(entity, MemoryNode):
+                try:
+                    self._check_unique(entity)
+                except Neo4jError:
+                    self._replace_properties(entity, old)
+                    raise
+            self._log_undo("props", entity, old)
+
+    def delete_node(self, node, detach=False):
+        with self._lock:
+            if self._nodes.get(node.identity) is not node:
+                return  # schon gelöscht
+            rels = list(self._out.get(node.identity, {}).values()) + list(self._in.get(node.identity, {}).values())
+            if rels and not detach:
+                raise Neo4jError(
+                    f"Cannot delete node<{node.identity}>, because it still has relationships. "
+                    "To delete this node, you must first delete its relationships.",
+                    "Neo.ClientError.Schema.ConstraintValidationFailed"
+                )
+            for rel in rels:
+                self.delete_relationship(rel)
+            self._drop_node(node)
+            self._log_undo("deleted_node", node)
+
+    def delete_relationship(self, rel):
+        with self._lock:
+            if self._rels.get(rel.identity) is not rel:
+                return
+            self._drop_relationship(rel)
+            self._log_undo("deleted_relationship", rel)
+
+    def create_index(self, label, key, name=None, unique=False):
+        """Index (bzw. mit `unique` Uniqueness-Constraint) auf label.key, False wenn es ihn schon gibt."""
+        with self._lock:
+            existing = self._index_info.get((label, key))
+            if existing is not None:
+                if existing["unique"] != unique:
+                    raise Neo4jError(
+                        f"There already exists an index or constraint on (:{label} {{{key}}})",
+                        "Neo.ClientError.Schema.EquivalentSchemaRuleAlreadyExists"
+                    )
+                return False
+
+            index = {}
+            for node in self._by_label.get(label, {}).values():
+                if key in node:
+                    if unique and _index_ids(index, node[key]):
+                        raise Neo4jError(
+                            f"Unable to create constraint: Both node {_index_ids(index, node[key])[0]} and "
+                            f"node {node.identity} share the property value ( {key} = {node[key]!r} )",
+                            "Neo.DatabaseError.Schema.ConstraintCreationFailed"
+                        )
+                    _index_add(index, node[key], node.identity)
+            self._indexes.setdefault(label, {})[key] = index
+            self._index_info[(label, key)] = {
+                "name": name or f"{'constraint' if unique else 'index'}_{label}_{key}",
+                "unique": unique,
+            }
+            return True
+
+    def drop_index(self, name):
+        """Index bzw. Constraint mit diesem Namen entfernen, False wenn es ihn nicht gibt."""
+        with self._lock:
+            for (label, key), info in self._index_info.items():
+                if info["name"] == name:
+                    del self._index_info[(label, key)]
+                    del self._indexes[label][key]
+                    if not self._indexes[label]:
+                        del self._indexes[label]
+                    return True
+            return False
+
+    def load(self, dump):
+        """Lädt einen Dump von /api/dump_database, die ids bleiben erhalten."""
+        with self._lock:
+            for node in dump.get("nodes", []):
+                self.create_node(node.get("labels") or [], node.get("props") or {}, node.get("id"))
+            for rel in dump.get("relationships", []):
+                self.create_relationship(rel["start_id"], rel["type"], rel["end_id"], rel.get("props"), rel.get("id"))
+
+    # --- Strukturen ohne Undo-Protokoll ----------------------------------------------
+
+    def _insert_node(self, node):
+        self._nodes[node.identity] = node
+        for label in node.labels:
+            self._by_label.setdefault(label, {})[node.identity] = node
+        self._index(node)
+
+    def _drop_node(self, node):
+        self._unindex(node)
+        for label in node.labels:
+            nodes = self._by_label[label]
+            del nodes[node.identity]
+            if not nodes:
+                del self._by_label[label]
+        self._out.pop(node.identity, None)
+        self._in.pop(node.identity, None)
+        del self._nodes[node.identity]
+
+    def _insert_relationship(self, rel):
+        self._rels[rel.identity] = rel
+        self._out.setdefault(rel.start_node.identity, {})[rel.identity] = rel
+        self._in.setdefault(rel.end_node.identity, {})[rel.identity] = rel
+        rel_type = type(rel).__name__
+        self._rel_types[rel_type] = self._rel_types.get(rel_type, 0) + 1
+
+    def _drop_relationship(self, rel):
+        del self._rels[rel.identity]
+        del self._out[rel.start_node.identity][rel.identity]
+        del self._in[rel.end_node.identity][rel.identity]
+        rel_type = type(rel).__name__
+        self._rel_types[rel_type] -= 1
+        if not self._rel_types[rel_type]:
+            del self._rel_types[rel_type]
+
+    def _replace_properties(self, entity, props):
+        is_node = isinstance(entity, MemoryNode) and self._nodes.get(entity.identity) is entity
+        if is_node:
+            self._unindex(entity)
+        entity.clear()
+        entity.update(props)
+        if is_node:
+            self._index(entity)
+
+    def _index(self, node):
+        for label in node.labels:
+            for key, index in self._indexes.get(label, {}).items():
+                if key in node:
+                    _index_add(index, node[key], node.identity)
+
+    def _unindex(self, node):
+        for label in node.labels:
+            for key, index in self._indexes.get(label, {}).items():
+                if key in node:
+                    _index_discard(index, node[key], node.identity)
+
+    def _check_unique(self, node):
+        for label in node.labels:
+            for key, index in self._indexes.get(label, {}).items():
+                if key not in node or not self._index_info[(label, key)]["unique"]:
+                    continue
+                other = [i for i in _index_ids(index, node[key]) if i != node.identity]
+                if other:
+                    raise Neo4jError(
+                        f"Node({other[0]}) already exists with label `{label}` and property `{key}` = {node[key]!r}",
+                        "Neo.ClientError.Schema.ConstraintValidationFailed"
+                    )
+
+    # --- Lesen -----------------------------------------------------------------------
+
+    def node(self, node_id):
+        return self._nodes.get(node_id)
+
+    def label_nodes(self, label=None):
+        if label is None:
+            return self._nodes.values()
+        return self._by_label.get(label, {}).values()
+
+    def outgoing(self, node):
+        return self._out.get(node.identity, {}).values()
+
+    def incoming(self, node):
+        return self._in.get(node.identity, {}).values()
+
+    def index_ids(self, label, key, value):
+        """ids der Knoten mit label und key = value über den Index, None wenn es keinen Index gibt."""
+        index = self._indexes.get(label, {}).get(key)
+        if index is None:
+            return None
+        return sorted(_index_ids(index, value))
+
+    def indexes(self):
+        """Indexe und Constraints wie SHOW INDEXES (die Indexe sind sofort ONLINE)."""
+        return [
+            {"name": info["name"], "label": label, "property": key, "unique": info["unique"]}
+            for (label, key), info in self._index_info.items()
+        ]
+
+    def labels(self):
+        return sorted(self._by_label)
+
+    def relationship_types(self):
+        return sorted(self._rel_types)
+
+    def property_keys(self):
+        keys = set()
+        for entity in list(self._nodes.values()) + list(self._rels.values()):
+            keys.update(entity)
+        return sorted(keys)
+
+class MemoryNodeMatcher:
+    """Der Teil von py2neo `NodeMatcher`, den die Tests brauchen."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def match(self, *labels, **properties):
+        with self.graph._lock:
+            candidates = self.graph.label_nodes(labels[0] if labels else None)
+            return MemoryNodeMatch([
+                node for node in candidates
+                if all(label in node.labels for label in labels)
+                and all(node.get(key) == value for key, value in properties.items())
+            ])
+
+class MemoryNodeMatch(list):
+    def first(self):
+        return self[0] if self else None
+
+    def all(self):
+        return list(self)
+
+def _without_nulls(props):
+    """Properties ohne None-Werte; wie in Neo4j nur einfache Werte und Listen davon."""
+    result = {}
+    for key, value in (props or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, (dict, MemoryNode, MemoryRelationship, MemoryPath)) or (
+            isinstance(value, (list, tuple)) and any(isinstance(v, (dict, list, tuple, MemoryPath)) or v is None for v in value)
+        ):
+            raise Neo4jError(
+                f"Property values can only be of primitive types or arrays thereof (`{key}`)",
+                "Neo.ClientError.Statement.TypeError"
+            )
+        result[key] = value
+    return result
+
+def _index_value(value):
+    # Listen (Cypher-Arrays) als Tupel, damit sie als Schlüssel taugen
+    return tuple(value) if isinstance(value, list) else value
+
+# Ein Index bildet Wert -> id ab, erst ab dem zweiten Knoten mit demselben Wert auf ein Set.
+# Spart bei eindeutigen Schlüsseln (MERGE) ein Set pro Knoten.
+
+def _index_add(index, value, node_id):
+    value = _index_value(value)
+    ids = index.get(value)
+    if ids is None:
+        index[value] = node_id
+    elif isinstance(ids, set):
+        ids.add(node_id)
+    elif ids != node_id:
+        index[value] = {ids, node_id}
+
+def _index_ids(index, value):
+    try:
+        ids = index.get(_index_value(value))
+    except TypeError:
+        return ()  # nicht hashbar (z.B. eine Map), kann in keinem Index stehen
+    if ids is None:
+        return ()
+    return tuple(ids) if isinstance(ids, set) else (ids,)
+
+def _index_discard(index, value, node_id):
+    value = _index_value(value)
+    ids = index.get(value)
+    if isinstance(ids, set):
+        ids.discard(node_id)
+        if len(ids) == 1:
+            index[value] = next(iter(ids))
+    elif ids == node_id:
+        del index[value]
@@ -0,0 +1,243 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, has_request_context, request
+from slow_queries import slow_query_log
+from server_timing import phase
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_statement_name = ContextVar("statement_name", default=None)
+
+@contextmanager
+def statement(name):
+    """
+    Benennt alle Cypher-Abfragen innerhalb des Blocks für die Metriken, z.B.
+    `with statement("get_data.fetch_paths"): graph.run(...)`.
+    Unbenannte Abfragen laufen unter dem Flask-Endpunkt des Requests.
+    """
+    token = _statement_name.set(name)
+    try:
+        yield
+    finally:
+        _statement_name.reset(token)
+
+def current_statement():
+    name = _statement_name.get()
+    if name:
+        return name
+    if has_request_context() and request.endpoint:
+        return request.endpoint
+    return "unnamed"
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.counts):
+            total += n
+            yield bound, total
+
+class MetricsRegistry:
+    """
+    Sammelt Laufzeiten, Zeilen und Fehler pro benannter Cypher-Abfrage sowie die Dauer der
+    Flask-Requests pro Endpunkt und gibt sie im Prometheus-Textformat aus. Die Zahlen gelten
+    pro Prozess.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statement_latency = {}
+        self.statement_rows = {}
+        self.statement_errors = {}
+        self.request_latency = {}
+        self.request_count = {}
+
+    def observe_statement(self, name, seconds):
+        with self._lock:
+            hist = self.statement_latency.get(name)
+            if hist is None:
+                hist = self.statement_latency[name] = Histogram()
+            hist.observe(seconds)
+
+    def add_rows(self, name, rows):
+        with self._lock:
+            self.statement_rows[name] = self.statement_rows.get(name, 0) + rows
+
+    def record_error(self, name):
+        with self._lock:
+            self.statement_errors[name] = self.statement_errors.get(name, 0) + 1
+
+    def observe_request(self, endpoint, method, status, seconds):
+        with self._lock:
+            key = (endpoint, method)
+            hist = self.request_latency.get(key)
+            if hist is None:
+                hist = self.request_latency[key] = Histogram()
+            hist.observe(seconds)
+            count_key = (endpoint, method, str(status))
+            self.request_count[count_key] = self.request_count.get(count_key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.statement_latency.clear()
+            self.statement_rows.clear()
+            self.statement_errors.clear()
+            self.request_latency.clear()
+            self.request_count.clear()
+
+    def render(self, gauges=None):
+        """Prometheus-Textformat. `gauges`: zusätzliche {name: (hilfetext, wert)}."""
+        lines = []
+        with self._lock:
+            _render_histograms(lines, "oasis_cypher_statement_duration_seconds",
+                               "Laufzeit einer Cypher-Abfrage bis zum letzten Datensatz",
+                               {(("statement", k),): h for k, h in self.statement_latency.items()})
+            _render_counter(lines, "oasis_cypher_statement_rows_total",
+                            "Gelesene Datensätze pro Cypher-Abfrage",
+                            {(("statement", k),): v for k, v in self.statement_rows.items()})
+            _render_counter(lines, "oasis_cypher_statement_errors_total",
+                            "Fehlgeschlagene Cypher-Abfragen",
+                            {(("statement", k),): v for k, v in self.statement_errors.items()})
+            _render_histograms(lines, "oasis_http_request_duration_seconds",
+                               "Dauer eines HTTP-Requests pro Endpunkt",
+                               {(("endpoint", e), ("method", m)): h for (e, m), h in self.request_latency.items()})
+            _render_counter(lines, "oasis_http_requests_total",
+                            "HTTP-Requests pro Endpunkt und Status",
+                            {(("endpoint", e), ("method", m), ("status", s)): v for (e, m, s), v in self.request_count.items()})
+
+        for name, (help_text, value) in (gauges or {}).items():
+            if value is None:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs):
+    return ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs)
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _render_histograms(lines, name, help_text, series):
+    if not series:
+        return
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, hist in sorted(series.items()):
+        base = _labels(labels)
+        for bound, count in hist.cumulative():
+            lines.append(f'{name}_bucket{{{base},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{base},le="+Inf"}} {hist.count}')
+        lines.append(f"{name}_sum{{{base}}} {_format_value(hist.sum)}")
+        lines.append(f"{name}_count{{{base}}} {hist.count}")
+
+def _render_counter(lines, name, help_text, series):
+    if not series:
+        return
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in sorted(series.items()):
+        lines.append(f"{name}{{{_labels(labels)}}} {value}")
+
+registry = MetricsRegistry()
+
+class CountingCursor:
+    """Reicht einen py2neo-Cursor durch und zählt die gelesenen Datensätze für die Metriken."""
+
+    def __init__(self, cursor, name):
+        self._cursor = cursor
+        self._name = name
+
+    def data(self, *keys):
+        rows = self._cursor.data(*keys)
+        registry.add_rows(self._name, len(rows))
+        return rows
+
+    def __iter__(self):
+        rows = 0
+        try:
+            for record in self._cursor:
+                rows += 1
+                yield record
+        finally:
+            registry.add_rows(self._name, rows)
+
+    def __next__(self):
+        record = next(self._cursor)
+        registry.add_rows(self._name, 1)
+        return record
+
+    def evaluate(self, field=0):
+        value = self._cursor.evaluate(field)
+        if value is not None:
+            registry.add_rows(self._name, 1)
+        return value
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+def timed_statement(run, cypher, parameters=None, **kwparameters):
+    """
+    Führt `run(cypher, ...)` aus und erfasst Laufzeit, Zeilen und Fehler der Abfrage.
+    Langsame Abfragen landen zusätzlich im slow_query_log.
+    """
+    name = current_statement()
+    start = time.perf_counter()
+    try:
+        with phase("cypher"):
+            cursor = run(cypher, parameters, **kwparameters)
+    except Exception as e:
+        registry.record_error(name)
+        seconds = time.perf_counter() - start
+        if slow_query_log.is_slow(seconds):
+            slow_query_log.record(name, cypher, dict(parameters or {}, **kwparameters), seconds, error=e)
+        raise
+    # py2neo holt bei run() alle Datensätze, die Zeit ist also die der ganzen Abfrage
+    seconds = time.perf_counter() - start
+    registry.observe_statement(name, seconds)
+    if slow_query_log.is_slow(seconds):
+        slow_query_log.record(name, cypher, dict(parameters or {}, **kwparameters), seconds)
+    return CountingCursor(cursor, name)
+
+def init_app(app):
+    """Misst die Dauer jedes Requests pro Endpunkt."""
+
+    @app.before_request
+    def _start_request_timer():
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("_request_started", None)
+        if started is not None:
+            registry.observe_request(
+                request.endpoint or "unmatched",
+                request.method,
+                response.status_code,
+                time.perf_counter() - started
+            )
+        return response
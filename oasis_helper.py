@@ -1,10 +1,10 @@
-import time
 import os
-import sys
 import secrets
-from py2neo import Graph
+from graph_client import GraphClient
+from memory_graph import MemoryGraph
+from server_timing import phase
 from flask import current_app
-from flask_login import login_required
+from flask_login import login_required, current_user
 from functools import wraps
 
 def conditional_login_required(func):
@@ -12,6 +12,8 @@ def conditional_login_required(func):
     def wrapper(*args, **kwargs):
         if current_app.config.get("DISABLE_LOGIN", False):
             return func(*args, **kwargs)
+        with phase("auth"):
+            current_user.is_authenticated  # lädt den Benutzer (Session/DB), login_required nutzt ihn danach
         return login_required(func)(*args, **kwargs)
     return wrapper
 
@@ -34,29 +36,13 @@ def load_or_generate_secret_key():
         return key
 
 def get_graph_db_connection():
-    graph = None
-
-    try:
-        for attempt in range(15):  # max 15 Versuche
-            try:
-                graph = Graph(
-                    os.getenv("NEO4J_URI", "bolt://localhost:7687"),
-                    auth=(
-                        os.getenv("NEO4J_USER", "neo4j"),
-                        os.getenv("NEO4J_PASS", "testTEST12345678")
-                    )
-                )
-                graph.run("RETURN 1")  # Testabfrage
-                break
-            except Exception as e:
-                print(f"[{attempt+1}/15] Neo4j nicht bereit, warte 2 Sekunden... ({e})")
-                time.sleep(2)
-
-        if graph is None:
-            print("Neo4j konnte nicht erreicht werden!")
-            sys.exit(1)
-    except KeyboardInterrupt:
-        print("You pressed CTRL-C")
-        sys.exit(0)
+    # GRAPH_BACKEND=memory: Graph im Prozess statt Neo4j (Benchmarks, Tests, CI), siehe memory_graph.py
+    if os.getenv("GRAPH_BACKEND", "neo4j").lower() == "memory":
+        return MemoryGraph.from_env()
 
+    # Pool-Größe etc. über NEO4J_POOL_SIZE, NEO4J_POOL_MAX_AGE, NEO4J_POOL_ACQUIRE_TIMEOUT.
+    # Verbunden wird im Hintergrund bzw. beim ersten Zugriff, ist Neo4j nicht erreichbar,
+    # antworten die Endpunkte mit 503, bis der Reconnect klappt.
+    graph = GraphClient.from_env()
+    graph.connect_in_background()
     return graph
@@ -0,0 +1,146 @@
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from flask import current_app, jsonify, request
+from auth import admin_required
+
+PROFILE_MODES = ("cpu", "mem")
+
+class ProfileStore:
+    """Die letzten `keep` Profile im Speicher, zum Herunterladen über die Admin-Seite."""
+
+    def __init__(self, keep=20):
+        self.keep = keep
+        self._reports = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, report):
+        with self._lock:
+            report["id"] = next(self._ids)
+            self._reports[report["id"]] = report
+            while len(self._reports) > self.keep:
+                self._reports.popitem(last=False)
+        return report["id"]
+
+    def get(self, report_id):
+        with self._lock:
+            return self._reports.get(report_id)
+
+    def summaries(self):
+        """Neueste zuerst, ohne die Rohdaten."""
+        with self._lock:
+            reports = list(reversed(self._reports.values()))
+        return [{k: v for k, v in r.items() if k not in ("text", "raw")} for r in reports]
+
+def profile_cpu(view, top):
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        rv = view()
+    finally:
+        profiler.disable()
+    duration = time.perf_counter() - start
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(top)
+    return rv, duration, out.getvalue(), marshal.dumps(stats.stats)
+
+def profile_mem(view, top):
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(10)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    try:
+        start = time.perf_counter()
+        rv = view()
+        duration = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    # Laufzeit unter tracemalloc ist deutlich länger als ohne
+    lines = [f"Peak: {peak / 1024:.1f} KiB", "", f"Top {top} nach Zeile (belegt nach dem Request, inkl. Antwort):"]
+    for stat in snapshot.compare_to(before, "lineno")[:top]:
+        lines.append(str(stat))
+    lines += ["", f"Top {top} nach Aufrufkette:"]
+    for stat in snapshot.compare_to(before, "traceback")[:top]:
+        lines.append(str(stat))
+        lines.extend("    " + line for line in stat.traceback.format())
+
+    with tempfile.NamedTemporaryFile(suffix=".tracemalloc") as f:
+        snapshot.dump(f.name)
+        raw = f.read()
+    return rv, duration, "\n".join(lines) + "\n", raw
+
+class RequestProfiler:
+    """
+    `?__profile=cpu|mem` an einer beliebigen Route: der View läuft unter cProfile bzw.
+    tracemalloc, der Bericht wird in `store` abgelegt und ist über die Admin-Seite als
+    Text (Top-N) und als pstats- bzw. tracemalloc-Datei herunterladbar. Nur für Admins
+    (`admin_required`), und immer nur ein Profil gleichzeitig, weil tracemalloc global ist.
+
+    Gemessen wird der View bis zur fertigen Antwort im Request-Thread. Gestreamte Antworten
+    (NDJSON) und Arbeit in anderen Threads (async Fan-out) sind nicht enthalten.
+    """
+
+    def __init__(self, top=50, keep=20):
+        self.top = top
+        self.store = ProfileStore(keep)
+        self._busy = threading.Lock()
+
+    def init_app(self, app):
+        dispatch = app.dispatch_request
+
+        def dispatch_request():
+            mode = request.args.get("__profile")
+            if mode is None:
+                return dispatch()
+            return admin_required(lambda: self._profiled(mode, dispatch))()
+
+        app.dispatch_request = dispatch_request
+
+    def _profiled(self, mode, dispatch):
+        if mode not in PROFILE_MODES:
+            return jsonify({"status": "error", "message": f"__profile muss eines von {', '.join(PROFILE_MODES)} sein"}), 400
+        if not self._busy.acquire(blocking=False):
+            return jsonify({"status": "error", "message": "Es läuft bereits ein Profil, bitte später erneut versuchen"}), 409
+
+        try:
+            run = profile_cpu if mode == "cpu" else profile_mem
+            rv, duration, text, raw = run(dispatch, self.top)
+        finally:
+            self._busy.release()
+
+        report_id = self.store.add({
+            "mode": mode,
+            "endpoint": request.endpoint,
+            "method": request.method,
+            "path": request.full_path,
+            "createdAt": time.time(),
+            "durationMs": round(duration * 1000, 3),
+            "text": text,
+            "raw": raw,
+        })
+
+        response = current_app.make_response(rv)
+        response.headers["X-Profile-Id"] = str(report_id)
+        return response
+
+request_profiler = RequestProfiler(
+    top=int(os.getenv("OASIS_PROFILE_TOP", "50")),
+    keep=int(os.getenv("OASIS_PROFILE_KEEP", "20"))
+)
@@ -0,0 +1,83 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+# Reihenfolge im Header; weitere Phasen werden hinten angehängt
+PHASE_ORDER = ("auth", "cypher", "assemble", "serialize")
+
+_current_phase = ContextVar("server_timing_phase", default=None)
+_lock = threading.Lock()
+
+class _Phase:
+    __slots__ = ("parent", "child_seconds")
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.child_seconds = 0.0
+
+@contextmanager
+def phase(name):
+    """
+    Misst die Zeit des Blocks als Phase `name` des aktuellen Requests (für den Server-Timing-Header).
+    Verschachtelte Phasen werden der inneren zugerechnet, z.B. zählt eine Cypher-Abfrage
+    innerhalb von "assemble" nur als "cypher". Parallel laufende Abfragen (async /search)
+    werden aufsummiert und können zusammen länger sein als der Request.
+    """
+    if not has_request_context():
+        yield
+        return
+
+    frame = _Phase(_current_phase.get())
+    token = _current_phase.set(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_phase.reset(token)
+        with _lock:
+            timings = g.setdefault("_server_timing", {})
+            timings[name] = timings.get(name, 0.0) + elapsed - frame.child_seconds
+            if frame.parent is not None:
+                frame.parent.child_seconds += elapsed
+
+def current_timings():
+    """Bisher gemessene Phasen des Requests in Millisekunden (für Debug-Felder in JSON-Antworten)."""
+    if not has_request_context():
+        return {}
+    with _lock:
+        timings = dict(g.get("_server_timing", {}))
+    return {name: round(seconds * 1000, 3) for name, seconds in timings.items()}
+
+def format_header(timings, total_seconds):
+    names = [n for n in PHASE_ORDER if n in timings] + sorted(n for n in timings if n not in PHASE_ORDER)
+    parts = [f"{name};dur={timings[name] * 1000:.2f}" for name in names]
+    parts.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(parts)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask-JSON-Provider, der jedes dumps (jsonify & Co.) als Phase "serialize" misst."""
+
+    def dumps(self, obj, **kwargs):
+        with phase("serialize"):
+            return super().dumps(obj, **kwargs)
+
+def init_app(app):
+    """Server-Timing-Header (auth, cypher, assemble, serialize, total) für jede Antwort."""
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def _start_server_timing():
+        g._server_timing_started = time.perf_counter()
+
+    @app.after_request
+    def _server_timing_header(response):
+        started = g.pop("_server_timing_started", None)
+        if started is not None:
+            with _lock:
+                timings = dict(g.get("_server_timing", {}))
+            response.headers["Server-Timing"] = format_header(timings, time.perf_counter() - started)
+        return response
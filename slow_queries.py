@@ -0,0 +1,139 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from flask import has_request_context, request
+
+# Bei der PROFILE-Wiederholung selbst nicht noch einmal loggen
+PROFILE_STATEMENT = "admin.profile_replay"
+
+REDACTED = "***"
+
+class SlowQueryLog:
+    """
+    Ringpuffer der letzten langsamen Cypher-Abfragen (über `threshold_ms`), mit Text, Parametern,
+    Endpunkt und Dauer. Parameter, deren Name eines der `redact` Muster enthält, werden
+    geschwärzt (`redact_all` schwärzt alle Werte). Lange Listen werden gekürzt. Geschwärzte
+    oder gekürzte Einträge lassen sich nicht mit PROFILE wiederholen.
+    """
+
+    def __init__(self, threshold_ms=500, size=200, redact=(), redact_all=False, max_list_items=1000):
+        self.threshold_ms = threshold_ms
+        self.redact = tuple(p.lower() for p in redact)
+        self.redact_all = redact_all
+        self.max_list_items = max_list_items
+        self._entries = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold_ms > 0
+
+    def is_slow(self, seconds):
+        return self.enabled and seconds * 1000 >= self.threshold_ms
+
+    def record(self, name, cypher, parameters, seconds, error=None):
+        if not self.is_slow(seconds) or name == PROFILE_STATEMENT:
+            return
+
+        state = {"redacted": False, "truncated": False}
+        params = self._sanitize(parameters or {}, state)
+        entry = {
+            "statement": name,
+            "endpoint": request.endpoint if has_request_context() else None,
+            "method": request.method if has_request_context() else None,
+            "cypher": cypher,
+            "parameters": params,
+            "durationMs": round(seconds * 1000, 3),
+            "error": str(error) if error is not None else None,
+            "loggedAt": time.time(),
+            "replayable": not state["redacted"] and not state["truncated"],
+        }
+        with self._lock:
+            entry["id"] = next(self._ids)
+            self._entries.append(entry)
+
+    def _sanitize(self, value, state, key=None):
+        if key is not None and (self.redact_all or any(p in key.lower() for p in self.redact)):
+            state["redacted"] = True
+            return REDACTED
+        if isinstance(value, dict):
+            return {k: self._sanitize(v, state, str(k)) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            if len(value) > self.max_list_items:
+                state["truncated"] = True
+                value = value[:self.max_list_items]
+            return [self._sanitize(v, state) for v in value]
+        if self.redact_all and key is None:
+            state["redacted"] = True
+            return REDACTED
+        return value
+
+    def entries(self):
+        """Neueste zuerst."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def get(self, entry_id):
+        with self._lock:
+            for entry in self._entries:
+                if entry["id"] == entry_id:
+                    return entry
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def flatten_profile(plan, depth=0):
+    """Operatorbaum aus PROFILE als flache Liste (mit Tiefe) für die Admin-Seite."""
+    if not plan:
+        return []
+    args = plan.get("args") or {}
+    rows = [{
+        "depth": depth,
+        "operator": plan.get("operatorType"),
+        "details": args.get("Details"),
+        "dbHits": plan.get("dbHits", 0),
+        "rows": plan.get("rows", 0),
+        "identifiers": plan.get("identifiers", []),
+    }]
+    for child in plan.get("children") or []:
+        rows.extend(flatten_profile(child, depth + 1))
+    return rows
+
+def profile_statement(graph, entry):
+    """
+    Führt den geloggten Statement-Text mit PROFILE erneut aus, in einer Transaktion, die
+    danach zurückgerollt wird (schreibende Abfragen ändern also nichts).
+    """
+    cypher = entry["cypher"].lstrip()
+    for prefix in ("PROFILE", "EXPLAIN"):
+        if cypher.upper().startswith(prefix):
+            cypher = cypher[len(prefix):].lstrip()
+
+    from metrics import statement  # metrics importiert dieses Modul
+    tx = graph.begin()
+    try:
+        with statement(PROFILE_STATEMENT):
+            cursor = tx.run("PROFILE " + cypher, entry["parameters"])
+            cursor.data()
+            plan = cursor.plan()
+    finally:
+        tx.rollback()
+
+    operators = flatten_profile(plan)
+    return {
+        "id": entry["id"],
+        "operators": operators,
+        "totalDbHits": sum(op["dbHits"] or 0 for op in operators),
+    }
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=float(os.getenv("OASIS_SLOW_QUERY_MS", "500")),
+    size=int(os.getenv("OASIS_SLOW_QUERY_LOG_SIZE", "200")),
+    redact=[p.strip() for p in os.getenv("OASIS_SLOW_QUERY_REDACT", "pass,token,secret").split(",") if p.strip()],
+    redact_all=os.getenv("OASIS_SLOW_QUERY_REDACT_ALL", "0") == "1"
+)
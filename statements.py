@@ -0,0 +1,318 @@
+"""
+Zentrale Sammlung der Cypher-Abfragen als benannte Vorlagen.
+
+Werte gehen immer als `$parameter` an Neo4j, im Text stehen nur Namen: Labels,
+Relationship-Typen und Property-Namen werden als `{{platzhalter}}` eingesetzt und dabei mit
+`quote_identifier` in Backticks gesetzt. So hat jede Abfrage pro Namenskombination genau
+einen Statement-Text, Neo4j kann den Plan aus dem Plan-Cache nehmen, und die Metriken
+laufen unter dem Namen der Vorlage (z.B. `update_node.set_property`).
+
+    statements.UPDATE_NODE_PROPERTY.run(graph, {"node_id": 1, "value": "x"}, property="name")
+
+Abfragen mit variabler Form (Filter und Pfadlängen in get_data_as_table) werden weiter dort
+zusammengesetzt, benutzen aber ebenfalls `quote_identifier` und laufen unter einem Namen.
+"""
+import re
+import threading
+from metrics import statement
+
+_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+# so viele Namenskombinationen werden pro Vorlage gemerkt (Labels kommen aus Requests)
+MAX_COMPILED = 1024
+
+def quote_identifier(name):
+    """Label-/Property-Namen für Cypher in Backticks setzen (Backticks im Namen werden verdoppelt)."""
+    if name is None or str(name) == "":
+        raise ValueError("Leerer Name für Label, Relationship-Typ oder Property")
+    return "`" + str(name).replace("`", "``") + "`"
+
+class Statement:
+    """Benannte Cypher-Vorlage, der Text wird pro Namenskombination einmal erzeugt."""
+
+    def __init__(self, name, template):
+        self.name = name
+        self.template = template
+        self.identifiers = tuple(dict.fromkeys(_PLACEHOLDER.findall(template)))
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def cypher(self, **identifiers):
+        key = tuple(identifiers.get(name) for name in self.identifiers)
+        text = self._compiled.get(key)
+        if text is not None:
+            return text
+
+        missing = [name for name in self.identifiers if identifiers.get(name) is None]
+        if missing:
+            raise ValueError(f"Statement {self.name}: fehlende Namen {', '.join(missing)}")
+        unknown = set(identifiers) - set(self.identifiers)
+        if unknown:
+            raise ValueError(f"Statement {self.name}: unbekannte Namen {', '.join(sorted(unknown))}")
+
+        text = _PLACEHOLDER.sub(lambda m: quote_identifier(identifiers[m.group(1)]), self.template)
+        with self._lock:
+            if len(self._compiled) >= MAX_COMPILED:
+                self._compiled.clear()
+            self._compiled[key] = text
+        return text
+
+    def run(self, graph, parameters=None, **identifiers):
+        with statement(self.name):
+            return graph.run(self.cypher(**identifiers), parameters or {})
+
+    def evaluate(self, graph, parameters=None, **identifiers):
+        with statement(self.name):
+            return graph.evaluate(self.cypher(**identifiers), parameters or {})
+
+    def __repr__(self):
+        return f"Statement({self.name!r})"
+
+_registry: dict[str, Statement] = {}
+
+def register(name, template):
+    if name in _registry:
+        raise ValueError(f"Statement {name} ist bereits registriert")
+    _registry[name] = Statement(name, template)
+    return _registry[name]
+
+def get(name):
+    return _registry[name]
+
+def registered():
+    """Alle Vorlagen nach Namen (z.B. für die Admin-Seite oder Tests)."""
+    return dict(_registry)
+
+# --- Allgemein ---------------------------------------------------------------------
+
+DELETE_ALL = register("delete_all.detach_delete", """
+    MATCH (n) DETACH DELETE n
+""")
+
+LABELS = register("labels.fetch_labels", """
+    MATCH (n)
+    WITH DISTINCT labels(n) AS lbls
+    UNWIND lbls AS lbl
+    RETURN DISTINCT lbl ORDER BY lbl
+""")
+
+DB_LABELS = register("search.labels", """
+    CALL db.labels() YIELD label RETURN label
+""")
+
+NODE_LABEL_SETS = register("overview.labels", """
+    MATCH (n) RETURN DISTINCT labels(n) AS labels
+""")
+
+RELATIONSHIP_TYPES = register("overview.relationship_types", """
+    MATCH ()-[r]->() RETURN DISTINCT type(r) AS relType
+""")
+
+REL_TYPES = register("get_rel_types.scan", """
+    MATCH ()-[r]->() RETURN DISTINCT type(r) AS type
+""")
+
+DB_RELATIONSHIP_TYPES = register("relationships.db_types", """
+    CALL db.relationshipTypes()
+""")
+
+RELATIONSHIP_TYPES_SCAN = register("relationships.scan", """
+    MATCH ()-[r]->()
+    RETURN DISTINCT type(r) AS rel_type
+""")
+
+PROPERTY_TYPES_APOC = register("properties.apoc_types", """
+    MATCH (n:{{label}})
+    UNWIND keys(n) AS key
+    RETURN DISTINCT key, apoc.meta.type(n[key]) AS type
+    ORDER BY key
+""")
+
+PROPERTY_SAMPLES = register("properties.sampled_types", """
+    MATCH (n:{{label}})
+    UNWIND keys(n) AS key
+    RETURN DISTINCT key, head(collect(n[key])) AS sample
+    ORDER BY key
+""")
+
+SEARCH_LABEL = register("search.label_scan", """
+    MATCH (n:{{label}})-[r]->(m)
+    WHERE ANY(prop IN keys(n) WHERE toLower(toString(n[prop])) CONTAINS $query)
+       OR ANY(prop IN keys(m) WHERE toLower(toString(m[prop])) CONTAINS $query)
+    RETURN n, type(r) AS rel, m
+    LIMIT 20
+""")
+
+DUMP_NODES = register("dump_database.nodes", """
+    MATCH (n)
+    RETURN id(n) AS id, labels(n) AS labels, properties(n) AS props
+""")
+
+DUMP_RELATIONSHIPS = register("dump_database.relationships", """
+    MATCH (a)-[r]->(b)
+    RETURN id(r) AS id, type(r) AS type,
+           id(a) AS start_id, id(b) AS end_id,
+           properties(r) AS props
+""")
+
+GRAPH_DATA = register("graph_data.all", """
+    MATCH (n)
+    OPTIONAL MATCH (n)-[r]->(m)
+    RETURN n, m, r, ID(n) AS n_id, ID(m) AS m_id, ID(r) AS r_id
+""")
+
+# --- Knoten und Beziehungen bearbeiten ------------------------------------------------
+
+UPDATE_NODE_PROPERTY = register("update_node.set_property", """
+    MATCH (n) WHERE id(n) = $node_id
+    SET n.{{property}} = $value
+    RETURN n
+""")
+
+UPDATE_NODES_PROPERTY = register("update_nodes.set_property", """
+    UNWIND $ids AS id
+    MATCH (n) WHERE id(n) = id
+    SET n.{{property}} = $value
+""")
+
+DELETE_NODE = register("delete_node.detach_delete", """
+    MATCH (n) WHERE id(n) = $node_id
+    DETACH DELETE n
+""")
+
+DELETE_NODES = register("delete_nodes.detach_delete", """
+    UNWIND $ids AS id
+    MATCH (n) WHERE id(n) = id
+    DETACH DELETE n
+""")
+
+CREATE_NODE_WITH_PROPERTY = register("create_node.create", """
+    CREATE (n:{{label}}) SET n.{{property}} = $value RETURN id(n) AS id
+""")
+
+CONNECT_NEW_NODE = register("create_node.connect", """
+    MATCH (from_node) WHERE id(from_node) = $from_id
+    MATCH (to_node) WHERE id(to_node) = $to_id
+
+    MERGE (from_node)-[rel:TYPE]->(to_node)
+
+    ON CREATE SET rel.type = CASE
+        WHEN 'Person' IN labels(from_node) AND 'Buch' IN labels(to_node) THEN 'HAT_GESCHRIEBEN'
+        WHEN 'Person' IN labels(from_node) AND 'Ort' IN labels(to_node) THEN 'WOHNT_IN'
+        ELSE 'CONNECTED_TO'
+    END
+    RETURN rel
+""")
+
+CREATE_NODE_WITH_PROPERTIES = register("add_row.create", """
+    CREATE (n:{{label}}) SET n += $props RETURN id(n) AS id
+""")
+
+CREATE_RELATIONSHIP = register("add_relationship.create", """
+    MATCH (a), (b)
+    WHERE id(a) = $start AND id(b) = $end
+    CREATE (a)-[r:{{rel_type}}]->(b)
+    SET r += $props
+    RETURN id(r) AS id
+""")
+
+ADD_COLUMN = register("add_column.set_default", """
+    MATCH (n:{{label}})
+    SET n.{{property}} = COALESCE(n.{{property}}, "")
+""")
+
+ADD_PROPERTY_WHERE_NULL = register("add_property_to_nodes.set_missing", """
+    MATCH (n:{{label}})
+    WHERE n.{{property}} IS NULL
+    SET n.{{property}} = $value
+    RETURN id(n) AS id
+""")
+
+# --- CSV-Import ---------------------------------------------------------------------
+
+IMPORT_MERGE_NODES = register("import.merge_nodes", """
+    UNWIND $rows AS row
+    MERGE (n:{{label}} { {{key}}: row.identifier_value })
+    ON CREATE SET n = row.all_props
+    RETURN row.i AS i, id(n) AS id
+""")
+
+IMPORT_MERGE_RELATIONSHIPS = register("import.merge_relationships", """
+    UNWIND $rows AS row
+    MATCH (a:{{from_label}}) WHERE id(a) = row.from_id
+    MATCH (b:{{to_label}}) WHERE id(b) = row.to_id
+    MERGE (a)-[:{{rel_type}}]->(b)
+""")
+
+# --- Beispieldaten ------------------------------------------------------------------
+
+SAMPLE_CREATE_PERSON = register("reset_and_load_data.create_person", """
+    CREATE (p:Person {vorname: $vorname, nachname: $nachname})
+    RETURN id(p) AS id
+""")
+
+SAMPLE_PERSON_LIVES_IN = register("reset_and_load_data.lives_in", """
+    MATCH (p:Person {vorname: $vorname, nachname: $nachname})
+    MATCH (o:Ort) WHERE id(o) = $ort_id
+    MERGE (p)-[:WOHNT_IN]->(o)
+""")
+
+SAMPLE_ORT_LOCATED_IN = register("reset_and_load_data.located_in", """
+    MATCH (o:Ort) WHERE id(o) = $ort_id
+    MATCH (s:Stadt {name: $stadt})
+    MERGE (o)-[:LIEGT_IN]->(s)
+""")
+
+SAMPLE_CREATE_ADDRESS = register("reset_and_load_data.create_address", """
+    CREATE (o:Ort {straße: $street, plz: $plz})
+    RETURN id(o) AS id
+""")
+
+SAMPLE_CREATE_BOOK = register("reset_and_load_data.create_book", """
+    CREATE (b:Buch {titel: $title, erscheinungsjahr: $year})
+    RETURN id(b) AS id
+""")
+
+SAMPLE_HAS_WRITTEN = register("reset_and_load_data.has_written", """
+    MATCH (p:Person {vorname: $vorname, nachname: $nachname})
+    MATCH (b:Buch {titel: $title})
+    MERGE (p)-[:HAT_GESCHRIEBEN]->(b)
+""")
+
+SAMPLE_CREATE_NODE = register("complex_data.create_node", """
+    CREATE (n:{{label}}) SET n = $props RETURN id(n) AS id
+""")
+
+SAMPLE_RELATE = register("complex_data.relate", """
+    MATCH (f) WHERE id(f) = $fid
+    MATCH (t:{{to_label}}) WHERE t.{{to_key}} = $to_value
+    MERGE (f)-[r:{{rel_type}}]->(t)
+""")
+
+SAMPLE_RELATE_WITH_ROLE = register("complex_data.relate_with_role", """
+    MATCH (f) WHERE id(f) = $fid
+    MATCH (t:{{to_label}}) WHERE t.{{to_key}} = $to_value
+    MERGE (f)-[r:{{rel_type}} {rolle: $rolle}]->(t)
+""")
+
+# --- Indexe -------------------------------------------------------------------------
+
+INDEX_LABELS = register("index_manager.labels", """
+    CALL db.labels()
+""")
+
+SHOW_INDEXES = register("index_manager.show_indexes", """
+    SHOW INDEXES
+""")
+
+LABEL_PROPERTY_KEYS = register("index_manager.property_keys", """
+    MATCH (n:{{label}}) UNWIND keys(n) AS k RETURN DISTINCT k AS prop
+""")
+
+CREATE_INDEX = register("index_manager.create_index", """
+    CREATE INDEX IF NOT EXISTS FOR (n:{{label}}) ON (n.{{property}})
+""")
+
+CREATE_UNIQUE_CONSTRAINT = register("index_manager.create_unique_constraint", """
+    CREATE CONSTRAINT IF NOT EXISTS FOR (n:{{label}}) REQUIRE n.{{property}} IS UNIQUE
+""")
@@ -317,15 +317,16 @@ function checkRelationshipCount(nodes, relationships) {
 
 function sendMapping(mapping) {
 	console.log("sendMapping gestartet, Mapping:", mapping);
-	fetch('/save_mapping', {
+	fetch('/api/import_jobs', {
 		method: 'POST',
 		headers: { 'Content-Type': 'application/json' },
 		body: JSON.stringify(mapping)
 	}).then(response => response.json())
 		.then(data => {
 			console.log("Antwort vom Server:", data);
-			if (data.status === 'success') {
-				open_link("/overview");
+			if (data.status === 'queued') {
+				showImportProgress({ state: 'queued', rowsProcessed: 0 });
+				pollImportJob(data.statusUrl);
 			} else {
 				error(data.message);
 			}
@@ -333,3 +334,49 @@ function sendMapping(mapping) {
 			console.error("Fehler beim Speichern des Mappings:", err);
 		});
 }
+
+function pollImportJob(statusUrl) {
+	fetch(statusUrl)
+		.then(response => response.json())
+		.then(job => {
+			if (job.status === 'error') {
+				error(job.message);
+				return;
+			}
+			showImportProgress(job);
+			if (job.state === 'done') {
+				success(`${job.rowsProcessed} Zeilen importiert (${job.rowsPerSecond ?? '-'} Zeilen/s)`);
+				open_link("/overview");
+			} else if (job.state === 'failed') {
+				error("Import fehlgeschlagen: " + job.errors.join("\n"));
+			} else {
+				setTimeout(() => pollImportJob(statusUrl), 1000);
+			}
+		}).catch(err => {
+			console.error("Fehler beim Abfragen des Import-Status:", err);
+			setTimeout(() => pollImportJob(statusUrl), 3000);
+		});
+}
+
+function showImportProgress(job) {
+	const container = document.getElementById('importProgress');
+	const bar = document.getElementById('importProgressBar');
+	const text = document.getElementById('importProgressText');
+	if (!container) return;
+
+	container.style.display = 'block';
+	if (job.rowsTotal) {
+		bar.max = job.rowsTotal;
+		bar.value = job.rowsProcessed;
+	} else {
+		bar.removeAttribute('value');
+	}
+
+	let msg = `${job.rowsProcessed} / ${job.rowsTotal ?? '?'} Zeilen`;
+	if (job.rowsPerSecond) msg += `, ${job.rowsPerSecond} Zeilen/s`;
+	if (job.etaSeconds !== null && job.etaSeconds !== undefined) msg += `, noch ca. ${Math.ceil(job.etaSeconds)} s`;
+	if (job.phase === 'relationships') msg = `${job.rowsProcessed} Zeilen gelesen, Beziehungen werden angelegt (${job.relationships})...`;
+	if (job.phase === 'indexes') msg = 'Indexe für die Merge-Schlüssel werden angelegt...';
+	if (job.state === 'queued') msg = 'Import wartet auf einen freien Worker...';
+	text.textContent = msg;
+}
@@ -1,5 +1,11 @@
 "use strict";
 
+// Anzahl Hauptknoten pro Seite; weitere Seiten werden bei Bedarf nachgeladen
+var TABLE_PAGE_SIZE = 100;
+
+// bereits geladene Seiten der aktuellen Abfrage
+var tableState = { params: null, columns: [], rows: [], nextCursor: null, loading: false };
+
 // === Fetch-Daten + URL-State ===
 function fetchData(updateUrl = true) {
 	var sel = document.getElementById('querySelection');
@@ -41,20 +47,158 @@ function fetchData(updateUrl = true) {
 		history.replaceState(null, '', newUrl); // ersetzt aktuelle URL ohne Reload
 	}
 
+	tableState = { params: params, columns: [], rows: [], nextCursor: null, loading: false };
+
+	fetchPage(null);
+}
+
+function fetchPage(after) {
+	if (tableState.loading) {
+		return;
+	}
+
+	var apiParams = new URLSearchParams(tableState.params.toString());
+	apiParams.set('pageSize', TABLE_PAGE_SIZE);
+	apiParams.set('format', 'compact');
+	if (after !== null && after !== undefined) {
+		apiParams.set('after', after);
+	}
+
 	// API-Call
-	var url = '/api/get_data_as_table?' + params.toString();
+	var url = '/api/get_data_as_table?' + apiParams.toString();
+	var state = tableState;
+	state.loading = true;
 
 	fetch(url, {
 		method: 'GET',
 		headers: { 'Accept': 'application/json' }
 	})
 		.then(handleFetchResponse)
-		.then(handleServerData)
+		.then(function (data) {
+			state.loading = false;
+			if (state !== tableState) {
+				return; // inzwischen wurde eine neue Abfrage gestartet
+			}
+			handleServerData(data);
+		})
 		.catch(function (err) {
+			state.loading = false;
 			error('Fehler beim Laden: ' + (err.message || err));
 		});
 }
 
+function fetchNextPage() {
+	if (tableState.nextCursor === null || tableState.nextCursor === undefined) {
+		return;
+	}
+	fetchPage(tableState.nextCursor);
+}
+
+// Spalten einer neuen Seite mit den bisherigen zusammenführen (gleiche Sortierung wie der Server)
+function mergeColumns(oldCols, newCols) {
+	var seen = {};
+	var merged = [];
+
+	oldCols.concat(newCols).forEach(function (col) {
+		var key = col.nodeType + '\u0000' + col.property;
+		if (!seen[key]) {
+			seen[key] = true;
+			merged.push(col);
+		}
+	});
+
+	merged.sort(function (a, b) {
+		if (a.nodeType !== b.nodeType) {
+			return a.nodeType < b.nodeType ? -1 : 1;
+		}
+		var pa = String(a.property), pb = String(b.property);
+		return pa < pb ? -1 : (pa > pb ? 1 : 0);
+	});
+
+	return merged;
+}
+
+// Zellen einer Zeile auf eine neue Spaltenliste umsortieren
+function realignRow(row, fromCols, toCols) {
+	var cellsByKey = {};
+	var nodeIdByType = {};
+
+	fromCols.forEach(function (col, i) {
+		var cell = (row.cells || [])[i];
+		if (!cell) {
+			return;
+		}
+		cellsByKey[col.nodeType + '\u0000' + col.property] = cell;
+		if (cell.nodeId !== null && cell.nodeId !== undefined) {
+			nodeIdByType[col.nodeType] = cell.nodeId;
+		}
+	});
+
+	var cells = toCols.map(function (col) {
+		var cell = cellsByKey[col.nodeType + '\u0000' + col.property];
+		if (cell) {
+			return cell;
+		}
+		var nodeId = nodeIdByType.hasOwnProperty(col.nodeType) ? nodeIdByType[col.nodeType] : null;
+		return { value: null, nodeId: nodeId, nodeType: col.nodeType };
+	});
+
+	return { cells: cells, relations: row.relations };
+}
+
+// Kompaktes Format (format=compact) wieder in Zeilen mit cells/relations umwandeln
+function expandCompactTable(data) {
+	var cols = data.columns || [];
+	var nodes = data.nodes || {};
+	var typeIndex = {};
+
+	(data.nodeTypes || []).forEach(function (nodeType, i) {
+		typeIndex[nodeType] = i;
+	});
+
+	var relationSets = (data.relationSets || []).map(function (indexes) {
+		return indexes.map(function (k) {
+			var rel = data.relations[k];
+			return { fromId: rel[0], toId: rel[1], relation: rel[2] };
+		});
+	});
+
+	var rows = (data.rows || []).map(function (nodeIds, r) {
+		var cells = cols.map(function (col) {
+			var nodeId = nodeIds[typeIndex[col.nodeType]];
+			if (nodeId === null || nodeId === undefined) {
+				return { value: null, nodeId: null, nodeType: col.nodeType };
+			}
+			var props = nodes[nodeId] || {};
+			var value = props.hasOwnProperty(col.property) ? props[col.property] : null;
+			return { value: value, nodeId: nodeId, nodeType: col.nodeType };
+		});
+		return { cells: cells, relations: relationSets[data.rowRelationSets[r]] || [] };
+	});
+
+	return { columns: cols, rows: rows, nextCursor: data.nextCursor };
+}
+
+function appendPage(data) {
+	var newCols = data.columns || [];
+	var columns = mergeColumns(tableState.columns, newCols);
+
+	var oldCols = tableState.columns;
+	var rows = tableState.rows.map(function (row) {
+		return realignRow(row, oldCols, columns);
+	});
+
+	(data.rows || []).forEach(function (row) {
+		rows.push(realignRow(row, newCols, columns));
+	});
+
+	tableState.columns = columns;
+	tableState.rows = rows;
+	tableState.nextCursor = data.nextCursor;
+
+	return { columns: columns, rows: rows, nextCursor: data.nextCursor };
+}
+
 // ----------------- Table Rendering -----------------
 
 function renderTable(data) {
@@ -76,6 +220,19 @@ function renderTable(data) {
 	table.appendChild(makeTableBody(cols, rows));
 
 	container.appendChild(table);
+
+	if (data.nextCursor !== null && data.nextCursor !== undefined) {
+		container.appendChild(makeLoadMoreButton());
+	}
+}
+
+function makeLoadMoreButton() {
+	var btn = document.createElement('button');
+	btn.type = 'button';
+	btn.className = 'load-more-btn';
+	btn.textContent = 'Weitere laden';
+	btn.addEventListener('click', fetchNextPage);
+	return btn;
 }
 
 function makeTableBody(cols, rows) {
@@ -167,8 +324,14 @@ function handleServerData(data) {
 		return;
 	}
 
-	collectGlobalRelations(data);
-	renderTable(data);
+	if (data && data.format === 'compact') {
+		data = expandCompactTable(data);
+	}
+
+	var table = appendPage(data);
+
+	collectGlobalRelations(table);
+	renderTable(table);
 }
 
 function collectGlobalRelations(data) {
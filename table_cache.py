@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Wird bei jedem Schreibzugriff auf den Graphen erhöht. Gecachte Tabellen merken sich die
+# Generation, mit der sie berechnet wurden, und gelten danach als veraltet.
+_write_generation = 0
+_generation_lock = threading.Lock()
+
+def get_write_generation():
+    return _write_generation
+
+def bump_write_generation():
+    """Von allen schreibenden Endpunkten nach einer Änderung am Graphen aufzurufen."""
+    global _write_generation
+    with _generation_lock:
+        _write_generation += 1
+    table_cache.invalidate()
+
+class TableCache:
+    """
+    LRU-Cache für fertig serialisierte Antworten von /api/get_data_as_table.
+    Die Größe ist über ein Byte-Budget begrenzt (Summe der Antwortlängen), bei Überschreitung
+    werden die am längsten nicht benutzten Einträge verdrängt. max_bytes = 0 schaltet den Cache ab.
+    """
+
+    def __init__(self, max_bytes=0, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (body, stored_at)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            body, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        size = len(body)
+        if size > self.max_bytes:
+            return  # passt nie ins Budget
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, time.monotonic())
+            self._size += size
+
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.invalidations += 1
+
+    def _remove(self, key):
+        body, _ = self._entries.pop(key)
+        self._size -= len(body)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "maxBytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "writeGeneration": get_write_generation(),
+            }
+
+# Budget in MB über OASIS_TABLE_CACHE_MB, standardmäßig aus
+table_cache = TableCache(
+    max_bytes=int(float(os.getenv("OASIS_TABLE_CACHE_MB", "0")) * 1024 * 1024),
+    ttl=float(os.getenv("OASIS_TABLE_CACHE_TTL", "0")) or None
+)
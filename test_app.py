@@ -11,9 +11,13 @@ from py2neo import Graph, Node, Relationship, Subgraph
 from dotenv import load_dotenv
 from app import get_all_nodes_and_relationships, app, graph
 from oasis_helper import load_or_generate_secret_key
+from upload_spool import upload_spool
 
 warnings.filterwarnings("ignore", category=ResourceWarning)
 
+# GRAPH_BACKEND=memory: die Tests laufen gegen den In-Memory-Graphen der App statt gegen Neo4j
+MEMORY_BACKEND = getattr(graph, "backend", None) == "memory"
+
 # Lade Umgebungsvariablen aus der .env.test-Datei für die Tests
 load_dotenv('.env.test')
 
@@ -51,6 +55,10 @@ class TestNeo4jApp(unittest.TestCase):
         Wird einmal vor allen Tests ausgeführt.
         Stellt die Verbindung zur Testdatenbank her.
         """
+        if MEMORY_BACKEND:
+            cls.graph = graph
+            return
+
         cls.graph = None
         try:
             for attempt in range(15):  # max 15 Versuche
@@ -107,7 +115,8 @@ class TestNeo4jApp(unittest.TestCase):
             with client.session_transaction() as sess:
                 self.assertIn('headers', sess)
                 self.assertEqual(sess['headers'], ['id', 'name', 'city', 'country'])
-                self.assertIn('raw_data', sess)
+                self.assertIn('upload_id', sess)
+                self.assertNotIn('raw_data', sess)
 
     def test_upload_no_data(self):
         """Testet den Upload ohne Daten."""
@@ -647,7 +656,8 @@ class TestNeo4jApp(unittest.TestCase):
         response = self.app.post('/upload', data={'data': large_csv}, content_type='multipart/form-data')
         self.assertEqual(response.status_code, 200)
         with self.app.session_transaction() as sess:
-            self.assertEqual(len(sess['raw_data'].splitlines()), 200)  # inkl. Header
+            with upload_spool.open(sess['upload_id']) as f:
+                self.assertEqual(len(f.read().splitlines()), 200)  # inkl. Header
 
     def test_upload_csv_with_missing_and_extra_columns(self):
         """CSV enthält fehlende Werte und zusätzliche Spalten."""
@@ -3935,6 +3945,23 @@ class TestNeo4jApp(unittest.TestCase):
             )
             self.assertTrue(found)
 
+    def test_get_data_as_table_max_depth_counts_both_sides_of_anchor(self):
+        """maxDepth begrenzt die Länge des ganzen Pfads, vor und hinter dem Hauptknoten zusammen."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("""
+            CREATE (:Kunde {nummer:'K1'})-[:KENNT]->(:Person {name:'Anna'})-[:WOHNT_IN]->(:Stadt {name:'Berlin'})-[:LIEGT_IN]->(:Land {name:'Deutschland'})
+        """)
+
+        def anna_row(max_depth):
+            resp = self.app.get('/api/get_data_as_table', query_string={'nodes': 'Person,Kunde,Stadt,Land', 'maxDepth': max_depth})
+            self.assertEqual(resp.status_code, 200)
+            rows = [{cell.get('value') for cell in row['cells']} for row in resp.get_json()['rows']]
+            return next(values for values in rows if 'Anna' in values)
+
+        self.assertTrue({'K1', 'Berlin'} <= anna_row(1))
+        self.assertNotIn('Deutschland', anna_row(1))
+        self.assertTrue({'K1', 'Berlin', 'Deutschland'} <= anna_row(2))
+
 
     def test_get_data_as_table_multiple_orders_for_one_customer(self):
         """Customer with multiple orders and shipments should produce multiple rows, not merged silently."""
@@ -4076,6 +4103,1085 @@ class TestNeo4jApp(unittest.TestCase):
                 )
                 self.assertTrue(found, f"Row for {e['person']['vorname']} / {e['kunde']['email']} missing")
 
+    def test_get_data_as_table_attach_is_batched_per_label(self):
+        """Fehlende Labels werden pro Label mit einer UNWIND-Abfrage nachgeladen, nicht pro Bucket."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        for i in range(3):
+            self.graph.run("""
+                CREATE (p:Person {name:$name})
+                CREATE (b:Bestellung {nr:$nr})
+                CREATE (l:Lieferung {tracking:$tracking})
+                CREATE (p)-[:HAT_BESTELLT]->(b)
+                CREATE (l)-[:BEINHALTET]->(b)
+            """, name=f"P{i}", nr=str(i), tracking=f"T{i}")
+
+        with self.app as client:
+            resp = client.get('/api/get_data_as_table', query_string={
+                'nodes': 'Person,Bestellung,Lieferung',
+                'debug': '1'
+            })
+            self.assertEqual(resp.status_code, 200)
+            data = resp.get_json()
+
+            self.assertEqual(len(data['rows']), 3)
+            attach = data['debug']['attach']
+            self.assertEqual(attach['roundTripsBefore'], 3)
+            self.assertEqual(attach['roundTripsAfter'], 1)
+
+            col_list = data['columns']
+            for row in data['rows']:
+                values = {(col_list[i]['nodeType'], col_list[i]['property']): row['cells'][i]['value']
+                          for i in range(len(col_list))}
+                self.assertEqual(values[('Person', 'name')][1:], values[('Lieferung', 'tracking')][1:])
+
+    def test_get_data_as_table_attach_only_skips_neo4j_errors(self):
+        """Lehnt Neo4j das Nachladen ab, fehlt nur das Label; andere Fehler beim Nachladen ergeben einen 500."""
+        from flask import Flask
+        from py2neo.errors import Neo4jError
+        from api.get_data_as_table import create_get_data_bp
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("CREATE (:Person {name:'P0'})-[:HAT_BESTELLT]->(:Bestellung {nr:'0'})<-[:BEINHALTET]-(:Lieferung {tracking:'T0'})")
+
+        class FailingAttach:
+            def __init__(self, graph, error):
+                self.graph = graph
+                self.error = error
+
+            def run(self, cypher, parameters=None):
+                if "UNWIND $mids" in cypher:
+                    raise self.error
+                return self.graph.run(cypher, parameters)
+
+        def get_table(error):
+            test_app = Flask(__name__)
+            test_app.config["DISABLE_LOGIN"] = True
+            test_app.register_blueprint(create_get_data_bp(FailingAttach(self.graph, error)), url_prefix='/api')
+            return test_app.test_client().get('/api/get_data_as_table', query_string={'nodes': 'Person,Lieferung'})
+
+        resp = get_table(Neo4jError("abgelehnt", "Neo.ClientError.Statement.SyntaxError"))
+        self.assertEqual(resp.status_code, 200)
+        person_row = next(row for row in resp.get_json()["rows"] if any(c["value"] == "P0" for c in row["cells"]))
+        self.assertNotIn("T0", [c["value"] for c in person_row["cells"]])
+        self.assertEqual(get_table(TypeError("falsche Signatur")).status_code, 500)
+
+    def test_get_data_as_table_no_debug_field_by_default(self):
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("CREATE (:Person {name:'Alice'})")
+        with self.app as client:
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person'})
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotIn('debug', resp.get_json())
+
+    def test_get_data_as_table_keyset_pagination(self):
+        """after/pageSize blättert über die ids des Hauptlabels und liefert einen nextCursor."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        for i in range(5):
+            self.graph.run("""
+                CREATE (p:Person {name:$name})
+                CREATE (s:Stadt {stadt:$stadt})
+                CREATE (p)-[:WOHNT_IN]->(s)
+            """, name=f"P{i}", stadt=f"S{i}")
+
+        names = []
+        cursor = None
+        pages = 0
+        with self.app as client:
+            while True:
+                query = {'nodes': 'Person,Stadt', 'pageSize': '2'}
+                if cursor is not None:
+                    query['after'] = str(cursor)
+                resp = client.get('/api/get_data_as_table', query_string=query)
+                self.assertEqual(resp.status_code, 200)
+                data = resp.get_json()
+                self.assertIn('nextCursor', data)
+                self.assertLessEqual(len(data['rows']), 2)
+                pages += 1
+
+                col_list = data['columns']
+                for row in data['rows']:
+                    values = {(col_list[i]['nodeType'], col_list[i]['property']): row['cells'][i]['value']
+                              for i in range(len(col_list))}
+                    names.append(values[('Person', 'name')])
+                    self.assertEqual(values[('Person', 'name')][1:], values[('Stadt', 'stadt')][1:])
+
+                cursor = data['nextCursor']
+                if cursor is None:
+                    break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(names), [f"P{i}" for i in range(5)])
+
+    def test_get_data_as_table_pagination_without_paths(self):
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        for i in range(3):
+            self.graph.run("CREATE (:Person {name:$name})", name=f"P{i}")
+
+        with self.app as client:
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person', 'pageSize': '2'})
+            data = resp.get_json()
+            self.assertEqual(len(data['rows']), 2)
+            self.assertIsNotNone(data['nextCursor'])
+
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person', 'pageSize': '2', 'after': str(data['nextCursor'])})
+            data = resp.get_json()
+            self.assertEqual(len(data['rows']), 1)
+            self.assertIsNone(data['nextCursor'])
+
+    def test_get_data_as_table_invalid_page_size(self):
+        with self.app as client:
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person', 'pageSize': '0'})
+            self.assertEqual(resp.status_code, 500)
+            self.assertIn(b"pageSize", resp.data)
+
+    def test_get_data_as_table_ndjson_stream(self):
+        """format=ndjson streamt zuerst die Spalten und danach eine Zeile pro Tabellenzeile."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("""
+            CREATE (p1:Person {name:'Alice'})
+            CREATE (p2:Person {name:'Bob'})
+            CREATE (s:Stadt {stadt:'Berlin'})
+            CREATE (p1)-[:WOHNT_IN]->(s)
+            CREATE (p2)-[:WOHNT_IN]->(s)
+        """)
+        with self.app as client:
+            json_resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person,Stadt'})
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person,Stadt', 'format': 'ndjson'})
+            self.assertEqual(resp.status_code, 200)
+            self.assertTrue(resp.content_type.startswith('application/x-ndjson'))
+
+            lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines() if line.strip()]
+            expected = json_resp.get_json()
+            self.assertEqual(lines[0], {"columns": expected['columns']})
+            self.assertEqual(lines[1:], expected['rows'])
+
+    def test_get_data_as_table_invalid_format(self):
+        with self.app as client:
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person', 'format': 'xml'})
+            self.assertEqual(resp.status_code, 500)
+            self.assertIn(b"format", resp.data)
+
+    def test_get_data_as_table_qb_values_are_parameters(self):
+        """Unterschiedliche Suchwerte dürfen keine neuen Statement-Formen erzeugen."""
+        self._prepare_book_test_data()
+        with self.app as client:
+            before = client.get('/api/get_data_as_table/statement_stats').get_json()
+            for year in ("1808", "1784", "1925"):
+                _, data = self._run_querybuilder_request(client, "equal", "Buch.erscheinungsjahr", year)
+                values = [c.get("value") for r in data["rows"] for c in r["cells"]]
+                self.assertIn(year, values)
+            after = client.get('/api/get_data_as_table/statement_stats').get_json()
+
+        self.assertEqual(after["executions"] - before["executions"], 3)
+        self.assertLessEqual(after["shapes"] - before["shapes"], 1)
+
+    def test_get_data_as_table_statement_stats_are_bounded(self):
+        """Labels aus dem Request erzeugen beliebig viele Statement-Texte, gezählt werden höchstens MAX_STATEMENT_SHAPES."""
+        with self.app as client, patch("api.get_data_as_table.MAX_STATEMENT_SHAPES", 3):
+            for i in range(10):
+                client.get('/api/get_data_as_table', query_string={'nodes': f'Unbekannt{i}'})
+            stats = client.get('/api/get_data_as_table/statement_stats').get_json()
+        self.assertLessEqual(stats["shapes"], 3)
+        self.assertGreater(stats["resets"], 0)
+
+    def test_get_data_as_table_qb_value_with_quote(self):
+        """Werte mit Anführungszeichen werden als Parameter übergeben und brechen die Abfrage nicht."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("CREATE (:Person {name:$name})", name="O'Brien")
+        with self.app as client:
+            qb = {"condition": "AND", "valid": True, "rules": [
+                {"id": "Person.name", "field": "Person.name", "operator": "equal", "value": "O'Brien"}
+            ]}
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person', 'qb': json.dumps(qb)})
+            self.assertEqual(resp.status_code, 200)
+            values = [c.get("value") for r in resp.get_json()["rows"] for c in r["cells"]]
+            self.assertIn("O'Brien", values)
+
+    def test_get_data_as_table_anchor_filter_on_main_label(self):
+        """Regeln auf dem Hauptlabel werden am Anker geprüft, Regeln auf anderen Labels weiter im Pfad."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("""
+            CREATE (a:Person {name:'Anna'})-[:WOHNT_IN]->(:Stadt {stadt:'Berlin'}),
+                   (b:Person {name:'Bernd'})-[:WOHNT_IN]->(:Stadt {stadt:'Hamburg'})
+        """)
+        with self.app as client:
+            qb = {"condition": "AND", "valid": True, "rules": [
+                {"id": "Person.name", "field": "Person.name", "operator": "equal", "value": "Anna"},
+                {"id": "Stadt.stadt", "field": "Stadt.stadt", "operator": "equal", "value": "Berlin"}
+            ]}
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person,Stadt', 'qb': json.dumps(qb)})
+            self.assertEqual(resp.status_code, 200)
+            rows = resp.get_json()["rows"]
+            self.assertEqual(len(rows), 1)
+            values = [c.get("value") for c in rows[0]["cells"]]
+            self.assertIn("Anna", values)
+            self.assertIn("Berlin", values)
+
+            qb["rules"][1]["value"] = "Hamburg"
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person,Stadt', 'qb': json.dumps(qb)})
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.get_json()["rows"], [])
+
+    def test_get_data_as_table_compact_format(self):
+        """format=compact enthält dieselben Daten wie das normale Format, jeder Knoten nur einmal."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("""
+            CREATE (p:Person {name:'Anna'}),
+                   (p)-[:HAT]->(:Bestellung {nr:1})-[:VERSENDET_ALS]->(:Shipment {code:'A'}),
+                   (p)-[:HAT]->(:Bestellung {nr:2})-[:VERSENDET_ALS]->(:Shipment {code:'B'})
+        """)
+        with self.app as client:
+            query = {'nodes': 'Person,Bestellung,Shipment'}
+            full = client.get('/api/get_data_as_table', query_string=query).get_json()
+            resp = client.get('/api/get_data_as_table', query_string={**query, 'format': 'compact'})
+            self.assertEqual(resp.status_code, 200)
+            compact = resp.get_json()
+
+            self.assertEqual(compact["format"], "compact")
+            self.assertEqual(compact["columns"], full["columns"])
+            self.assertEqual(len(compact["rows"]), len(full["rows"]))
+            self.assertEqual(len(compact["nodes"]), 5)
+
+            for ids, set_index, row in zip(compact["rows"], compact["rowRelationSets"], full["rows"]):
+                for col, cell in zip(compact["columns"], row["cells"]):
+                    node_id = ids[compact["nodeTypes"].index(col["nodeType"])]
+                    self.assertEqual(node_id, cell["nodeId"])
+                    self.assertEqual(compact["nodes"][str(node_id)].get(col["property"]), cell["value"])
+                relations = [
+                    dict(zip(["fromId", "toId", "relation"], compact["relations"][k]))
+                    for k in compact["relationSets"][set_index]
+                ]
+                self.assertEqual(relations, row["relations"])
+
+    def test_get_data_as_table_cache_invalidated_by_writes(self):
+        """Wiederholte Abfragen kommen aus dem Cache, ein Schreibzugriff macht sie ungültig."""
+        from table_cache import table_cache
+
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        node_id = self.graph.run("CREATE (n:Person {name:'Anna'}) RETURN id(n) AS id").data()[0]["id"]
+
+        old_max_bytes = table_cache.max_bytes
+        table_cache.max_bytes = 1024 * 1024
+        table_cache.invalidate()
+        try:
+            with self.app as client:
+                first = client.get('/api/get_data_as_table', query_string={'nodes': 'Person'})
+                hits_before = table_cache.hits
+                second = client.get('/api/get_data_as_table', query_string={'nodes': 'Person'})
+                self.assertEqual(second.get_json(), first.get_json())
+                self.assertEqual(table_cache.hits, hits_before + 1)
+
+                resp = client.put(f'/api/update_node/{node_id}', json={'property': 'name', 'value': 'Berta'})
+                self.assertEqual(resp.status_code, 200)
+
+                third = client.get('/api/get_data_as_table', query_string={'nodes': 'Person'})
+                values = [c.get("value") for r in third.get_json()["rows"] for c in r["cells"]]
+                self.assertIn("Berta", values)
+                self.assertNotIn("Anna", values)
+        finally:
+            table_cache.max_bytes = old_max_bytes
+            table_cache.invalidate()
+
+    def test_get_data_as_table_order_by_with_pagination(self):
+        """orderBy auf dem Hauptlabel wird beim Blättern in Cypher sortiert, der Cursor enthält Wert und id."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("""
+            UNWIND ['Dora', 'Anna', 'Cara', 'Bert', 'Emil'] AS name
+            CREATE (:Person {name:name})-[:WOHNT_IN]->(:Stadt {stadt:'Berlin'})
+        """)
+        with self.app as client:
+            names = []
+            after = None
+            for _ in range(5):
+                query = {'nodes': 'Person,Stadt', 'orderBy': 'Person.name:desc', 'pageSize': 2}
+                if after:
+                    query['after'] = after
+                resp = client.get('/api/get_data_as_table', query_string=query)
+                self.assertEqual(resp.status_code, 200)
+                data = resp.get_json()
+                col = data["columns"].index({"nodeType": "Person", "property": "name"})
+                names += [row["cells"][col]["value"] for row in data["rows"]]
+                after = data["nextCursor"]
+                if after is None:
+                    break
+            self.assertEqual(names, ['Emil', 'Dora', 'Cara', 'Bert', 'Anna'])
+
+    def test_get_data_as_table_pagination_keeps_unconnected_labels(self):
+        """Labels ohne Verbindung zum Hauptlabel stehen wie ohne Pagination auf der ersten Seite, aber nur dort."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("""
+            UNWIND ['Anna', 'Bert', 'Cara'] AS name
+            CREATE (:Person {name:name})-[:WOHNT_IN]->(:Stadt {stadt:'Berlin'})
+        """)
+        self.graph.run("CREATE (:Buch {titel:'Faust'})")
+
+        def titles(data):
+            col = data["columns"].index({"nodeType": "Buch", "property": "titel"})
+            return [row["cells"][col]["value"] for row in data["rows"] if row["cells"][col]["value"] is not None]
+
+        with self.app as client:
+            unpaged = client.get('/api/get_data_as_table', query_string={'nodes': 'Person,Stadt,Buch'}).get_json()
+            first = client.get('/api/get_data_as_table', query_string={'nodes': 'Person,Stadt,Buch', 'pageSize': 2}).get_json()
+            second = client.get('/api/get_data_as_table', query_string={'nodes': 'Person,Stadt,Buch', 'pageSize': 2, 'after': first["nextCursor"]}).get_json()
+        self.assertEqual(titles(unpaged), ['Faust'])
+        self.assertEqual(titles(first), ['Faust'])
+        self.assertNotIn({"nodeType": "Buch", "property": "titel"}, second["columns"])
+
+    def test_get_data_as_table_cursor_keeps_value_types(self):
+        """Der nextCursor markiert Datumswerte, beim nächsten Request haben sie wieder ihren Typ."""
+        from interchange.time import Date, DateTime
+        from api.get_data_as_table import encode_cursor_value, decode_cursor_value
+        for value in (Date(2024, 1, 31), DateTime(2024, 1, 31, 12, 30, 5), "2024-01-31", 3, 2.5, None, [Date(2024, 2, 1), "x"]):
+            cursor = json.dumps([encode_cursor_value(value), 7])
+            decoded = decode_cursor_value(json.loads(cursor)[0])
+            self.assertEqual(decoded, value)
+            self.assertIs(type(decoded), type(value))
+
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("""
+            UNWIND [['Anna', date('2024-03-01')], ['Bert', date('2024-01-15')], ['Cara', date('2024-02-10')]] AS p
+            CREATE (:Person {name:p[0], seit:p[1]})-[:WOHNT_IN]->(:Stadt {stadt:'Berlin'})
+        """)
+        # die Keyset-Bedingung vergleicht Datum mit Datum, mit dem String gäbe es keinen Treffer
+        after_value = decode_cursor_value(json.loads(json.dumps(encode_cursor_value(Date(2024, 1, 15)))))
+        self.assertEqual(self.graph.evaluate("MATCH (p:Person) WHERE p.seit > $after_value RETURN count(p)", after_value=after_value), 2)
+
+    def test_get_data_as_table_group_by_aggregates(self):
+        """groupBy/agg liefern nur die Gruppen, mit und ohne Aggregation in Cypher."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("""
+            CREATE (:Person {name:'Anna', alter:20})-[:WOHNT_IN]->(b:Stadt {stadt:'Berlin'}),
+                   (:Person {name:'Bert', alter:40})-[:WOHNT_IN]->(b),
+                   (:Person {name:'Cara', alter:30})-[:WOHNT_IN]->(:Stadt {stadt:'Hamburg'})
+        """)
+        with self.app as client:
+            resp = client.get('/api/get_data_as_table', query_string={
+                'nodes': 'Person,Stadt', 'groupBy': 'Stadt.stadt', 'agg': 'count,sum:Person.alter,max:Person.name'
+            })
+            self.assertEqual(resp.status_code, 200)
+            groups = resp.get_json()["groups"]
+            self.assertEqual(groups, [
+                {"key": ["Berlin"], "values": [2, 60.0, "Bert"]},
+                {"key": ["Hamburg"], "values": [1, 30.0, "Cara"]},
+            ])
+
+            resp = client.get('/api/get_data_as_table', query_string={
+                'nodes': 'Person', 'agg': 'count,min:Person.alter', 'debug': '1'
+            })
+            self.assertEqual(resp.status_code, 200)
+            data = resp.get_json()
+            self.assertTrue(data["debug"]["aggregatePushdown"])
+            self.assertEqual(data["groups"], [{"key": [], "values": [3, 20]}])
+
+    def test_table_assembler_deduplicates_relations(self):
+        """Relationen, die in mehreren Pfaden vorkommen, stehen nur einmal im Bucket."""
+        from api.table_assembler import extract_nodes_from_paths, extract_table_columns, assemble_table_rows
+
+        person = {"id": 1, "labels": ["Person"], "props": {"name": "Anna"}}
+        stadt = {"id": 2, "labels": ["Stadt"], "props": {"stadt": "Berlin"}}
+        land = {"id": 3, "labels": ["Land"], "props": {"land": "DE"}}
+        wohnt_in = {"fromId": 1, "toId": 2, "type": "WOHNT_IN"}
+        paths = [
+            {"anchor": 1, "nodes": [person, stadt], "rels": [wohnt_in]},
+            {"anchor": 1, "nodes": [person, stadt, land], "rels": [wohnt_in, {"fromId": 2, "toId": 3, "type": "LIEGT_IN"}]},
+        ]
+
+        buckets = extract_nodes_from_paths(paths, "Person", ["Person", "Stadt", "Land"])
+        self.assertEqual(len(buckets[1].relations), 2)
+
+        columns = extract_table_columns(buckets)
+        rows = assemble_table_rows(buckets, columns)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["relations"], [
+            {"fromId": 1, "toId": 2, "relation": "WOHNT_IN"},
+            {"fromId": 2, "toId": 3, "relation": "LIEGT_IN"},
+        ])
+        self.assertEqual([c["value"] for c in rows[0]["cells"]], ["DE", "Anna", "Berlin"])
+
+    def test_table_assembler_dense_engine_matches_python(self):
+        """Der NumPy-Weg für große Buckets liefert dieselben Zeilen wie die Python-Sets."""
+        import api.table_assembler as table_assembler
+
+        person = {"id": 1, "labels": ["Person"], "props": {"name": "Anna"}}
+        paths = []
+        for i in range(3):
+            bestellung = {"id": 10 + i, "labels": ["Bestellung"], "props": {"nr": i}}
+            shipment = {"id": 20 + i, "labels": ["Shipment"], "props": {"code": f"S{i}"}}
+            paths.append({"anchor": 1, "nodes": [person, bestellung, shipment], "rels": [
+                {"fromId": 1, "toId": 10 + i, "type": "HAT"},
+                {"fromId": 10 + i, "toId": 20 + i, "type": "VERSENDET_ALS"},
+            ]})
+
+        old_min_nodes = table_assembler.DENSE_MIN_NODES
+        results = []
+        try:
+            for min_nodes in (-1, 0):
+                table_assembler.DENSE_MIN_NODES = min_nodes
+                buckets = table_assembler.extract_nodes_from_paths(paths, "Person", ["Person", "Bestellung", "Shipment"])
+                columns = table_assembler.extract_table_columns(buckets)
+                results.append(table_assembler.assemble_table_rows(buckets, columns))
+        finally:
+            table_assembler.DENSE_MIN_NODES = old_min_nodes
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(results[0]), 3)
+        self.assertEqual([[c["nodeId"] for c in row["cells"]] for row in results[0]], [[10, 1, 20], [11, 1, 21], [12, 1, 22]])
+
+    def test_table_assembler_wide_bucket_falls_back_to_sets(self):
+        """Über DENSE_MAX_CELLS wird kein DenseBucket gebaut, die Zeilen bleiben dieselben."""
+        import api.table_assembler as table_assembler
+
+        person = {"id": 1, "labels": ["Person"], "props": {"name": "Anna"}}
+        paths = [
+            {"anchor": 1, "nodes": [person, {"id": 10 + i, "labels": ["Bestellung"], "props": {"nr": i}}],
+             "rels": [{"fromId": 1, "toId": 10 + i, "type": "HAT"}]}
+            for i in range(8)
+        ]
+        buckets = table_assembler.extract_nodes_from_paths(paths, "Person", ["Person", "Bestellung"])
+        columns = table_assembler.extract_table_columns(buckets)
+
+        old = table_assembler.DENSE_MIN_NODES, table_assembler.DENSE_MAX_CELLS
+        try:
+            table_assembler.DENSE_MIN_NODES = 0
+            self.assertTrue(table_assembler.use_dense(buckets[1]))
+            dense_rows = table_assembler.assemble_table_rows(dict(buckets), columns)
+
+            table_assembler.DENSE_MAX_CELLS = 8 * 9 - 1
+            self.assertFalse(table_assembler.use_dense(buckets[1]))
+            with patch.object(table_assembler, "DenseBucket", side_effect=AssertionError("DenseBucket gebaut")):
+                rows = table_assembler.assemble_table_rows(buckets, columns)
+        finally:
+            table_assembler.DENSE_MIN_NODES, table_assembler.DENSE_MAX_CELLS = old
+
+        self.assertEqual(rows, dense_rows)
+
+    @unittest.skipIf(MEMORY_BACKEND, "Session-Pool gibt es nur beim GraphClient")
+    def test_graph_client_request_session_is_released(self):
+        """Ein Request belegt höchstens einen Platz im Pool und gibt ihn am Ende wieder frei."""
+        from graph_client import GraphClient
+        self.assertIsInstance(graph, GraphClient)
+
+        acquired_before = graph.pool_stats()["acquired"]
+        with self.app as client:
+            resp = client.get('/api/get_data_as_table', query_string={'nodes': 'Person,Ort'})
+            self.assertEqual(resp.status_code, 200)
+
+        stats = graph.pool_stats()
+        self.assertEqual(stats["sessionsInUse"], 0)
+        self.assertEqual(stats["acquired"], acquired_before + 1)
+        self.assertEqual(stats["timeouts"], 0)
+
+    def test_search_fans_out_over_labels(self):
+        """/search fragt alle Labels (gleichzeitig) ab und findet Treffer auf beiden Seiten der Beziehung."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("CREATE (:Person {vorname:'Zacharias'})-[:WOHNT_IN]->(:Ort {name:'Berlin'})")
+        self.graph.run("CREATE (:Firma {name:'Zacharias GmbH'})-[:SITZ_IN]->(:Ort {name:'Hamburg'})")
+
+        resp = self.app.get('/search?q=zacharias')
+        self.assertEqual(resp.status_code, 200)
+        urls = [r["url"] for r in resp.get_json() if r["label"].startswith("🟢")]
+        self.assertTrue(any("WOHNT_IN" in u for u in urls))
+        self.assertTrue(any("SITZ_IN" in u for u in urls))
+        self.assertEqual(graph.pool_stats()["sessionsInUse"], 0)
+
+    def test_graph_fanout_keeps_order_limit_and_request_context(self):
+        """gather liefert in Aufruf-Reihenfolge, höchstens `fanout` gleichzeitig, mit dem `g` des Requests."""
+        import threading
+        from functools import partial
+        from flask import g
+        from graph_fanout import GraphFanout
+
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def call(i):
+            with lock:
+                running.append(i)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(i)
+            return (i, g.marker)
+
+        fanout = GraphFanout(graph.reads, fanout=3)
+        with app.test_request_context('/search'):
+            g.marker = "request"
+            results = fanout.gather(*(partial(call, i) for i in range(8)))
+
+        self.assertEqual(results, [(i, "request") for i in range(8)])
+        self.assertLessEqual(max(peak), 3)
+        self.assertGreater(max(peak), 1)
+
+    @unittest.skipIf(MEMORY_BACKEND, "braucht einen Neo4j-Server als Reader")
+    def test_graph_client_routes_reads_to_readers(self):
+        """Lesende Abfragen gehen an die Reader, nach einem Schreibzugriff im selben Request an den Leader."""
+        from graph_client import GraphClient
+        uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+        client = GraphClient(
+            uri,
+            auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASS", "testTEST12345678")),
+            max_size=2,
+            read_uris=[uri]  # derselbe Server als Stand-in für einen Reader
+        )
+
+        self.assertEqual(client.reads.evaluate("RETURN 1"), 1)
+        self.assertEqual(client.pool_stats()["readsOnReaders"], 1)
+
+        with app.test_request_context():
+            client.run("MATCH (n:GibtEsNicht) RETURN n")
+            client.reads.run("RETURN 1").data()
+            client._end_request_session()  # Teardown ist nur für den Client der App registriert
+
+        stats = client.pool_stats()
+        self.assertEqual(stats["readsOnReaders"], 1)
+        self.assertEqual(stats["readsOnLeader"], 1)
+        self.assertEqual(stats["sessionsInUse"], 0)
+
+    def test_graph_client_circuit_breaker_fails_fast(self):
+        """Ohne erreichbaren Server wirft der Client GraphUnavailable, ab dem zweiten Zugriff sofort."""
+        from graph_client import GraphClient, GraphUnavailable
+        client = GraphClient("bolt://127.0.0.1:1", auth=("neo4j", "x"), reconnect_base_delay=60)
+
+        with self.assertRaises(GraphUnavailable):
+            client.run("RETURN 1")
+        self.assertEqual(client.pool_stats()["circuitBreaker"]["state"], "open")
+
+        start = time.monotonic()
+        with self.assertRaises(GraphUnavailable):
+            client.reads.run("RETURN 1")
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertEqual(client.pool_stats()["sessionsInUse"], 0)
+
+    def test_metrics_endpoint_reports_named_statements(self):
+        """/metrics liefert Laufzeit und Zeilen der benannten Abfragen sowie die Request-Dauer."""
+        self.graph.run("CREATE (:Person {name:'Alice'})")
+        self.app.get('/api/labels')
+
+        resp = self.app.get('/metrics')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.content_type.startswith("text/plain"))
+        body = resp.get_data(as_text=True)
+        self.assertIn('oasis_cypher_statement_duration_seconds_count{statement="labels.fetch_labels"}', body)
+        self.assertIn('oasis_cypher_statement_rows_total{statement="labels.fetch_labels"}', body)
+        self.assertIn('oasis_http_request_duration_seconds_bucket{endpoint="labels_bp.get_labels",method="GET",le="+Inf"}', body)
+        self.assertIn("oasis_graph_sessions_in_use", body)
+
+    def test_slow_query_log_and_profile_replay(self):
+        """Langsame Abfragen landen im Log und lassen sich mit PROFILE wiederholen, ohne zu schreiben."""
+        from slow_queries import slow_query_log, profile_statement
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("CREATE (:Person {name:'Alice'}), (:Person {name:'Bob'})")
+
+        old_threshold = slow_query_log.threshold_ms
+        slow_query_log.threshold_ms = 1e-6  # alles loggen
+        slow_query_log.clear()
+        try:
+            resp = self.app.get('/api/labels')
+            self.assertEqual(resp.status_code, 200)
+            graph.run("CREATE (:Person {name:$name, password:$password})", name="Carol", password="geheim")
+        finally:
+            slow_query_log.threshold_ms = old_threshold
+
+        entries = slow_query_log.entries()
+        labels_entry = next(e for e in entries if e["statement"] == "labels.fetch_labels")
+        self.assertEqual(labels_entry["endpoint"], "labels_bp.get_labels")
+        self.assertTrue(labels_entry["replayable"])
+
+        create_entry = next(e for e in entries if "Carol" in json.dumps(e["parameters"]))
+        self.assertEqual(create_entry["parameters"]["password"], "***")
+        self.assertFalse(create_entry["replayable"])
+
+        if MEMORY_BACKEND:
+            self.skipTest("PROFILE-Pläne gibt es nur bei Neo4j")
+        profile = profile_statement(graph, labels_entry)
+        self.assertTrue(profile["operators"])
+        self.assertGreater(profile["totalDbHits"], 0)
+
+        # PROFILE einer schreibenden Abfrage wird zurückgerollt
+        write_entry = dict(labels_entry, cypher="CREATE (:Person {name:'Dave'})", parameters={})
+        profile_statement(graph, write_entry)
+        self.assertEqual(self.graph.evaluate("MATCH (p:Person {name:'Dave'}) RETURN count(p)"), 0)
+
+    def test_server_timing_header(self):
+        """API-Antworten tragen einen Server-Timing-Header mit den Phasen, im Debug-Modus auch im JSON."""
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("CREATE (:Person {vorname:'Alice'})-[:WOHNT_IN]->(:Ort {name:'Berlin'})")
+
+        resp = self.app.get('/api/get_data_as_table', query_string={'nodes': 'Person,Ort', 'debug': '1'})
+        self.assertEqual(resp.status_code, 200)
+        header = resp.headers.get("Server-Timing")
+        self.assertIsNotNone(header)
+        phases = {part.split(";")[0].strip() for part in header.split(",")}
+        self.assertTrue({"cypher", "assemble", "serialize", "total"} <= phases)
+
+        timings = resp.get_json()["debug"]["timings"]
+        self.assertGreater(timings["cypher"], 0)
+        self.assertIn("assemble", timings)
+
+    def test_request_profiler_requires_admin(self):
+        """?__profile ist nur für Admins, ohne Anmeldung kommt 403 und es wird kein Profil gespeichert."""
+        from request_profiler import request_profiler
+        before = len(request_profiler.store.summaries())
+
+        resp = self.app.get('/api/labels?__profile=cpu')
+        self.assertEqual(resp.status_code, 403)
+        self.assertNotIn("X-Profile-Id", resp.headers)
+        self.assertEqual(len(request_profiler.store.summaries()), before)
+
+        # ohne Schalter unverändert
+        self.assertEqual(self.app.get('/api/labels').status_code, 200)
+
+    def test_request_profiler_cpu_and_mem_reports(self):
+        """Profil-Berichte enthalten Text und ladbare pstats-/tracemalloc-Daten."""
+        import marshal
+        from flask import jsonify
+        from request_profiler import RequestProfiler, profile_cpu, profile_mem
+
+        with app.test_request_context('/api/labels'):
+            rv, duration, text, raw = profile_cpu(lambda: jsonify([str(i) for i in range(1000)]), 10)
+            self.assertEqual(rv.status_code, 200)
+            self.assertIn("cumulative", text)
+            self.assertIsInstance(marshal.loads(raw), dict)
+
+            rv, duration, text, raw = profile_mem(lambda: jsonify([str(i) for i in range(1000)]), 10)
+            self.assertIn("Peak", text)
+            self.assertGreater(len(raw), 0)
+
+        store = RequestProfiler(keep=1).store
+        store.add({"mode": "cpu", "text": "a", "raw": b""})
+        second = store.add({"mode": "cpu", "text": "b", "raw": b""})
+        self.assertEqual([r["id"] for r in store.summaries()], [second])
+
+    def _memory_app(self, memory):
+        from flask import Flask
+        from api.get_data_as_table import create_get_data_bp
+        from api.labels import create_labels_bp
+        from api.add_row import create_add_row_bp
+        from api.update_node import create_update_node_bp
+        from api.delete_node import create_delete_node_bp
+        memory_app = Flask(__name__)
+        memory_app.config["DISABLE_LOGIN"] = True
+        for create_bp in (create_get_data_bp, create_labels_bp, create_add_row_bp, create_update_node_bp, create_delete_node_bp):
+            memory_app.register_blueprint(create_bp(memory), url_prefix='/api')
+        return memory_app.test_client()
+
+    def test_memory_graph_table_matches_neo4j(self):
+        """Das In-Memory-Backend liefert für Tabelle und Filter dieselben Zeilen wie Neo4j."""
+        from memory_graph import MemoryGraph
+        self.graph.run("MATCH (n) DETACH DELETE n")
+        self.graph.run("""
+            CREATE (a:Person {vorname:'Alice', alter:30})-[:WOHNT_IN]->(b:Ort {name:'Berlin'}),
+                   (c:Person {vorname:'Carl', alter:40})-[:WOHNT_IN]->(b),
+                   (:Person {vorname:'Dora'})-[:WOHNT_IN]->(:Ort {name:'Hamburg'})
+        """)
+        memory = MemoryGraph()
+        memory.load(self.app.get('/api/dump_database').get_json())
+        memory_client = self._memory_app(memory)
+
+        qb = json.dumps({"condition": "AND", "valid": True, "rules": [
+            {"field": "Ort.name", "operator": "equal", "value": "berlin"},
+            {"field": "Person.alter", "operator": "greater", "value": 35},
+        ]})
+        for query in (
+            {'nodes': 'Person,Ort'},
+            {'nodes': 'Person,Ort', 'qb': qb},
+            {'nodes': 'Person,Ort', 'pageSize': '2', 'orderBy': 'Person.vorname:desc'},
+            {'nodes': 'Ort', 'groupBy': 'Ort.name', 'agg': 'count'},
+            {'nodes': 'Person,Ort', 'where': 'n.alter > 35 OR n.name = "Hamburg"'},
+        ):
+            expected = self.app.get('/api/get_data_as_table', query_string=query).get_json()
+            actual = memory_client.get('/api/get_data_as_table', query_string=query).get_json()
+            if "rows" in expected:
+                def values(result):
+                    return sorted(json.dumps([cell["value"] for cell in row["cells"]]) for row in result["rows"])
+                self.assertEqual(values(actual), values(expected), query)
+            else:
+                self.assertEqual(actual["groups"], expected["groups"], query)
+
+        self.assertEqual(memory_client.get('/api/labels').get_json(), ["Ort", "Person"])
+
+    def test_memory_graph_statements_and_rollback(self):
+        """Die Statements aus statements.py und die Schreib-Endpunkte laufen auf dem In-Memory-Backend, rollback nimmt alles zurück."""
+        import statements
+        from memory_graph import MemoryGraph
+        from py2neo.errors import ClientError
+        memory = MemoryGraph()
+        rows = [
+            {"i": 0, "identifier_value": "Alice", "all_props": {"name": "Alice", "alter": 30}},
+            {"i": 1, "identifier_value": "Alice", "all_props": {"name": "Alice"}},
+        ]
+        merged = statements.IMPORT_MERGE_NODES.run(memory, {"rows": rows}, label="Person", key="name").data()
+        self.assertEqual(merged[0]["id"], merged[1]["id"])
+        alice = merged[0]["id"]
+        berlin = statements.CREATE_NODE_WITH_PROPERTIES.run(memory, {"props": {"name": "Berlin"}}, label="Ort").evaluate()
+        statements.IMPORT_MERGE_RELATIONSHIPS.run(
+            memory, {"rows": [{"from_id": alice, "to_id": berlin}] * 2},
+            from_label="Person", to_label="Ort", rel_type="WOHNT_IN"
+        )
+        self.assertEqual(statements.REL_TYPES.run(memory).data(), [{"type": "WOHNT_IN"}])
+        self.assertEqual(memory.pool_stats()["relationships"], 1)
+
+        tx = memory.begin()
+        statements.CREATE_NODE_WITH_PROPERTY.run(tx, {"value": "Bob"}, label="Person", property="name")
+        statements.UPDATE_NODE_PROPERTY.run(tx, {"node_id": alice, "value": 31}, property="alter")
+        statements.DELETE_NODE.run(tx, {"node_id": berlin})
+        tx.rollback()
+
+        self.assertEqual(memory.evaluate("MATCH (n:Person) RETURN collect(n.name)"), ["Alice"])
+        self.assertEqual(memory.evaluate("MATCH (n) WHERE id(n) = $id RETURN n.alter", {"id": alice}), 30)
+        found = statements.SEARCH_LABEL.run(memory, {"query": "berl"}, label="Person").data()
+        self.assertEqual([r["m"]["name"] for r in found], ["Berlin"])
+
+        client = self._memory_app(memory)
+        resp = client.post('/api/add_row', json={"label": "Person", "properties": {"name": "Carl"}})
+        carl = resp.get_json()["id"]
+        self.assertEqual(client.put(f'/api/update_node/{carl}', json={"property": "alter", "value": 40}).status_code, 200)
+        self.assertEqual(client.delete(f'/api/delete_node/{berlin}').status_code, 200)
+        self.assertEqual(memory.evaluate("MATCH (n:Person) WHERE n.alter > 35 RETURN n.name"), "Carl")
+        self.assertEqual(memory.pool_stats()["relationships"], 0)
+
+        # was Neo4j ohne APOC ablehnt, lehnt auch das In-Memory-Backend ab
+        with self.assertRaises(ClientError):
+            memory.run("MATCH (n) RETURN apoc.meta.type(n.name)")
+
+    def test_memory_graph_leaked_transaction_does_not_deadlock(self):
+        """Eine nie beendete Schreibtransaktion blockiert andere Schreiber nur bis zum Timeout oder bis sie verworfen ist."""
+        import threading
+        from memory_graph import MemoryGraph
+        from py2neo.errors import ClientError, TransientError
+        memory = MemoryGraph()
+        memory.tx_timeout = 0.3
+
+        # Thread endet ohne commit/rollback: der nächste Schreiber rollt zurück
+        def leak():
+            memory.begin().run("CREATE (:Person {name: 'Geist'})")
+        thread = threading.Thread(target=leak)
+        thread.start()
+        thread.join()
+        memory.run("CREATE (:Person {name: 'Anna'})")
+        self.assertEqual(memory.evaluate("MATCH (n:Person) RETURN collect(n.name)"), ["Anna"])
+
+        # verworfene Transaktion im selben Thread
+        tx = memory.begin()
+        tx.run("CREATE (:Person {name: 'Weg'})")
+        with self.assertRaises(ClientError):
+            memory.begin()
+        del tx
+        memory.run("CREATE (:Person {name: 'Ben'})")
+        self.assertEqual(memory.evaluate("MATCH (n:Person) RETURN collect(n.name)"), ["Anna", "Ben"])
+
+        # eine offene Transaktion eines anderen Threads gibt einen TransientError statt zu hängen
+        opened, release = threading.Event(), threading.Event()
+
+        def hold():
+            tx = memory.begin()
+            opened.set()
+            release.wait(10)
+            tx.commit()
+        thread = threading.Thread(target=hold)
+        thread.start()
+        opened.wait(5)
+        try:
+            with self.assertRaises(TransientError):
+                memory.run("CREATE (:Person {name: 'Carl'})")
+            self.assertEqual(memory.evaluate("MATCH (n:Person) RETURN count(n)"), 2)
+        finally:
+            release.set()
+            thread.join()
+        memory.run("CREATE (:Person {name: 'Carl'})")
+        self.assertEqual(memory.evaluate("MATCH (n:Person) RETURN count(n)"), 3)
+
+    def test_statement_registry_quotes_identifiers(self):
+        """Namen landen gequotet im Text, Werte bleiben Parameter, der Text ist pro Namenskombination stabil."""
+        import statements
+        cypher = statements.UPDATE_NODE_PROPERTY.cypher(property="na`me")
+        self.assertIn("SET n.`na``me` = $value", cypher)
+        self.assertIs(statements.UPDATE_NODE_PROPERTY.cypher(property="na`me"), cypher)
+        with self.assertRaises(ValueError):
+            statements.CREATE_NODE_WITH_PROPERTY.cypher(label="Person")
+        with self.assertRaises(ValueError):
+            statements.quote_identifier("")
+        with self.assertRaises(ValueError):
+            statements.register("labels.fetch_labels", "MATCH (n) RETURN n")
+
+        # ein Label mit Backtick bleibt ein Label und wird nicht als Cypher ausgeführt
+        resp = self.app.post("/api/add_row", json={"label": "Evil`) DETACH DELETE (x", "properties": {"name": "x"}})
+        self.assertEqual(resp.status_code, 200)
+        labels = self.graph.run("MATCH (n) WHERE id(n) = $id RETURN labels(n) AS l", id=resp.get_json()["id"]).evaluate()
+        self.assertEqual(labels, ["Evil`) DETACH DELETE (x"])
+
+    def test_save_mapping_imports_in_batches(self):
+        """Mehrere Batches: Knoten werden über Batchgrenzen gemergt, die Antwort meldet Zeilen/s."""
+        csv_data = "name,city\n" + "".join(f"P{i},{'Berlin' if i % 2 else 'Hamburg'}\n" for i in range(5)) + "P0,Hamburg\n"
+        mapping = {
+            "nodes": {
+                "Person": [{"original": "name", "renamed": "name"}],
+                "Ort": [{"original": "city", "renamed": "name"}]
+            },
+            "relationships": [{"from": "Person", "to": "Ort", "type": "wohnt in"}]
+        }
+        with self.app as client:
+            with client.session_transaction() as sess:
+                sess['raw_data'] = csv_data
+            with patch("import_engine.DEFAULT_BATCH_SIZE", 2):
+                resp = client.post('/save_mapping', json=mapping)
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body["rows"], 6)
+        self.assertEqual(body["batches"], 3)
+        self.assertIn("rowsPerSecond", body)
+
+        self.assertEqual(self.graph.evaluate("MATCH (p:Person) RETURN count(p)"), 5)
+        self.assertEqual(self.graph.evaluate("MATCH (o:Ort) RETURN count(o)"), 2)
+        self.assertEqual(self.graph.evaluate("MATCH (:Person)-[r:WOHNT_IN]->(:Ort) RETURN count(r)"), 5)
+
+    def test_upload_spool_roundtrip_and_limits(self):
+        """Der Upload liegt im Spool statt in der Session, wird beim Import gelesen und danach gelöscht."""
+        csv_data = "name,city\nAlice,Berlin\nBob,Hamburg"
+        response = self.app.post('/upload', data={'data': csv_data}, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        with self.app.session_transaction() as sess:
+            upload_id = sess['upload_id']
+        self.assertTrue(upload_spool.exists(upload_id))
+
+        mapping = {"nodes": {"Person": [{"original": "name", "renamed": "name"}]}, "relationships": []}
+        response = self.app.post('/save_mapping', json=mapping)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.graph.evaluate("MATCH (p:Person) RETURN count(p)"), 2)
+        self.assertFalse(upload_spool.exists(upload_id))
+
+        # abgelaufener Upload
+        response = self.app.post('/upload', data={'data': csv_data}, content_type='multipart/form-data')
+        with self.app.session_transaction() as sess:
+            upload_spool.remove(sess['upload_id'])
+        response = self.app.post('/save_mapping', json=mapping)
+        self.assertEqual(response.status_code, 410)
+
+        with patch.object(upload_spool, "max_bytes", 10):
+            response = self.app.post('/upload', data={'data': csv_data}, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 413)
+        with self.assertRaises(KeyError):
+            upload_spool.open("../../etc/passwd")
+
+    def test_import_job_reports_progress(self):
+        """POST /api/import_jobs antwortet sofort mit 202, der Status meldet Zeilen, Zeilen/s und am Ende done."""
+        csv_data = "name,city\n" + "".join(f"P{i},{'Berlin' if i % 2 else 'Hamburg'}\n" for i in range(20))
+        mapping = {
+            "nodes": {
+                "Person": [{"original": "name", "renamed": "name"}],
+                "Ort": [{"original": "city", "renamed": "name"}]
+            },
+            "relationships": [{"from": "Person", "to": "Ort", "type": "WOHNT_IN"}]
+        }
+        self.app.post('/upload', data={'data': csv_data}, content_type='multipart/form-data')
+        response = self.app.post('/api/import_jobs', json=mapping)
+        self.assertEqual(response.status_code, 202)
+        status_url = response.get_json()["statusUrl"]
+
+        for _ in range(100):
+            job = self.app.get(status_url).get_json()
+            if job["state"] in ("done", "failed"):
+                break
+            time.sleep(0.1)
+
+        self.assertEqual(job["state"], "done", job["errors"])
+        self.assertEqual(job["rowsProcessed"], 20)
+        self.assertEqual(job["rowsTotal"], 20)
+        self.assertIsNotNone(job["rowsPerSecond"])
+        self.assertEqual(self.graph.evaluate("MATCH (:Person)-[r:WOHNT_IN]->(:Ort) RETURN count(r)"), 20)
+
+        # der Upload ist verbraucht
+        self.assertEqual(self.app.post('/api/import_jobs', json=mapping).status_code, 400)
+        self.assertEqual(self.app.get('/api/import_jobs/unbekannt').status_code, 404)
+
+    def test_queued_import_job_keeps_its_upload(self):
+        """Der Upload eines wartenden Import-Jobs übersteht das Aufräumen des Spools, bis der Job ihn gelesen hat."""
+        import threading
+        from import_job_manager import ImportJobManager
+        release = threading.Event()
+
+        class BlockingEngine:
+            def run(self, rows):
+                release.wait(5)
+                return list(rows)
+
+        manager = ImportJobManager(workers=1)
+        uploads = [upload_spool.put("name,city\nAlice,Berlin\n"), upload_spool.put("name,city\nBob,Hamburg\n")]
+        with patch("import_job_manager.create_import_engine", side_effect=lambda *args: BlockingEngine()):
+            jobs = [manager.submit(self.graph, {}, upload_id=upload_id) for upload_id in uploads]
+        self.assertEqual(jobs[1].state, "queued")
+
+        expired = time.time() - 2 * 3600
+        for upload_id in uploads:
+            os.utime(upload_spool._path(upload_id), (expired, expired))
+        with patch.object(upload_spool, "ttl", 3600):
+            upload_spool.cleanup()
+        self.assertTrue(all(upload_spool.exists(upload_id) for upload_id in uploads))
+
+        release.set()
+        for _ in range(50):
+            if all(job.state in ("done", "failed") for job in jobs):
+                break
+            time.sleep(0.1)
+        self.assertEqual([job.state for job in jobs], ["done", "done"], [job.errors for job in jobs])
+        self.assertFalse(any(upload_spool.exists(upload_id) for upload_id in uploads))
+
+    def test_parallel_import_matches_serial(self):
+        """Mehrere Schreiber legen dieselben Knoten und Beziehungen an wie der serielle Import."""
+        import csv
+        import io
+        from import_engine import ImportEngine, ParallelImportEngine
+        csv_data = "name,city\n" + "".join(f"P{i % 30},C{i % 7}\n" for i in range(100))
+        mapping = {
+            "nodes": {
+                "Person": [{"original": "name", "renamed": "name"}],
+                "Ort": [{"original": "city", "renamed": "name"}]
+            },
+            "relationships": [{"from": "Person", "to": "Ort", "type": "WOHNT_IN"}]
+        }
+        counts = "MATCH (p:Person) WITH count(p) AS p MATCH (o:Ort) WITH p, count(o) AS o MATCH ()-[r:WOHNT_IN]->() RETURN [p, o, count(r)]"
+
+        ImportEngine(self.graph, mapping, batch_size=8).run(csv.DictReader(io.StringIO(csv_data)))
+        serial = self.graph.evaluate(counts)
+        self.graph.run("MATCH (n) DETACH DELETE n")
+
+        engine = ParallelImportEngine(self.graph, mapping, batch_size=8, writers=4)
+        stats = engine.run(csv.DictReader(io.StringIO(csv_data)))
+        self.assertEqual(stats["rows"], 100)
+        self.assertEqual(self.graph.evaluate(counts), serial)
+        self.assertEqual(serial, [30, 7, 100])
+
+    def test_parallel_import_chained_mapping(self):
+        """Bei Person -> Stadt -> Land teilen sich gleichzeitig geschriebene Eimer keinen Knoten."""
+        import csv
+        import io
+        from import_engine import ParallelImportEngine
+        csv_data = "name,city,country\n" + "".join(f"P{i},C{i % 13},L{i % 13 % 3}\n" for i in range(200))
+        mapping = {
+            "nodes": {
+                "Person": [{"original": "name", "renamed": "name"}],
+                "Stadt": [{"original": "city", "renamed": "name"}],
+                "Land": [{"original": "country", "renamed": "name"}]
+            },
+            "relationships": [
+                {"from": "Person", "to": "Stadt", "type": "WOHNT_IN"},
+                {"from": "Stadt", "to": "Land", "type": "LIEGT_IN"}
+            ]
+        }
+
+        engine = ParallelImportEngine(self.graph, mapping, batch_size=8, writers=4)
+        self.assertEqual(
+            engine._relationship_passes([("Person", "Stadt", "WOHNT_IN"), ("Stadt", "Land", "LIEGT_IN"), ("Person", "Person", "KENNT"), ("Land", "Kontinent", "LIEGT_IN")]),
+            [([("Person", "Stadt", "WOHNT_IN"), ("Land", "Kontinent", "LIEGT_IN")], 4), ([("Stadt", "Land", "LIEGT_IN")], 4), ([("Person", "Person", "KENNT")], 1)]
+        )
+
+        ids, pairs = engine._merge_nodes(csv.DictReader(io.StringIO(csv_data)))
+        expected = sum(len(group) for group in pairs.values())
+        written = 0
+        for round_buckets in engine._relationship_rounds(ids, dict(pairs)):
+            seen = set()
+            for bucket in round_buckets:
+                nodes = {row[key] for rows in bucket.values() for row in rows for key in ("from_id", "to_id")}
+                self.assertFalse(seen & nodes)
+                seen |= nodes
+                written += sum(len(rows) for rows in bucket.values())
+        self.assertEqual(written, expected)
+
+        engine._merge_relationships(ids, pairs)
+        counts = "MATCH ()-[w:WOHNT_IN]->() WITH count(w) AS w MATCH ()-[l:LIEGT_IN]->() RETURN [w, count(l)]"
+        self.assertEqual(self.graph.evaluate(counts), [200, 13])
+
+    def test_parallel_import_stalled_writer_fails(self):
+        """Hängt ein Schreiber in _write_nodes, bricht der Import nach writer_timeout ab, statt den Leser zu blockieren."""
+        import threading
+        from import_engine import ParallelImportEngine, ImportWriterStalled
+        mapping = {"nodes": {"Person": [{"original": "name", "renamed": "name"}]}, "relationships": []}
+        rows = [{"name": f"P{i}"} for i in range(500)]
+        release = threading.Event()
+
+        class StuckEngine(ParallelImportEngine):
+            def _write_nodes(self, chunk, ids):
+                release.wait(30)
+
+        engine = StuckEngine(self.graph, mapping, batch_size=2, writers=2, writer_timeout=0.3)
+        start = time.monotonic()
+        try:
+            with self.assertRaises(ImportWriterStalled):
+                engine.run(rows)
+            self.assertLess(time.monotonic() - start, 10)
+        finally:
+            release.set()
+
+    def test_save_mapping_creates_merge_key_index(self):
+        """Vor dem Import wird ein Index auf den Merge-Schlüssel angelegt und ist danach ONLINE."""
+        label = f"ImportLabel_{uuid4().hex[:8]}"
+        mapping = {"nodes": {label: [{"original": "name", "renamed": "name"}, {"original": "city", "renamed": "stadt"}]}, "relationships": []}
+        try:
+            with self.app as client:
+                with client.session_transaction() as sess:
+                    sess['raw_data'] = "name,city\nAlice,Berlin\nBob,Hamburg"
+                resp = client.post('/save_mapping', json=mapping)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.get_json()["indexesCreated"], [{"label": label, "property": "name", "kind": "index"}])
+
+            indexes = self.graph.run("SHOW INDEXES").data()
+            self.assertTrue([
+                idx for idx in indexes
+                if label in (idx.get("labelsOrTypes") or [])
+                and (idx.get("properties") or [None])[0] == "name"
+                and idx.get("state", "").upper() == "ONLINE"
+            ])
+
+            # beim zweiten Import gibt es den Index schon
+            with self.app as client:
+                with client.session_transaction() as sess:
+                    sess['raw_data'] = "name,city\nCarla,Bonn"
+                resp = client.post('/save_mapping', json=mapping)
+            self.assertEqual(resp.get_json()["indexesCreated"], [])
+        finally:
+            self.tearDown_node_and_index(label)
+
+    def test_wait_online_ignores_other_index_kinds(self):
+        """wait_online wartet auf den RANGE-Knotenindex, nicht auf Volltext- oder Relationship-Indexe."""
+        from index_manager import IndexManager
+        label = f"WaitLabel_{uuid4().hex[:8]}"
+        try:
+            api = IndexManager(self.graph)
+            api.create_index(label, "name")
+            created = [idx for idx in api.get_existing_indexes() if label in idx["labels"]]
+            self.assertEqual(len(created), 1)
+            self.assertEqual(created[0]["entityType"], "NODE")
+            self.assertTrue(created[0]["name"])
+
+            def index(name, kind, entity, state, props=("name",)):
+                return {"name": name, "entityType": entity, "labels": [label], "properties": list(props),
+                        "type": kind, "state": state, "unique": False}
+
+            class FakeManager(IndexManager):
+                calls = 0
+
+                def get_existing_indexes(self):
+                    FakeManager.calls += 1
+                    range_state = "ONLINE" if FakeManager.calls > 2 else "POPULATING"
+                    return [
+                        index("fulltext", "FULLTEXT", "NODE", "ONLINE"),
+                        index("rel_range", "RANGE", "RELATIONSHIP", "ONLINE"),
+                        index("composite", "RANGE", "NODE", "ONLINE", ("name", "stadt")),
+                        index("range", "RANGE", "NODE", range_state),
+                    ]
+
+            FakeManager(None).wait_online(label, "name", timeout=5)
+            self.assertEqual(FakeManager.calls, 3)
+
+            class OnlyFulltext(IndexManager):
+                def get_existing_indexes(self):
+                    return [index("fulltext", "FULLTEXT", "NODE", "ONLINE")]
+
+            with self.assertRaises(RuntimeError):
+                OnlyFulltext(None).wait_online(label, "name", timeout=1)
+        finally:
+            self.tearDown_node_and_index(label)
+
 if __name__ == '__main__':
     try:
         unittest.main()
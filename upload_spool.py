@@ -0,0 +1,184 @@
+import csv
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+class SpoolQuotaExceeded(RuntimeError):
+    pass
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+def _size(entry):
+    try:
+        return entry.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+class UploadSpool:
+    """
+    Ablage für hochgeladene CSV-Daten zwischen /upload und /save_mapping. Statt der Daten
+    steht nur die Upload-id in der Session (das Session-Cookie bleibt klein), die Datei
+    liegt in `directory` und wird beim Import zeilenweise gelesen.
+
+    Dateien, die älter als `ttl` Sekunden sind, werden beim nächsten `put` bzw. `cleanup`
+    gelöscht, außer sie sind mit `pin` für einen wartenden oder laufenden Import markiert.
+    Ein Upload darf höchstens `max_bytes` groß sein, alle zusammen höchstens `quota` Bytes,
+    sonst gibt es `SpoolQuotaExceeded`.
+    """
+
+    def __init__(self, directory, ttl=3600, max_bytes=0, quota=0):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.quota = quota
+        self._lock = threading.Lock()
+        self._pinned = set()
+        self.expired = 0
+        self.rejected = 0
+
+    def _path(self, upload_id):
+        if not upload_id or not _UPLOAD_ID.match(upload_id):
+            raise KeyError(upload_id)
+        return os.path.join(self.directory, f"{upload_id}.csv")
+
+    def put(self, data):
+        """Legt `data` (str) ab und gibt die Upload-id zurück."""
+        body = data.encode("utf-8")
+        if self.max_bytes and len(body) > self.max_bytes:
+            self.rejected += 1
+            raise SpoolQuotaExceeded(f"Upload ist {len(body)} Bytes groß, erlaubt sind {self.max_bytes}")
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self.cleanup()
+            if self.quota and self.used_bytes() + len(body) > self.quota:
+                self.rejected += 1
+                raise SpoolQuotaExceeded("Upload-Speicher ist voll, bitte später erneut versuchen")
+
+            upload_id = uuid.uuid4().hex
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self._path(upload_id))
+        return upload_id
+
+    def open(self, upload_id):
+        """Datei zum Lesen (Text, für csv), KeyError wenn unbekannt oder abgelaufen."""
+        try:
+            return open(self._path(upload_id), newline="", encoding="utf-8")
+        except FileNotFoundError:
+            raise KeyError(upload_id) from None
+
+    def count_lines(self, upload_id):
+        """Zeilen in der Datei (ohne Header), als Schätzung der Datensätze für Fortschritt und ETA."""
+        lines = 0
+        last = b"\n"
+        with open(self._path(upload_id), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                lines += chunk.count(b"\n")
+                last = chunk[-1:]
+        if last != b"\n":
+            lines += 1
+        return max(0, lines - 1)
+
+    def exists(self, upload_id):
+        try:
+            return os.path.exists(self._path(upload_id))
+        except KeyError:
+            return False
+
+    def remove(self, upload_id):
+        try:
+            os.remove(self._path(upload_id))
+        except (KeyError, FileNotFoundError):
+            pass
+
+    def pin(self, upload_id):
+        """Nimmt den Upload von `cleanup` aus, bis `unpin`, und setzt seine Ablaufzeit zurück."""
+        path = self._path(upload_id)
+        with self._lock:
+            self._pinned.add(path)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def unpin(self, upload_id):
+        with self._lock:
+            self._pinned.discard(self._path(upload_id))
+
+    def _files(self):
+        try:
+            with os.scandir(self.directory) as entries:
+                return [e for e in entries if e.is_file() and e.name.endswith((".csv", ".part"))]
+        except FileNotFoundError:
+            return []
+
+    def used_bytes(self):
+        return sum(_size(e) for e in self._files())
+
+    def cleanup(self):
+        """Löscht abgelaufene Uploads und liegengebliebene Teildateien."""
+        if not self.ttl:
+            return
+        cutoff = time.time() - self.ttl
+        for entry in self._files():
+            if entry.path in self._pinned:
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    self.expired += 1
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        files = self._files()
+        return {
+            "directory": self.directory,
+            "uploads": len(files),
+            "bytes": sum(_size(e) for e in files),
+            "maxBytes": self.max_bytes,
+            "quota": self.quota,
+            "ttl": self.ttl,
+            "expired": self.expired,
+            "rejected": self.rejected,
+        }
+
+@contextmanager
+def open_csv(upload_id=None, raw_data=None):
+    """
+    DictReader über einen Upload im Spool, zeilenweise gelesen, danach wird der Upload
+    gelöscht. Sessions von vor dem Spool haben stattdessen `raw_data`. Ergibt None, wenn
+    sich das CSV-Format nicht erkennen lässt.
+    """
+    if upload_id is not None:
+        f = upload_spool.open(upload_id)
+    else:
+        f = io.StringIO(raw_data)
+
+    try:
+        try:
+            dialect = csv.Sniffer().sniff(f.read(1024))
+            f.seek(0)
+            reader = csv.DictReader(f, dialect=dialect)
+        except csv.Error as e:
+            print(f"Fehler beim Analysieren der CSV-Daten: {e}")
+            reader = None
+        yield reader
+    finally:
+        f.close()
+        upload_spool.remove(upload_id)
+
+# Standard: 50 MB pro Upload, 500 MB insgesamt, eine Stunde bis zum Import
+upload_spool = UploadSpool(
+    directory=os.getenv("OASIS_UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "oasis_uploads")),
+    ttl=float(os.getenv("OASIS_UPLOAD_SPOOL_TTL", "3600")),
+    max_bytes=int(float(os.getenv("OASIS_UPLOAD_MAX_MB", "50")) * 1024 * 1024),
+    quota=int(float(os.getenv("OASIS_UPLOAD_SPOOL_QUOTA_MB", "500")) * 1024 * 1024)
+)